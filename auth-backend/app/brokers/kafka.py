@@ -1,36 +1,113 @@
 import asyncio
+import os
+from typing import Any, Callable, Final, Iterable
 
 from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka.codec import has_gzip, has_lz4, has_snappy, has_zstd
 from aiokafka.errors import (
     ConsumerStoppedError,
     KafkaConnectionError,
     KafkaError,
     KafkaTimeoutError,
     NoBrokersAvailable,
-    UnknownTopicOrPartitionError,
 )
 from fastapi import HTTPException, status
 
 from app.configs.logging_handler import configure_logging_handler
+from app.utils.metrics import KAFKA_MESSAGES_PRODUCED_TOTAL
 
 logger = configure_logging_handler()
 
+KAFKA_LINGER_MS: Final[int] = int(os.getenv("KAFKA_LINGER_MS", "5"))
+KAFKA_MAX_BATCH_SIZE: Final[int] = int(os.getenv("KAFKA_MAX_BATCH_SIZE", "131072"))
+# gzip is built into Python, other codecs need their libraries installed
+KAFKA_FALLBACK_COMPRESSION_TYPE: Final[str] = "gzip"
+KAFKA_COMPRESSION_TYPE: Final[str | None] = (
+    os.getenv("KAFKA_COMPRESSION_TYPE", KAFKA_FALLBACK_COMPRESSION_TYPE) or None
+)
+KAFKA_CODECS_CHECKS: Final[dict[str, Callable[[], bool]]] = {
+    "gzip": has_gzip,
+    "snappy": has_snappy,
+    "lz4": has_lz4,
+    "zstd": has_zstd,
+}
+# Record headers as the header name and value pairs
+KafkaHeaders = list[tuple[str, bytes]] | None
+
+
+def resolve_compression_type(compression_type: str | None) -> str | None:
+    """
+    Compression codec supported by the installed libraries
+
+    :param str | None compression_type: Requested codec name
+
+    :return str | None: The codec name, gzip if the codec library is not
+    installed, None if the compression is disabled
+    """
+    if not compression_type:
+        return None
+    codec_check = KAFKA_CODECS_CHECKS.get(compression_type)
+    if codec_check is None:
+        raise ValueError(f"Unknown Kafka compression type {compression_type}")
+    if not codec_check():
+        logger.warning(
+            "Kafka %s codec is not installed, %s is used instead",
+            compression_type,
+            KAFKA_FALLBACK_COMPRESSION_TYPE,
+        )
+        return KAFKA_FALLBACK_COMPRESSION_TYPE
+    return compression_type
+
+
+def encode_kafka_value(value: str | bytes | None) -> bytes | None:
+    """
+    Encoding the Kafka key or value
+
+    :param str | bytes | None value: Text, already encoded bytes or None
+
+    :return bytes | None: Encoded value
+    """
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return value
+
 
 class KafkaProducer:
     """
     Kafka producer for sending messages to a specified topic
+
+    Messages are appended to the producer batches without waiting for the
+    broker acknowledgement, the batches are sent after KAFKA_LINGER_MS or
+    once KAFKA_MAX_BATCH_SIZE bytes are collected
     """
 
-    def __init__(self, bootstrap_servers: str, topic: str) -> None:
+    def __init__(
+        self,
+        bootstrap_servers: str,
+        topic: str,
+        linger_ms: int = KAFKA_LINGER_MS,
+        max_batch_size: int = KAFKA_MAX_BATCH_SIZE,
+        compression_type: str | None = KAFKA_COMPRESSION_TYPE,
+    ) -> None:
         """
-        Initializes kafka producer instance
+        Initialize the KafkaProducer instance
 
         :param str bootstrap_servers: The Kafka server bootstrap address
         :param str topic: The topic to which messages will be sent
+        :param int linger_ms: Time to wait for more messages of the batch
+        :param int max_batch_size: Maximal size of the batch in bytes
+        :param str | None compression_type: Batch compression codec, the batches
+        are not compressed if it is absent
         """
         self.bootstrap_servers: str = bootstrap_servers
         self.topic: str = topic
+        self.linger_ms: int = linger_ms
+        self.max_batch_size: int = max_batch_size
+        self.compression_type: str | None = resolve_compression_type(
+            compression_type
+        )
         self.producer: None | AIOKafkaProducer = None
+        self.pending_deliveries: set[asyncio.Future[Any]] = set()
 
     async def start(self) -> None:
         """
@@ -41,7 +118,10 @@ class KafkaProducer:
         try:
             if self.producer is None:
                 self.producer = AIOKafkaProducer(
-                    bootstrap_servers=self.bootstrap_servers
+                    bootstrap_servers=self.bootstrap_servers,
+                    linger_ms=self.linger_ms,
+                    max_batch_size=self.max_batch_size,
+                    compression_type=self.compression_type,
                 )
             await self.producer.start()
         except KafkaConnectionError as error:
@@ -57,37 +137,93 @@ class KafkaProducer:
                 detail=f"Failed to start Kafka, because of {str(exception)}",
             ) from exception
 
-    async def produce_message(self, key: str, value: str) -> None:
+    def on_delivery(self, delivery: asyncio.Future[Any]) -> None:
+        """
+        Recording the delivery result of the message
+
+        :param asyncio.Future[Any] delivery: Completed delivery of the message
+        """
+        self.pending_deliveries.discard(delivery)
+        if delivery.cancelled() or delivery.exception() is not None:
+            KAFKA_MESSAGES_PRODUCED_TOTAL.labels(topic=self.topic, result="error").inc()
+            logger.error(
+                "Message delivery failed: %s",
+                "cancelled" if delivery.cancelled() else delivery.exception(),
+            )
+            return
+        KAFKA_MESSAGES_PRODUCED_TOTAL.labels(topic=self.topic, result="success").inc()
+
+    async def produce_message(
+        self,
+        key: str | bytes | None,
+        value: str | bytes,
+        headers: KafkaHeaders = None,
+    ) -> asyncio.Future[Any]:
         """
         Produce message to the Kafka topic
 
-        :param key: The key for the message
-        :param value: The value of the message
+        The message is only appended to the batch, the returned delivery can
+        be awaited if the acknowledgement is required
+
+        :param str | bytes | None key: The key of the message
+        :param str | bytes value: The value of the message
+        :param KafkaHeaders headers: The record headers
+
+        :return asyncio.Future[Any]: Delivery resolved with the record metadata
         """
         if self.producer is None:
-            logger.error("Producer is not started")
-            return None
-        if isinstance(value, str):
-            value = value.encode("utf-8")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Kafka producer is not started",
+            )
         try:
-            await self.producer.send_and_wait(
-                self.topic, key=key.encode(), value=value.encode()
+            delivery: asyncio.Future[Any] = await self.producer.send(
+                self.topic,
+                key=encode_kafka_value(key),
+                value=encode_kafka_value(value),
+                headers=headers,
             )
-            logger.info("Message delivered to %s", self.topic)
-        except KafkaTimeoutError as excp:
-            logger.error("Message delivery timed out: %s", excp)
-        except UnknownTopicOrPartitionError as excp:
-            logger.error("Unknown topic or partition: %s", excp)
-        except KafkaError as excp:
-            logger.error("Kafka error: %s", excp)
-        except Exception as excp:  # pylint: disable=W0718
-            logger.error("Message delivery failed: %s", excp)
+        except KafkaError as error:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Common base broker error - {str(error)}",
+            ) from error
+        self.pending_deliveries.add(delivery)
+        delivery.add_done_callback(self.on_delivery)
+        return delivery
+
+    async def produce_many(
+        self, messages: Iterable[tuple[str | bytes | None, str | bytes, KafkaHeaders]]
+    ) -> list[asyncio.Future[Any]]:
+        """
+        Produce messages to the Kafka topic without waiting between them
+
+        :param Iterable[tuple[str | bytes | None, str | bytes, KafkaHeaders]]
+        messages: The key, the value and the record headers of every message
+
+        :return list[asyncio.Future[Any]]: Deliveries in the messages order
+        """
+        return [
+            await self.produce_message(key=key, value=value, headers=headers)
+            for key, value, headers in messages
+        ]
+
+    async def flush(self) -> None:
+        """
+        Sending all collected batches and waiting for their deliveries
+        """
+        if self.producer is None:
+            return
+        await self.producer.flush()
+        if self.pending_deliveries:
+            await asyncio.gather(*self.pending_deliveries, return_exceptions=True)
 
     async def stop(self) -> None:
         """
-        Close the producer
+        Close the producer after the pending messages are delivered
         """
         if self.producer is not None:
+            await self.flush()
             await self.producer.stop()
 
 
@@ -19,6 +19,12 @@ logger = configure_logging_handler()
 KEYDB_PASSWORD: Final[Optional[str]] = os.getenv("KEYDB_PASSWORD")
 KEYDB_PORT: Final[Optional[str]] = os.getenv("KEYDB_PORT")
 
+# Client shared by the FastAPI cache backend and the introspection cache
+# invalidation, connections are opened lazily from its pool
+keydb_instance: aioredis.Redis = aioredis.from_url(  # type: ignore[no-untyped-call]
+    f"redis://:{KEYDB_PASSWORD}@keydb:{KEYDB_PORT}"
+)
+
 
 @asynccontextmanager
 async def cache_span(_: FastAPI) -> AsyncIterator[Backend]:
@@ -36,8 +42,7 @@ async def cache_span(_: FastAPI) -> AsyncIterator[Backend]:
     after initializing the cache. The cache availability within
     the context block
     """
-    keydb = aioredis.from_url(f"redis://:{KEYDB_PASSWORD}@keydb:{KEYDB_PORT}")  # type: ignore[no-untyped-call]
-    FastAPICache.init(backend=RedisBackend(keydb), prefix="fastapi-cache")
+    FastAPICache.init(backend=RedisBackend(keydb_instance), prefix="fastapi-cache")
     yield FastAPICache.get_backend()
 
 
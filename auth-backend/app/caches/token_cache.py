@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Final, cast
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.caches.keydb import keydb_instance
+from app.configs.logging_handler import configure_logging_handler
+
+logger = configure_logging_handler()
+
+TOKEN_CACHE_MAX_TTL_SECONDS: Final[int] = int(
+    os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "300")
+)
+# The KeyDB tier is shared with quiz-backend-api, the keys and the channel
+# have to match its app/utils/token_cache.py
+TOKEN_CACHE_KEY_PREFIX: Final[str] = "introspect"
+TOKEN_CACHE_INVALIDATION_CHANNEL: Final[str] = "introspect:invalidate"
+
+
+def hash_token(token: str) -> str:
+    """
+    Token hashing, so raw bearer tokens never become cache keys
+
+    :param str token: Encoded token
+
+    :return str: SHA-256 hexadecimal digest of the token
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def fetch_session_id(token_info: dict[str, Any]) -> str | None:
+    """
+    Keycloak session identifier obtaining from token claims
+
+    :param dict[str, Any] token_info: Token claims
+
+    :return str | None: Session identifier if it is presented
+    """
+    session_id = token_info.get("sid") or token_info.get("session_state")
+    return str(session_id) if session_id else None
+
+
+def calculate_ttl(token_info: dict[str, Any]) -> int:
+    """
+    Entry lifetime calculation bounded by the token expiration
+
+    :param dict[str, Any] token_info: Introspection result
+
+    :return int: Lifetime in seconds, zero if the result must not be cached
+    """
+    expires_at = token_info.get("exp")
+    if not isinstance(expires_at, (int, float)):
+        return 0
+    return max(0, min(TOKEN_CACHE_MAX_TTL_SECONDS, int(expires_at - time.time())))
+
+
+async def fetch_introspection(
+    token: str, keydb: aioredis.Redis = keydb_instance
+) -> dict[str, Any] | None:
+    """
+    Cached introspection result obtaining from the shared KeyDB tier
+
+    :param str token: Encoded token
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+
+    :return dict[str, Any] | None: Cached introspection result
+    """
+    try:
+        cached_value = await keydb.get(f"{TOKEN_CACHE_KEY_PREFIX}:{hash_token(token)}")
+    except RedisError as error:
+        logger.warning("Introspection cache reading error - %s", error)
+        return None
+    if cached_value is None:
+        return None
+    return cast(dict[str, Any], json.loads(cached_value))
+
+
+async def store_introspection(
+    token: str, token_info: dict[str, Any], keydb: aioredis.Redis = keydb_instance
+) -> None:
+    """
+    Introspection result storing in the shared KeyDB tier
+
+    The entry is indexed by the Keycloak session, so invalidate_session
+    removes it on logout
+
+    :param str token: Encoded token
+    :param dict[str, Any] token_info: Introspection result
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    """
+    ttl = calculate_ttl(token_info)
+    if not ttl:
+        return
+    token_hash = hash_token(token)
+    session_id = fetch_session_id(token_info)
+    try:
+        async with keydb.pipeline(transaction=False) as pipeline:
+            pipeline.set(
+                f"{TOKEN_CACHE_KEY_PREFIX}:{token_hash}", json.dumps(token_info), ex=ttl
+            )
+            if session_id:
+                session_key = f"{TOKEN_CACHE_KEY_PREFIX}:sid:{session_id}"
+                pipeline.sadd(session_key, token_hash)
+                pipeline.expire(session_key, TOKEN_CACHE_MAX_TTL_SECONDS)
+            await pipeline.execute()
+    except RedisError as error:
+        logger.warning("Introspection cache writing error - %s", error)
+
+
+async def invalidate_session(
+    session_id: str, keydb: aioredis.Redis = keydb_instance
+) -> None:
+    """
+    Removing cached introspection results of all tokens issued for the
+    finished session
+
+    Services caching the results are notified through KeyDB channel to clear
+    their in-process entries
+
+    :param str session_id: Keycloak session identifier
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    """
+    session_key = f"{TOKEN_CACHE_KEY_PREFIX}:sid:{session_id}"
+    try:
+        token_hashes = await keydb.smembers(session_key)  # type: ignore[misc]
+        async with keydb.pipeline(transaction=True) as pipeline:
+            for token_hash in token_hashes:
+                if isinstance(token_hash, bytes):
+                    token_hash = token_hash.decode("utf-8")
+                pipeline.delete(f"{TOKEN_CACHE_KEY_PREFIX}:{token_hash}")
+            pipeline.delete(session_key)
+            pipeline.publish(TOKEN_CACHE_INVALIDATION_CHANNEL, session_id)
+            await pipeline.execute()
+    except RedisError as error:
+        logger.warning("Introspection cache invalidation error - %s", error)
@@ -13,9 +13,11 @@ from slowapi.util import get_remote_address
 from app.caches.keydb import cache_span
 from app.configs.logging_handler import configure_logging_handler
 from app.middlewares.logging_middleware import LoggingMiddleware
+from app.middlewares.metrics_middleware import PrometheusMiddleware
 from app.routers import auth
 from app.services.keycloak import verify_permission
 from app.utils.handlers import rate_limit_exceeded_handler
+from app.utils.metrics import metrics_endpoint
 
 load_dotenv()  # Environmental variables
 
@@ -64,6 +66,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(PrometheusMiddleware, application=app)
+app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 
 @app.get("/check-auth")
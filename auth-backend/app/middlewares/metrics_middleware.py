@@ -0,0 +1,81 @@
+import time
+
+from fastapi import FastAPI
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.metrics import HTTP_REQUEST_DURATION_SECONDS, HTTP_REQUESTS_IN_PROGRESS
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def find_route_path(application: FastAPI, scope: Scope) -> str:
+    """
+    Route template matching the request
+
+    Templates are used as label values instead of raw paths, so the number
+    of time series does not grow with path parameters
+
+    :param FastAPI application: The FastAPI application
+    :param Scope scope: The request scope
+
+    :return str: Route template, "unmatched" for unknown paths
+    """
+    for route in application.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return str(getattr(route, "path", UNMATCHED_ROUTE))
+    return UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """
+    Middleware measuring latency and concurrency of HTTP requests per route
+
+    The middleware works on ASGI level, so the latency of streamed responses
+    includes the whole body
+    """
+
+    def __init__(self, app: ASGIApp, application: FastAPI) -> None:
+        """
+        Initializes the PrometheusMiddleware
+
+        :param ASGIApp app: The next ASGI application
+        :param FastAPI application: The application which routes are matched
+        """
+        self.app = app
+        self.application = application
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Processing the request and recording its metrics
+
+        :param Scope scope: The request scope
+        :param Receive receive: The receive channel
+        :param Send send: The send channel
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method: str = scope["method"]
+        route = find_route_path(self.application, scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method=method, route=route)
+        in_progress.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION_SECONDS.labels(
+                method=method, route=route, status_code=str(status_code)
+            ).observe(time.perf_counter() - started_at)
+            in_progress.dec()
+
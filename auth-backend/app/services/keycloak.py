@@ -5,10 +5,17 @@ from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
+from jose import jwt
 from jose.exceptions import JWTError
 from jwcrypto.jws import InvalidJWSObject, InvalidJWSSignature
 from jwcrypto.jwt import JWTExpired
 
+from app.caches.token_cache import (
+    fetch_introspection,
+    fetch_session_id,
+    invalidate_session,
+    store_introspection,
+)
 from app.configs.logging_handler import configure_logging_handler
 from app.schemas.auth import TokenResponseCallbackSchema, TokenResponseSchema
 from keycloak import KeycloakAdmin
@@ -404,9 +411,16 @@ async def introspect_token(token: str) -> dict[str, Any] | Any:
 
     :param str token: The token string
 
+    Active results are kept in the shared KeyDB tier until the token expiration
+    and reused for repeated requests with the same token
+
     :returns dict token: New token verification
     """
     try:
+        token_info = await fetch_introspection(token=token)
+        if token_info is not None:
+            return token_info
+
         token_info = await keycloak_openid.a_introspect(token=token)
 
         if not token_info.get("active"):
@@ -415,6 +429,7 @@ async def introspect_token(token: str) -> dict[str, Any] | Any:
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Token is not active"
             )
 
+        await store_introspection(token=token, token_info=token_info)
         return token_info
 
     except Exception as exception:
@@ -633,12 +648,21 @@ async def logout(token: str) -> dict[str, Any] | Any:
     """
     Log out the authenticated user
 
+    Cached introspection results of the finished session are invalidated
+
     :param str token: Keycloak token for refreshing
 
     :returns dict: Keycloak server response
     """
     try:
-        return await keycloak_openid.a_logout(refresh_token=token)
+        logout_response = await keycloak_openid.a_logout(refresh_token=token)
+        try:
+            session_id = fetch_session_id(jwt.get_unverified_claims(token))
+        except JWTError:
+            session_id = None
+        if session_id:
+            await invalidate_session(session_id=session_id)
+        return logout_response
     except KeycloakPostError as error:
         logger.exception("Error - %s", error)
         raise HTTPException(
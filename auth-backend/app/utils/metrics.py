@@ -0,0 +1,31 @@
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+HTTP_REQUEST_DURATION_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status_code"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being processed by route",
+    ["method", "route"],
+)
+KAFKA_MESSAGES_PRODUCED_TOTAL = Counter(
+    "kafka_messages_produced_total", "Kafka messages produced", ["topic", "result"]
+)
+
+
+async def metrics_endpoint() -> Response:
+    """
+    Metrics in Prometheus text format
+
+    :returns Response: Current values of all metrics
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,6 +1,7 @@
 import os
 
 from app.configs.logging_handler import configure_logging_handler
+from app.utils.metrics import InstrumentedAsyncAdaptedQueuePool, instrument_engine_pool
 from dotenv import load_dotenv
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
@@ -13,14 +14,32 @@ logger = configure_logging_handler()
 Base = declarative_base()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional streaming replica for read-only queries, primary is used if absent
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
 
 # Async engine creation
-engine = create_async_engine(url=DATABASE_URL, echo=True)
+engine = create_async_engine(
+    url=DATABASE_URL, echo=True, poolclass=InstrumentedAsyncAdaptedQueuePool
+)
+instrument_engine_pool(engine)
+
+if DATABASE_REPLICA_URL:
+    replica_engine = create_async_engine(
+        url=DATABASE_REPLICA_URL,
+        echo=True,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+    )
+    instrument_engine_pool(replica_engine)
+else:
+    replica_engine = engine
 
 # Sessionmaker creation
 ASYNC_SESSION_LOCAL = async_sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
+ASYNC_REPLICA_SESSION_LOCAL = async_sessionmaker(
+    bind=replica_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 
 async def get_db() -> AsyncSession:
@@ -34,15 +53,19 @@ async def get_db() -> AsyncSession:
     logger.info("Database session was created")
 
 
-async def execute_raw_sql(query: str, params: dict = None) -> list:
+async def execute_raw_sql(
+    query: str, params: dict = None, read_only: bool = False
+) -> list:
     """
     Executing raw SQL query
 
     :param str query: The SQL query to execute
     :param dict params: Optional parameters for the SQL query
+    :param bool read_only: Whether the query is served by the read replica
 
     :return list: List of results from the query
     """
-    async with ASYNC_SESSION_LOCAL() as session:
+    session_factory = ASYNC_REPLICA_SESSION_LOCAL if read_only else ASYNC_SESSION_LOCAL
+    async with session_factory() as session:
         result = await session.execute(text(query), params)
         return result.fetchall()
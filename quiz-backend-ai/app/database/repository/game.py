@@ -8,8 +8,7 @@ class CRUDGame:
     """
     Class for handling CRUD operations related to games in the database
 
-    The class provides methods to fetch user IDs associated with games and 
-    retrieve completed games along with their scores
+    The class provides methods to fetch user IDs associated with games
     """
     @staticmethod
     async def fetch_user_id_with_games() -> list[UUID]:
@@ -20,7 +19,7 @@ class CRUDGame:
         at least one started game are presented
         """
         query = "SELECT DISTINCT id, user_sub_id FROM games"
-        results = await execute_raw_sql(query)
+        results = await execute_raw_sql(query, read_only=True)
 
         # Create a defaultdict to hold lists of ids for each user_sub_id
         user_sub_id_dict = defaultdict(list)
@@ -36,19 +35,3 @@ class CRUDGame:
             for user_sub_id, game_ids in user_sub_id_dict.items()
             for game_id in game_ids
         }  # Extracting the first column from each row
-
-    @staticmethod
-    async def fetch_completed_games_with_scores(user_sub_id: str) -> list:
-        """
-        Fetches scores of completed games
-        
-        :return list: The list with user correct scores and
-        incorrect scores 
-        """
-
-        query = """
-        SELECT correct_score, incorrect_score FROM games 
-        WHERE user_sub_id = :user_sub_id AND status = 'completed'
-        """
-        params = {"user_sub_id": user_sub_id}
-        return await execute_raw_sql(query, params)
@@ -1,13 +1,15 @@
 import os
 from typing import Final
 
-from aiokafka import AIOKafkaConsumer
+from aiokafka import AIOKafkaConsumer, ConsumerRecord, TopicPartition
 from aiokafka.errors import (
+    CommitFailedError,
     KafkaConnectionError,
     KafkaError,
     KafkaTimeoutError,
 )
 from app.configs.logging_handler import configure_logging_handler
+from app.utils.metrics import KAFKA_MESSAGES_CONSUMED_TOTAL
 from dotenv import load_dotenv
 from fastapi import HTTPException, Request, status
 
@@ -17,6 +19,15 @@ load_dotenv()
 
 KAFKA_HOSTNAME: Final[str] = os.getenv("KAFKA_HOSTNAME")
 KAFKA_PORT: Final[str] = os.getenv("KAFKA_PORT")
+# Replicas sharing the group split the topic partitions between them
+KAFKA_GROUP_ID: Final[str] = os.getenv("KAFKA_GROUP_ID") or "quiz-backend-ai"
+# Offset used by the group without committed offsets
+KAFKA_AUTO_OFFSET_RESET: Final[str] = os.getenv("KAFKA_AUTO_OFFSET_RESET", "latest")
+# Batch processing includes LLM calls, the consumer leaves the group if the
+# next poll does not happen within this interval
+KAFKA_MAX_POLL_INTERVAL_MS: Final[int] = int(
+    os.getenv("KAFKA_MAX_POLL_INTERVAL_MS", "900000")
+)
 
 
 class KafkaConsumer:
@@ -24,10 +35,14 @@ class KafkaConsumer:
     Managing Kafka topics using Kafka Consumer
 
     This class provides methods for starting the connection to the Kafka container
-    and consuming messages from Kafka topics, as well as to start and stop the Kafka consumer
+    and consuming messages from Kafka topics, as well as to start and stop the Kafka consumer.
+    Offsets are not committed automatically, the batch is committed with
+    commit_messages after it has been processed
     """
 
-    def __init__(self, bootstrap_servers: str, topic: str):
+    def __init__(
+        self, bootstrap_servers: str, topic: str, group_id: str = KAFKA_GROUP_ID
+    ):
         """
         Initialize the KafkaConsumer instance
 
@@ -37,10 +52,18 @@ class KafkaConsumer:
         """
         self.bootstrap_servers = bootstrap_servers
         self.topic = topic
+        self.group_id = group_id
         self.consumer = AIOKafkaConsumer(
             self.topic,
             bootstrap_servers=self.bootstrap_servers,
-         )
+            group_id=self.group_id,
+            enable_auto_commit=False,
+            auto_offset_reset=KAFKA_AUTO_OFFSET_RESET,
+            max_poll_interval_ms=KAFKA_MAX_POLL_INTERVAL_MS,
+        )
+        # Partitions without committed offset are rewound to the first
+        # message fetched from them
+        self.first_fetched_offsets: dict[TopicPartition, int] = {}
 
     async def start(self):
         """
@@ -69,20 +92,34 @@ class KafkaConsumer:
 
     async def consume_messages_list(
         self, timeout_ms: int = 1000, max_records_limit: int = 10000
-    ) -> None:
+    ) -> list[ConsumerRecord]:
         """
-        Consume messages from the Kafka topic
+        Consume messages from all assigned partitions of the Kafka topic
+
+        :param int timeout_ms: Time to wait for messages
+        :param int max_records_limit: Maximal number of messages in the batch
 
-        :param Callable callback: A function to process the consumed messages
+        :return list[ConsumerRecord]: Messages of all partitions, ordered
+        within every partition
         """
         messages = []
         try:
             records = await self.consumer.getmany(
                 timeout_ms=timeout_ms, max_records=max_records_limit
             )
-            for _, messages in records.items():
-                for message in messages:
-                    logger.info("Consumed message: %s", message.value.decode('utf-8'))
+            for topic_partition, partition_messages in records.items():
+                self.first_fetched_offsets.setdefault(
+                    topic_partition, partition_messages[0].offset
+                )
+                KAFKA_MESSAGES_CONSUMED_TOTAL.labels(topic=topic_partition.topic).inc(
+                    len(partition_messages)
+                )
+                logger.info(
+                    "Consumed %s messages from %s",
+                    len(partition_messages),
+                    topic_partition,
+                )
+                messages.extend(partition_messages)
 
             return messages
 
@@ -97,6 +134,54 @@ class KafkaConsumer:
                 detail=f"Failed to consume message from Kafka, because of {str(exception)}",
             ) from exception
 
+    async def commit_messages(self, messages: list[ConsumerRecord]) -> bool:
+        """
+        Committing offsets following the processed messages
+
+        Offsets are calculated from the messages, so messages fetched later
+        are not committed before they are processed
+
+        :param list[ConsumerRecord] messages: The processed messages
+
+        :return bool: Whether the offsets were committed, the messages are
+        delivered again if the partitions were reassigned meanwhile
+        """
+        offsets: dict[TopicPartition, int] = {}
+        for message in messages:
+            topic_partition = TopicPartition(message.topic, message.partition)
+            offsets[topic_partition] = max(
+                offsets.get(topic_partition, 0), message.offset + 1
+            )
+        if not offsets:
+            return True
+        try:
+            await self.consumer.commit(offsets)
+            return True
+        except CommitFailedError as error:
+            logger.warning(
+                "Kafka offsets commit failed, batch is redelivered: %s", error
+            )
+            return False
+
+    async def rewind_to_committed(self):
+        """
+        Moving the positions of the assigned partitions back to the committed
+        offsets, so fetched but not committed messages are consumed again
+
+        The group without committed offsets would continue from the latest
+        offset by KAFKA_AUTO_OFFSET_RESET, so these partitions are moved to
+        the first fetched message instead. Partitions without fetched
+        messages keep their positions
+        """
+        for topic_partition in self.consumer.assignment():
+            committed_offset = await self.consumer.committed(topic_partition)
+            if committed_offset is not None:
+                self.consumer.seek(topic_partition, committed_offset)
+            elif topic_partition in self.first_fetched_offsets:
+                self.consumer.seek(
+                    topic_partition, self.first_fetched_offsets[topic_partition]
+                )
+
     async def stop(self):
         """
         Stop the Kafka consumer
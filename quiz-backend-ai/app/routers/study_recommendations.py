@@ -1,30 +1,20 @@
-import os
-from typing import Final
-
-from app.kafka.kafka_consumer import get_consumer
-from app.services.create_recommendations import process_game_messages
-from dotenv import load_dotenv
+from app.services.create_recommendations import RecommendationsPipeline, get_pipeline
 from fastapi import APIRouter, Depends
 
-load_dotenv()
-
-KAFKA_HOSTNAME: Final[str] = os.getenv("KAFKA_HOSTNAME")
-KAFKA_PORT: Final[str] = os.getenv("KAFKA_PORT")
-
 router = APIRouter()
 
 
 @router.get("/receive")
 async def receive_recommendataion(
-    consumer=Depends(get_consumer),
+    pipeline: RecommendationsPipeline = Depends(get_pipeline),
 ) -> dict:
     """
     Receiving recommendations.
-    The asynchronous router takes message body content as input
-    and sends it to the specified Kafka topic using the Kafka producer
+    Game messages are processed continuously by the recommendations pipeline,
+    the router reports its state and the last generated recommendations
 
-    :param consumer: Application consumer state
+    :param RecommendationsPipeline pipeline: Application pipeline state
 
-    :return dict: Response indicating the status of the sending message
+    :return dict: Response indicating the status of the pipeline
     """
-    return await process_game_messages(consumer=consumer)
+    return {"status": "success", "pipeline": pipeline.describe()}
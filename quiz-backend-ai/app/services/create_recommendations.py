@@ -1,55 +1,332 @@
+import asyncio
 import os
-from typing import Final
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Final
 
+from aiokafka import ConsumerRecord
 from app.configs.logging_handler import configure_logging_handler
 from app.kafka.kafka_consumer import KafkaConsumer
+from app.utils.metrics import AI_PIPELINE_QUEUE_BATCHES, AI_STAGE_DURATION_SECONDS
 from app.utils.process_results import ResultsProcessing
 from dotenv import load_dotenv
+from fastapi import Request
+from qdrant_client import models
 
 logger = configure_logging_handler()
 
 load_dotenv()
 
-KAFKA_HOSTNAME: Final[str] = os.getenv("KAFKA_HOSTNAME")
-KAFKA_PORT: Final[str] = os.getenv("KAFKA_PORT")
+RECOMMENDATIONS_COLLECTION_NAME: Final[str] = "game_recommendations"
+# The batch is passed on when it reaches the size or when the window since
+# its first message elapses, whatever comes first
+AI_PIPELINE_BATCH_SIZE: Final[int] = int(os.getenv("AI_PIPELINE_BATCH_SIZE", "500"))
+AI_PIPELINE_BATCH_WINDOW_MS: Final[int] = int(
+    os.getenv("AI_PIPELINE_BATCH_WINDOW_MS", "2000")
+)
+# Batches waiting before every stage, the upstream stage blocks when the
+# queue is full, so consuming slows down to the slowest stage
+AI_PIPELINE_QUEUE_SIZE: Final[int] = int(os.getenv("AI_PIPELINE_QUEUE_SIZE", "2"))
+AI_PIPELINE_RESTART_DELAY_SECONDS: Final[float] = float(
+    os.getenv("AI_PIPELINE_RESTART_DELAY_SECONDS", "5")
+)
+AI_PIPELINE_SHUTDOWN_TIMEOUT_SECONDS: Final[float] = float(
+    os.getenv("AI_PIPELINE_SHUTDOWN_TIMEOUT_SECONDS", "30")
+)
 
 
-async def process_game_messages(consumer: KafkaConsumer):
+@dataclass
+class PipelineBatch:
     """
-    Receive messages from a Kafka topic and process them.
+    Consumed messages and results of the stages passed by them
 
-    This function consumes messages from the Kafka topic, processes the results,
-    and generates recommendations based on the game results.
+    :param list[ConsumerRecord] messages: The consumed Kafka messages
+    :param dict game_results: Decoded messages organized by game mode
+    :param list[models.PointStruct] points: Embedded game results
+    :param Any statistics: Statistics grouped by user and mode
+    """
+
+    messages: list[ConsumerRecord]
+    game_results: dict = field(default_factory=dict)
+    points: list[models.PointStruct] = field(default_factory=list)
+    statistics: Any = None
+
+
+class RecommendationsPipeline:
+    """
+    Continuous processing of the game messages into recommendations
+
+    The consuming task micro-batches messages and every stage (decode, embed,
+    upsert, aggregate, recommend) is a worker task taking batches from its
+    bounded queue, so the stages of consecutive batches overlap. Batches pass
+    the stages in order and offsets are committed after the recommend stage,
+    so a failed batch and all batches after it are consumed again after the
+    pipeline restart
+    """
+
+    def __init__(
+        self,
+        consumer: KafkaConsumer,
+        batch_size: int = AI_PIPELINE_BATCH_SIZE,
+        batch_window_ms: int = AI_PIPELINE_BATCH_WINDOW_MS,
+        queue_size: int = AI_PIPELINE_QUEUE_SIZE,
+    ):
+        """
+        Initialize the RecommendationsPipeline instance
+
+        :param KafkaConsumer consumer: Started Kafka consumer
+        :param int batch_size: Maximal number of messages in the batch
+        :param int batch_window_ms: Maximal time of the batch collecting
+        :param int queue_size: Maximal number of batches waiting for a stage
+        """
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.batch_window_ms = batch_window_ms
+        self.queue_size = queue_size
+        self.stopping = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.queues: dict[str, asyncio.Queue] = {}
+        self.processed_batches = 0
+        self.processed_messages = 0
+        self.last_recommendations: list[dict] = []
+
+    def start(self) -> asyncio.Task:
+        """
+        Running the pipeline in the background task
+
+        :return asyncio.Task: The pipeline task
+        """
+        self.stopping.clear()
+        self.task = asyncio.create_task(self.run(), name="recommendations-pipeline")
+        return self.task
+
+    async def stop(self, timeout: float = AI_PIPELINE_SHUTDOWN_TIMEOUT_SECONDS):
+        """
+        Stopping consuming and waiting for the queued batches to be processed
+
+        The pipeline is cancelled after the timeout, its uncommitted batches
+        are consumed again by the next start
+
+        :param float timeout: Maximal draining time in seconds
+        """
+        if self.task is None:
+            return
+        self.stopping.set()
+        try:
+            await asyncio.wait_for(self.task, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Recommendations pipeline was cancelled before draining")
+        except Exception:
+            logger.exception("Recommendations pipeline failed during draining")
+        self.task = None
+
+    async def run(self):
+        """
+        Running the stages until the pipeline is stopped, the stages are
+        restarted from the committed offsets after any failure
+        """
+        while not self.stopping.is_set():
+            try:
+                await self.consumer.rewind_to_committed()
+                await self.run_stages()
+            except Exception:
+                logger.exception(
+                    "Recommendations pipeline failed, restarting in %s seconds",
+                    AI_PIPELINE_RESTART_DELAY_SECONDS,
+                )
+                try:
+                    await asyncio.wait_for(
+                        self.stopping.wait(), timeout=AI_PIPELINE_RESTART_DELAY_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                for queue_name in self.queues:
+                    AI_PIPELINE_QUEUE_BATCHES.labels(queue=queue_name).set(0)
+
+    async def run_stages(self):
+        """
+        Connecting the consuming task and stage workers with bounded queues
+
+        The first failed task cancels all the others
+        """
+        self.queues = {
+            stage: asyncio.Queue(maxsize=self.queue_size)
+            for stage in ("decode", "embed", "upsert", "aggregate", "recommend")
+        }
+        stages: list[tuple[str, Callable[[PipelineBatch], Awaitable[None]]]] = [
+            ("decode", self.decode_batch),
+            ("embed", self.embed_batch),
+            ("upsert", self.upsert_batch),
+            ("aggregate", self.aggregate_batch),
+            ("recommend", self.recommend_batch),
+        ]
+        async with asyncio.TaskGroup() as task_group:
+            task_group.create_task(self.collect_batches(target="decode"))
+            for index, (stage, handler) in enumerate(stages):
+                target = stages[index + 1][0] if index + 1 < len(stages) else None
+                task_group.create_task(
+                    self.run_stage(stage=stage, handler=handler, target=target)
+                )
+
+    async def put_batch(self, queue_name: str, batch: PipelineBatch | None):
+        """
+        Passing the batch to the stage queue, waiting while the queue is full
+
+        :param str queue_name: The queue of the next stage
+        :param PipelineBatch | None batch: The batch, None ends the stage
+        """
+        queue = self.queues[queue_name]
+        await queue.put(batch)
+        AI_PIPELINE_QUEUE_BATCHES.labels(queue=queue_name).set(queue.qsize())
+
+    async def get_batch(self, queue_name: str) -> PipelineBatch | None:
+        """
+        Taking the next batch from the stage queue
+
+        :param str queue_name: The queue of the stage
+
+        :return PipelineBatch | None: The batch, None if the stage is ended
+        """
+        queue = self.queues[queue_name]
+        batch = await queue.get()
+        AI_PIPELINE_QUEUE_BATCHES.labels(queue=queue_name).set(queue.qsize())
+        return batch
+
+    async def collect_batches(self, target: str):
+        """
+        Consuming messages into batches until the pipeline is stopped
+
+        :param str target: The queue of the first stage
+        """
+        loop = asyncio.get_running_loop()
+        while not self.stopping.is_set():
+            messages = await self.consumer.consume_messages_list(
+                timeout_ms=self.batch_window_ms, max_records_limit=self.batch_size
+            )
+            if not messages:
+                continue
+            deadline = loop.time() + self.batch_window_ms / 1000
+            while len(messages) < self.batch_size and not self.stopping.is_set():
+                remaining_ms = int((deadline - loop.time()) * 1000)
+                if remaining_ms <= 0:
+                    break
+                messages.extend(
+                    await self.consumer.consume_messages_list(
+                        timeout_ms=remaining_ms,
+                        max_records_limit=self.batch_size - len(messages),
+                    )
+                )
+            await self.put_batch(target, PipelineBatch(messages=messages))
+        await self.put_batch(target, None)
+
+    async def run_stage(
+        self,
+        stage: str,
+        handler: Callable[[PipelineBatch], Awaitable[None]],
+        target: str | None,
+    ):
+        """
+        Processing batches of the stage queue one by one
+
+        :param str stage: The stage name, also the name of its queue
+        :param Callable[[PipelineBatch], Awaitable[None]] handler: The stage
+        processing of the batch
+        :param str | None target: The queue of the next stage, None for the
+        last one
+        """
+        while (batch := await self.get_batch(stage)) is not None:
+            with AI_STAGE_DURATION_SECONDS.labels(stage=stage).time():
+                await handler(batch)
+            if target is not None:
+                await self.put_batch(target, batch)
+        if target is not None:
+            await self.put_batch(target, None)
+
+    async def decode_batch(self, batch: PipelineBatch):
+        """
+        Decoding the batch messages and organizing them by game mode
+
+        :param PipelineBatch batch: The processed batch
+        """
+        batch.game_results = await ResultsProcessing.order_game_results(
+            game_results=batch.messages
+        )
+
+    async def embed_batch(self, batch: PipelineBatch):
+        """
+        Generating embeddings of the batch questions
+
+        :param PipelineBatch batch: The processed batch
+        """
+        batch.points = await ResultsProcessing.embed_game_results(
+            game_results=batch.game_results
+        )
+
+    async def upsert_batch(self, batch: PipelineBatch):
+        """
+        Storing the batch embeddings in Qdrant
+
+        :param PipelineBatch batch: The processed batch
+        """
+        await ResultsProcessing.upsert_points(
+            points=batch.points, collection_name=RECOMMENDATIONS_COLLECTION_NAME
+        )
+
+    async def aggregate_batch(self, batch: PipelineBatch):
+        """
+        Generating statistics of the collection updated by the batch
+
+        :param PipelineBatch batch: The processed batch
+        """
+        if batch.points:
+            batch.statistics = await ResultsProcessing.generate_statistics(
+                collection_name=RECOMMENDATIONS_COLLECTION_NAME
+            )
+
+    async def recommend_batch(self, batch: PipelineBatch):
+        """
+        Generating recommendations and committing the batch offsets
+
+        Offsets are committed only after the batch is embedded, aggregated
+        and persisted, so the batch interrupted by a crash is processed again
+
+        :param PipelineBatch batch: The processed batch
+        """
+        if batch.statistics is not None:
+            self.last_recommendations = (
+                await ResultsProcessing.generate_recommendations(
+                    statistics=batch.statistics
+                )
+            )
+        await self.consumer.commit_messages(messages=batch.messages)
+        self.processed_batches += 1
+        self.processed_messages += len(batch.messages)
+
+    def describe(self) -> dict:
+        """
+        Current state of the pipeline
+
+        :return dict: Running flag, processed counters, queued batches per
+        stage and the last generated recommendations
+        """
+        return {
+            "running": self.task is not None and not self.task.done(),
+            "processed_batches": self.processed_batches,
+            "processed_messages": self.processed_messages,
+            "queued_batches": {
+                queue_name: queue.qsize() for queue_name, queue in self.queues.items()
+            },
+            "last_recommendations": self.last_recommendations,
+        }
+
+
+async def get_pipeline(request: Request) -> RecommendationsPipeline:
+    """
+    Dependency function to retrieve the recommendations pipeline from the
+    FastAPI application state
+
+    :param Request request: The FastAPI request object
 
-    :param db: Database session
-    :param consumer: Kafka consumer instance
-    :return dict: Response indicating the status of the processing
+    :return RecommendationsPipeline: The running pipeline
     """
-    logger.info("Processing game messages")
-    # Consume messages from Kafka
-    game_results = await consumer.consume_messages_list()
-
-    # Organize the results
-    organized_results = await ResultsProcessing.order_game_results(
-        game_results=game_results
-    )
-
-    # Process the organized results
-    await ResultsProcessing.process_game_results(
-        game_results=organized_results, collection_name="game_recommendations"
-    )
-
-    # Generate statistics from the processed results
-    statistics = await ResultsProcessing.generate_statistics(
-        collection_name="game_recommendations"
-    )
-
-    # Generate recommendations based on the statistics
-    recommendation_results = await ResultsProcessing.generate_recommendations(
-        statistics=statistics
-    )
-
-    return {
-        "status": "success",
-        "message": f"Generated recommendation results are {recommendation_results}",
-    }
+    return request.app.state.pipeline
@@ -0,0 +1,173 @@
+import time
+from typing import Any
+
+from fastapi import FastAPI, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+HTTP_REQUEST_DURATION_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status_code"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being processed by route",
+    ["method", "route"],
+)
+DB_POOL_CHECKOUTS_TOTAL = Counter(
+    "db_pool_checkouts_total", "Database connections checked out from the pool"
+)
+DB_POOL_CHECKED_OUT_CONNECTIONS = Gauge(
+    "db_pool_checked_out_connections", "Database connections currently checked out"
+)
+DB_POOL_ACQUIRE_DURATION_SECONDS = Histogram(
+    "db_pool_acquire_duration_seconds",
+    "Time spent waiting for a database connection from the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+KAFKA_MESSAGES_CONSUMED_TOTAL = Counter(
+    "kafka_messages_consumed_total", "Kafka messages consumed", ["topic"]
+)
+KAFKA_MESSAGES_PRODUCED_TOTAL = Counter(
+    "kafka_messages_produced_total", "Kafka messages produced", ["topic", "result"]
+)
+AI_STAGE_DURATION_SECONDS = Histogram(
+    "ai_stage_duration_seconds",
+    "Duration of the recommendations pipeline stages",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+AI_PIPELINE_QUEUE_BATCHES = Gauge(
+    "ai_pipeline_queue_batches",
+    "Batches waiting in the recommendations pipeline queue for the next stage",
+    ["queue"],
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def find_route_path(application: ASGIApp, scope: Scope) -> str:
+    """
+    Route template matching the request
+
+    Templates are used as label values instead of raw paths, so the number
+    of time series does not grow with path parameters
+
+    :param ASGIApp application: The FastAPI application
+    :param Scope scope: The request scope
+
+    :return str: Route template, "unmatched" for unknown paths
+    """
+    for route in getattr(application, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class PrometheusMiddleware:
+    """
+    Measuring latency and concurrency of HTTP requests per route
+
+    The middleware works on ASGI level, so the latency of streamed responses
+    includes the whole body
+    """
+
+    def __init__(self, app: ASGIApp, application: FastAPI):
+        """
+        Initialize the PrometheusMiddleware instance
+
+        :param ASGIApp app: The next ASGI application
+        :param FastAPI application: The application which routes are matched
+        """
+        self.app = app
+        self.application = application
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Processing the request and recording its metrics
+
+        :param Scope scope: The request scope
+        :param Receive receive: The receive channel
+        :param Send send: The send channel
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = find_route_path(self.application, scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method=method, route=route)
+        in_progress.inc()
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION_SECONDS.labels(
+                method=method, route=route, status_code=str(status_code)
+            ).observe(time.perf_counter() - started_at)
+            in_progress.dec()
+
+
+async def metrics_endpoint() -> Response:
+    """
+    Metrics in Prometheus text format
+
+    :return Response: Current values of all metrics
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Asynchronous queue pool measuring time of connection acquiring
+    """
+
+    def _do_get(self) -> Any:
+        """
+        Connection acquiring, including waiting for a free pool slot
+
+        :return Any: Pooled connection record
+        """
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_ACQUIRE_DURATION_SECONDS.observe(time.perf_counter() - started_at)
+
+
+def instrument_engine_pool(engine: AsyncEngine) -> None:
+    """
+    Counting checkouts and checked out connections of the engine pool
+
+    :param AsyncEngine engine: The asynchronous database engine
+    """
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def on_checkout(*_: Any) -> None:
+        DB_POOL_CHECKOUTS_TOTAL.inc()
+        DB_POOL_CHECKED_OUT_CONNECTIONS.inc()
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def on_checkin(*_: Any) -> None:
+        DB_POOL_CHECKED_OUT_CONNECTIONS.dec()
+
@@ -9,6 +9,8 @@ from app.configs.logging_handler import configure_logging_handler
 from app.database.repository.game import CRUDGame
 from app.database.schemas import ScoredPointModel
 from app.utils.keydb import keydb_instance
+from app.utils.metrics import AI_STAGE_DURATION_SECONDS
+from app.utils.wire_format import decode_message
 from dotenv import load_dotenv
 from fastapi import HTTPException, status
 from langchain_core.prompts import ChatPromptTemplate
@@ -26,6 +28,11 @@ SENTENCE_MODEL_IN_USE = os.getenv("SENTENCE_MODEL_IN_USE")
 LARGE_LANGUAGE_MODEL_IN_USE = os.getenv("LARGE_LANGUAGE_MODEL_IN_USE")
 OLLAMA_HOSTNAME = os.getenv("OLLAMA_HOSTNAME")
 OLLAMA_PORT = os.getenv("OLLAMA_PORT")
+# Questions encoded by one forward pass of the sentence model
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Points written by one upsert request and requests running at once
+QDRANT_UPSERT_CHUNK_SIZE = int(os.getenv("QDRANT_UPSERT_CHUNK_SIZE", "256"))
+QDRANT_UPSERT_PARALLELISM = int(os.getenv("QDRANT_UPSERT_PARALLELISM", "4"))
 
 logger = configure_logging_handler()
 
@@ -47,19 +54,25 @@ class ResultsProcessing:
     async def order_game_results(cls, game_results: list) -> defaultdict:
         """
         Generate organized statistics for processing game results.
-        The method takes a list of game results, decodes and parses each result,
-        and organizes them by game mode. It returns a defaultdict containing the
-        organized results.
+        The method takes a list of game results, decodes each result according
+        to its wire format header and organizes them by game mode. It returns
+        a defaultdict containing the organized results.
 
         :param list game_results: List of game result records, where each record
-                            contains a JSON-encoded string with game data
+                            contains msgpack or JSON encoded game data
         :return: Defaultdict where keys are game modes and values are lists
                 of game data associated with each mode
         """
         organized_results = defaultdict(list)
         for record in game_results:
-            value = record.value.decode("utf-8")
-            data = json.loads(value)  # Parse t`he JSON string
+            try:
+                data = decode_message(value=record.value, headers=record.headers)
+            # Unknown formats, msgpack and JSON errors are all ValueError
+            except ValueError as error:
+                logger.warning(
+                    "Skipped undecodable record at offset %s: %s", record.offset, error
+                )
+                continue
             organized_results[data["mode"]].append(
                 data
             )  # Append the data to game_results
@@ -95,39 +108,80 @@ class ResultsProcessing:
             ) from error
 
     @classmethod
-    async def process_game_results(cls, game_results: list, collection_name: str):
+    async def embed_game_results(
+        cls, game_results: dict, batch_size: int = EMBEDDING_BATCH_SIZE
+    ) -> list[models.PointStruct]:
+        """
+        Generates embeddings of the organized game results questions
+
+        All questions are encoded by one model call in batches, points of the
+        same game are reduced to the last one, as they share the point ID
+
+        :param dict game_results: Organized game results
+        :param int batch_size: Questions encoded by one forward pass
+
+        :return list[models.PointStruct]: Qdrant points with gameId as ID, the
+        question embedding as vector and the original data as payload
         """
-        Generates embeddings for game results and stores them in Qdrant
+        games_data = {
+            question_data["gameId"]: question_data
+            for questions in game_results.values()
+            for question_data in questions
+        }
+        if not games_data:
+            return []
+        logger.info("Encoding %s questions", len(games_data))
+        embeddings = await asyncio.to_thread(
+            cls.model.encode,
+            [question_data["question"] for question_data in games_data.values()],
+            batch_size=batch_size,
+        )  # Use asyncio.to_thread for blocking call
+        return [
+            models.PointStruct(
+                id=game_id, vector=embedding.tolist(), payload=question_data
+            )
+            for (game_id, question_data), embedding in zip(
+                games_data.items(), embeddings
+            )
+        ]
 
-        :param list game_results: A list of organized game results
+    @classmethod
+    async def upsert_points(
+        cls,
+        points: list[models.PointStruct],
+        collection_name: str,
+        chunk_size: int = QDRANT_UPSERT_CHUNK_SIZE,
+        parallelism: int = QDRANT_UPSERT_PARALLELISM,
+    ):
+        """
+        Stores the embedded game results in Qdrant
+
+        Points are written in chunks by concurrent upsert requests, the
+        points IDs have to be unique, so the order of chunks does not matter
+
+        :param list[models.PointStruct] points: Qdrant points of the game results
         :param str collection_name: The name of the collection to store results
+        :param int chunk_size: Points written by one upsert request
+        :param int parallelism: Maximal number of concurrent upsert requests
         """
-        # Initialize Async Qdrant client
+        if not points:
+            return
         await cls.create_collection(collection_name=collection_name)
-        # Initialize the SentenceTransformer model
-        # Generate embeddings and store in Qdrant, organized by mode
-        for _, questions in game_results.items():
-            for question_data in questions:
-                question = question_data["question"]
-                logger.info("Question: %s", question)
-                # Generate embedding using SentenceTransformer
-                embedding = await asyncio.to_thread(
-                    cls.model.encode, question
-                )  # Use asyncio.to_thread for blocking call
-                # Upload the embedding to Qdrant
+        semaphore = asyncio.Semaphore(parallelism)
+
+        async def upsert_chunk(chunk: list[models.PointStruct]):
+            async with semaphore:
                 await cls.async_qdrant_client.upsert(
-                    collection_name=collection_name,
-                    points=[
-                        {
-                            "id": question_data[
-                                "gameId"
-                            ],  # Use gameId as the unique ID
-                            "vector": embedding.tolist(),
-                            "payload": question_data,  # Store original data as payload
-                        }
-                    ],
+                    collection_name=collection_name, points=chunk
                 )
 
+        await asyncio.gather(
+            *(
+                upsert_chunk(points[start : start + chunk_size])
+                for start in range(0, len(points), chunk_size)
+            )
+        )
+
     @classmethod
     async def fetch_game_data_from_qdrant(cls, collection_name: str) -> list[dict]:
         """
@@ -236,13 +290,15 @@ class ResultsProcessing:
             recommendation_text = prompt.invoke(
                 {"question": question, "context": context}
             )
-            recommendation_text_result = llm.invoke(recommendation_text)
+            with AI_STAGE_DURATION_SECONDS.labels(stage="llm").time():
+                recommendation_text_result = llm.invoke(recommendation_text)
             recommendations[user_sub_id] = re.sub(
                 r"<think>.*?</think>", "", recommendation_text_result, flags=re.DOTALL
             )
 
         # Final output report formation
         final_output = []
+        users_recommendations = defaultdict(dict)
 
         for _, row in statistics.iterrows():
             recommendations_dictionary = {
@@ -257,9 +313,18 @@ class ResultsProcessing:
             recommendations_dictionary["modeRecomendation"] = json.dumps(
                 recommendations[row["user_sub_id"]]
             )
-            keydb_instance.hmset(
-                name=f"{row['user_sub_id']}-recommendations-{row['mode']}",
-                mapping=recommendations_dictionary,
+            # Entries are stored already encoded, so they are served without decoding
+            users_recommendations[row["user_sub_id"]][row["mode"]] = json.dumps(
+                recommendations_dictionary, default=str
             )
 
+        # Recommendations of every user are kept in one hash with mode fields
+        with keydb_instance.pipeline(transaction=False) as pipeline:
+            for user_sub_id, mode_recommendations in users_recommendations.items():
+                pipeline.hset(
+                    name=f"recommendations:{user_sub_id}",
+                    mapping=mode_recommendations,
+                )
+            pipeline.execute()
+
         return final_output
@@ -0,0 +1,163 @@
+"""
+Throughput of embedding game results and storing them in Qdrant
+
+Game results are processed question by question, the way they were before
+batching, and with ResultsProcessing batched encoding and chunked parallel
+upserts. Every strategy writes into its own recreated collection. Run from
+the quiz-backend-ai directory against the Qdrant of .env or in-memory one:
+
+    python -m benchmarks.embedding_upsert --questions 2000
+    python -m benchmarks.embedding_upsert --qdrant-url :memory:
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from collections import defaultdict
+
+# The model of the .env file is used if it is set
+os.environ.setdefault("SENTENCE_MODEL_IN_USE", "all-MiniLM-L6-v2")
+
+from app.utils.process_results import (  # noqa: E402
+    EMBEDDING_BATCH_SIZE,
+    QDRANT_HOSTNAME,
+    QDRANT_PORT,
+    QDRANT_UPSERT_CHUNK_SIZE,
+    QDRANT_UPSERT_PARALLELISM,
+    ResultsProcessing,
+)
+from benchmarks.wire_format import generate_answer_messages  # noqa: E402
+from qdrant_client import AsyncQdrantClient, models  # noqa: E402
+
+
+def generate_game_results(questions_number: int) -> dict[str, list[dict]]:
+    """
+    Organized game results with unique game IDs
+
+    :param int questions_number: Number of questions
+
+    :return dict[str, list[dict]]: Game results by game mode
+    """
+    game_results = defaultdict(list)
+    for game_id, message in enumerate(
+        generate_answer_messages(questions_number), start=1
+    ):
+        message["gameId"] = game_id
+        game_results[message["mode"]].append(message)
+    return game_results
+
+
+async def process_per_question(game_results: dict, collection_name: str):
+    """
+    Encoding every question by its own model call and upserting every point
+    by its own request
+
+    :param dict game_results: Organized game results
+    :param str collection_name: The collection to store results
+    """
+    await ResultsProcessing.create_collection(collection_name=collection_name)
+    for questions in game_results.values():
+        for question_data in questions:
+            embedding = await asyncio.to_thread(
+                ResultsProcessing.model.encode, question_data["question"]
+            )
+            await ResultsProcessing.async_qdrant_client.upsert(
+                collection_name=collection_name,
+                points=[
+                    models.PointStruct(
+                        id=question_data["gameId"],
+                        vector=embedding.tolist(),
+                        payload=question_data,
+                    )
+                ],
+            )
+
+
+async def process_batched(game_results: dict, collection_name: str, **options):
+    """
+    Encoding all questions by one model call and upserting points in
+    concurrent chunks
+
+    :param dict game_results: Organized game results
+    :param str collection_name: The collection to store results
+    :param options: Batch size, chunk size and parallelism values
+    """
+    points = await ResultsProcessing.embed_game_results(
+        game_results=game_results, batch_size=options["batch_size"]
+    )
+    await ResultsProcessing.upsert_points(
+        points=points,
+        collection_name=collection_name,
+        chunk_size=options["chunk_size"],
+        parallelism=options["parallelism"],
+    )
+
+
+async def measure(strategy, game_results: dict, collection_name: str, **options):
+    """
+    Points per second of the strategy
+
+    :param strategy: The processing coroutine function
+    :param dict game_results: Organized game results
+    :param str collection_name: The collection to store results
+    :param options: Options of the strategy
+
+    :return float: Stored points per second
+    """
+    await ResultsProcessing.async_qdrant_client.delete_collection(collection_name)
+    started_at = time.perf_counter()
+    await strategy(game_results, collection_name, **options)
+    seconds = time.perf_counter() - started_at
+    stored = await ResultsProcessing.async_qdrant_client.count(collection_name)
+    await ResultsProcessing.async_qdrant_client.delete_collection(collection_name)
+    return stored.count / seconds
+
+
+async def main() -> None:
+    """
+    Printing the comparison table, question by question processing is the
+    baseline
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--qdrant-url", default=f"{QDRANT_HOSTNAME}:{QDRANT_PORT}")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--chunk-size", type=int, default=QDRANT_UPSERT_CHUNK_SIZE)
+    parser.add_argument("--parallelism", type=int, default=QDRANT_UPSERT_PARALLELISM)
+    arguments = parser.parse_args()
+
+    if arguments.qdrant_url == ":memory:":
+        ResultsProcessing.async_qdrant_client = AsyncQdrantClient(location=":memory:")
+    else:
+        ResultsProcessing.async_qdrant_client = AsyncQdrantClient(
+            url=arguments.qdrant_url
+        )
+    game_results = generate_game_results(arguments.questions)
+    # The first model call loads the weights, it is excluded from the results
+    ResultsProcessing.model.encode("warm up")
+
+    results = {
+        "per question": await measure(
+            process_per_question, game_results, "benchmark_per_question"
+        ),
+        "batched": await measure(
+            process_batched,
+            game_results,
+            "benchmark_batched",
+            batch_size=arguments.batch_size,
+            chunk_size=arguments.chunk_size,
+            parallelism=arguments.parallelism,
+        ),
+    }
+    baseline = results["per question"]
+    print(f"{'strategy':<14}{'points/s':>12}{'speedup':>9}")
+    for name, points_per_second in results.items():
+        print(
+            f"{name:<14}{points_per_second:>12.1f}"
+            f"{points_per_second / baseline:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+Kafka payload size and decoding cost of the wire formats
+
+Answer messages shaped like quiz-backend-chat AnswerMessage events are
+encoded in every format and decoded back the way the consumer does it.
+Run from the quiz-backend-ai directory:
+
+    python -m benchmarks.wire_format --messages 100000
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.utils.wire_format import (
+    ANSWER_MESSAGE_FORMAT,
+    JSON_FORMAT,
+    MSGPACK_FORMAT,
+    decode_message,
+    encode_message,
+)
+
+MODES = ("music", "arithmetic", "trigonometry")
+NOTES = ("C", "D", "E", "F", "G", "A", "B")
+
+
+def generate_answer_messages(messages_number: int) -> list[dict]:
+    """
+    Answer messages with realistic field values
+
+    :param int messages_number: Number of messages
+
+    :return list[dict]: Messages fields
+    """
+    started_at = datetime.now(timezone.utc)
+    messages = []
+    for index in range(messages_number):
+        mode = random.choice(MODES)
+        if mode == "music":
+            question, correct_answer = random.choice(NOTES), random.choice(NOTES)
+        else:
+            left, right = random.randint(1, 99), random.randint(1, 99)
+            question, correct_answer = f"{left} + {right}", str(left + right)
+        user_answer = random.choice((correct_answer, str(random.randint(1, 198))))
+        messages.append(
+            {
+                "gameId": random.randint(1, 1_000_000),
+                "mode": mode,
+                "question": question,
+                "userAnswer": user_answer,
+                "correctAnswer": correct_answer,
+                "isCorrect": user_answer == correct_answer,
+                "answerTime": (started_at + timedelta(milliseconds=index)).isoformat(),
+            }
+        )
+    return messages
+
+
+def measure_wire_format(messages: list[dict], wire_format: bytes) -> dict[str, float]:
+    """
+    Average record size, encoding and decoding time of the format
+
+    :param list[dict] messages: Messages fields
+    :param bytes wire_format: The measured format
+
+    :return dict[str, float]: Bytes, encoding and decoding microseconds per message
+    """
+    started_at = time.perf_counter()
+    records = [encode_message(message, wire_format) for message in messages]
+    encode_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    for value, headers in records:
+        decode_message(value=value, headers=headers)
+    decode_seconds = time.perf_counter() - started_at
+
+    return {
+        "bytes": sum(len(value) for value, _ in records) / len(records),
+        "encode_us": encode_seconds / len(records) * 1_000_000,
+        "decode_us": decode_seconds / len(records) * 1_000_000,
+    }
+
+
+def main() -> None:
+    """
+    Printing the comparison table, JSON is the baseline
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=100_000)
+    arguments = parser.parse_args()
+
+    messages = generate_answer_messages(arguments.messages)
+    results = {
+        wire_format.decode(): measure_wire_format(messages, wire_format)
+        for wire_format in (JSON_FORMAT, MSGPACK_FORMAT, ANSWER_MESSAGE_FORMAT)
+    }
+    baseline = results[JSON_FORMAT.decode()]
+    print(
+        f"{'format':<10}{'bytes/msg':>11}{'vs json':>9}"
+        f"{'encode us/msg':>15}{'decode us/msg':>15}{'vs json':>9}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<10}{result['bytes']:>11.1f}"
+            f"{result['bytes'] / baseline['bytes']:>9.2f}"
+            f"{result['encode_us']:>15.2f}{result['decode_us']:>15.2f}"
+            f"{result['decode_us'] / baseline['decode_us']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
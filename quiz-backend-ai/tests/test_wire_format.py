@@ -0,0 +1,43 @@
+import pytest
+
+from app.utils.wire_format import (
+    ANSWER_MESSAGE_FORMAT,
+    JSON_FORMAT,
+    MSGPACK_FORMAT,
+    decode_message,
+    encode_message,
+)
+
+ANSWER_MESSAGE = {
+    "gameId": 1,
+    "mode": "music",
+    "question": "Question",
+    "userAnswer": "Answer",
+    "correctAnswer": "Answer",
+    "isCorrect": True,
+    "answerTime": 3.5,
+}
+
+
+@pytest.mark.parametrize(
+    "wire_format", [ANSWER_MESSAGE_FORMAT, MSGPACK_FORMAT, JSON_FORMAT]
+)
+def test_decode_message_reads_encoded_message(wire_format):
+    """
+    Testing that the decoder used by the consumer reads every wire format.
+
+    The module imports msgpack, so the test also fails if the service is
+    installed without it
+
+    :param wire_format: The payload format written into the record header
+    """
+    value, headers = encode_message(message=ANSWER_MESSAGE, wire_format=wire_format)
+    assert decode_message(value=value, headers=headers) == ANSWER_MESSAGE
+
+
+def test_decode_message_reads_json_without_header():
+    """
+    Testing that the records without the format header are decoded as JSON.
+    """
+    value, _ = encode_message(message=ANSWER_MESSAGE, wire_format=JSON_FORMAT)
+    assert decode_message(value=value) == ANSWER_MESSAGE
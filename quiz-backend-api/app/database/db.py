@@ -1,10 +1,14 @@
 import os
 
 from dotenv import load_dotenv
+from fastapi import Request
+from redis import asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 
 from app.configs.logging_handler import configure_logging_handler
+from app.utils.metrics import InstrumentedAsyncAdaptedQueuePool, instrument_engine_pool
+from app.utils.token_cache import hash_token
 
 load_dotenv()
 
@@ -13,14 +17,35 @@ logger = configure_logging_handler()
 Base = declarative_base()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional streaming replica for read-only queries, primary is used if absent
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+# Clients which have just written read from the primary for this period,
+# so they see their own writes despite the replication lag
+DATABASE_PRIMARY_PIN_SECONDS = int(os.getenv("DATABASE_PRIMARY_PIN_SECONDS", "5"))
 
 # Async engine creation
-engine = create_async_engine(url=DATABASE_URL, echo=True)
+engine = create_async_engine(
+    url=DATABASE_URL, echo=True, poolclass=InstrumentedAsyncAdaptedQueuePool
+)
+instrument_engine_pool(engine)
+
+if DATABASE_REPLICA_URL:
+    replica_engine = create_async_engine(
+        url=DATABASE_REPLICA_URL,
+        echo=True,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+    )
+    instrument_engine_pool(replica_engine)
+else:
+    replica_engine = engine
 
 # Sessionmaker creation
 ASYNC_SESSION_LOCAL = async_sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
+ASYNC_REPLICA_SESSION_LOCAL = async_sessionmaker(
+    bind=replica_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 
 async def get_db() -> AsyncSession:
@@ -32,3 +57,64 @@ async def get_db() -> AsyncSession:
     async with ASYNC_SESSION_LOCAL() as session:
         yield session
     logger.info("Database session was created")
+
+
+async def get_replica_db() -> AsyncSession:
+    """
+    Read-only session obtaining for background jobs
+
+    The queries are served by the replica if it is configured
+
+    :yield AsyncSession session: Asynchronious session object
+    """
+    async with ASYNC_REPLICA_SESSION_LOCAL() as session:
+        yield session
+
+
+def build_primary_pin_key(token: str) -> str:
+    """
+    Key marking the client which has recently written
+
+    :param str token: The client access token
+
+    :return str: Pin key
+    """
+    return f"db:primary-pin:{hash_token(token)}"
+
+
+async def pin_primary_reads(keydb: aioredis.Redis, token: str) -> None:
+    """
+    Routing reads of the client to the primary for the pin period
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param str token: The client access token
+    """
+    if replica_engine is engine:
+        return
+    await keydb.set(
+        build_primary_pin_key(token), 1, ex=DATABASE_PRIMARY_PIN_SECONDS
+    )
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    Read-only session obtaining for request handlers
+
+    The queries are served by the replica, except for clients which have
+    written within the pin period
+
+    :param Request request: The FastAPI request object
+
+    :yield AsyncSession session: Asynchronious session object
+    """
+    session_factory = ASYNC_REPLICA_SESSION_LOCAL
+    authorization = request.headers.get("Authorization", "")
+    token = authorization.removeprefix("Bearer ").strip()
+    if (
+        replica_engine is not engine
+        and token
+        and await request.app.state.keydb.exists(build_primary_pin_key(token))
+    ):
+        session_factory = ASYNC_SESSION_LOCAL
+    async with session_factory() as session:
+        yield session
@@ -0,0 +1,35 @@
+"""Games hot query indexes
+
+Revision ID: 5b2e7c1d9a43
+Revises: cd9549457171
+Create Date: 2026-10-17 10:12:41.215388
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e7c1d9a43'
+down_revision: Union[str, None] = 'cd9549457171'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Indexes are built concurrently, so the games table is not locked for writes
+    with op.get_context().autocommit_block():
+        op.create_index('ix_games_user_sub_id_mode_name_status', 'games', ['user_sub_id', 'mode_name', 'status'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_games_in_progress_started_at', 'games', ['started_at'], unique=False, postgresql_where=sa.text("status = 'in_progress'"), postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_games_started_at_brin', 'games', ['started_at'], unique=False, postgresql_using='brin', postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_games_completed_finished_at_id', 'games', ['finished_at', 'id'], unique=False, postgresql_where=sa.text("status = 'completed'"), postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_games_completed_finished_at_id', table_name='games', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_games_started_at_brin', table_name='games', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_games_in_progress_started_at', table_name='games', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_games_user_sub_id_mode_name_status', table_name='games', postgresql_concurrently=True, if_exists=True)
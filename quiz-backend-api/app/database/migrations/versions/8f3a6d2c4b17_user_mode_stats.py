@@ -0,0 +1,36 @@
+"""User mode stats
+
+Revision ID: 8f3a6d2c4b17
+Revises: 5b2e7c1d9a43
+Create Date: 2026-10-17 14:37:05.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a6d2c4b17'
+down_revision: Union[str, None] = '5b2e7c1d9a43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_mode_stats',
+    sa.Column('user_sub_id', sa.UUID(), nullable=False),
+    sa.Column('mode_name', sa.String(), nullable=False),
+    sa.Column('games', sa.Integer(), nullable=False),
+    sa.Column('correct', sa.Integer(), nullable=False),
+    sa.Column('incorrect', sa.Integer(), nullable=False),
+    sa.Column('last_played', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['mode_name'], ['game_modes.name'], ),
+    sa.PrimaryKeyConstraint('user_sub_id', 'mode_name'),
+    if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_mode_stats', if_exists=True)
@@ -6,8 +6,10 @@ from sqlalchemy import (
     TIMESTAMP,
     Column,
     ForeignKey,
+    Index,
     Integer,
     String,
+    text,
 )
 from sqlalchemy import (
     Enum as SqlEnum,
@@ -40,6 +42,30 @@ class GameModes(Base):
 
 class Game(Base):
     __tablename__ = "games"
+    __table_args__ = (
+        # Per-user statistics, also serves filters by user_sub_id only
+        Index(
+            "ix_games_user_sub_id_mode_name_status",
+            "user_sub_id",
+            "mode_name",
+            "status",
+        ),
+        # Failure sweep over the small set of games in progress
+        Index(
+            "ix_games_in_progress_started_at",
+            "started_at",
+            postgresql_where=text("status = 'in_progress'"),
+        ),
+        # Time-range scans, started_at grows with insertion order
+        Index("ix_games_started_at_brin", "started_at", postgresql_using="brin"),
+        # Statistics sync watermark order
+        Index(
+            "ix_games_completed_finished_at_id",
+            "finished_at",
+            "id",
+            postgresql_where=text("status = 'completed'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_sub_id = Column(PG_UUID(as_uuid=True), nullable=False)
@@ -61,6 +87,24 @@ class Game(Base):
     )  # Updated to reference Stats correctly
 
 
+class UserModeStats(Base):
+    """
+    Totals of completed games per user and game mode
+
+    Rows are changed in the same transaction as the game status, so they
+    always match the completed games
+    """
+
+    __tablename__ = "user_mode_stats"
+
+    user_sub_id = Column(PG_UUID(as_uuid=True), primary_key=True)
+    mode_name = Column(String, ForeignKey("game_modes.name"), primary_key=True)
+    games = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    incorrect = Column(Integer, nullable=False, default=0)
+    last_played = Column(TIMESTAMP(timezone=True), nullable=True)
+
+
 class QuestionTypes(Base):
     __tablename__ = "question_types"
 
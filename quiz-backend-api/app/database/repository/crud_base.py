@@ -1,11 +1,14 @@
-from typing import Any, Dict, Generic, List, TypeVar
+from typing import Any, Dict, Generic, List, Optional, TypeVar
 
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 ModelType = TypeVar("ModelType")
 
+DEFAULT_CHUNK_SIZE = 1000
+
 
 class CRUDBase(Generic[ModelType]):
     """Base class for CRUD operations."""
@@ -128,6 +131,47 @@ class CRUDBase(Generic[ModelType]):
             raise IntegrityError(f"{model.__name__} already exists.")
         return obj
 
+    @staticmethod
+    async def upsert_many(
+        db: AsyncSession,
+        model: ModelType,
+        objs_data: List[Dict[str, Any]],
+        conflict_columns: List[str],
+        update_columns: Optional[List[str]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> List[ModelType]:
+        """
+        Insert or update objects with one INSERT ... ON CONFLICT ... RETURNING
+        statement per chunk.
+
+        Conflicting rows are left untouched if update_columns are not given,
+        such rows are not returned. All chunks are written in one transaction.
+        """
+        statement = pg_insert(model)
+        if update_columns:
+            statement = statement.on_conflict_do_update(
+                index_elements=conflict_columns,
+                set_={column: statement.excluded[column] for column in update_columns},
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(
+                index_elements=conflict_columns
+            )
+        statement = statement.returning(model)
+
+        objs = []
+        try:
+            for start in range(0, len(objs_data), chunk_size):
+                result = await db.scalars(
+                    statement, objs_data[start : start + chunk_size]
+                )
+                objs.extend(result.all())
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise
+        return objs
+
     @staticmethod
     async def update(
         db: AsyncSession, model: ModelType, id: int, obj_data: Dict[str, Any]
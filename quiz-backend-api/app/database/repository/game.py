@@ -1,11 +1,16 @@
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from app.database.models import Game, GameModes, GameStatus
 from app.database.repository.crud_base import CRUDBase
-from sqlalchemy.exc import IntegrityError
+from app.database.repository.user_mode_stats import CRUDUserModeStats
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
+DEFAULT_GAME_MODES_NAMES = ("music", "arithmetic", "trigonometry")
+
 
 class CRUDGame:
     @staticmethod
@@ -45,6 +50,49 @@ class CRUDGame:
         """
         return await CRUDBase.get_all(db=db, model=Game, skip=skip, limit=limit)
 
+    @staticmethod
+    async def get_games_after(
+        db: AsyncSession, after_id: Optional[int] = None, limit: int = 100
+    ) -> List[Game]:
+        """
+        Retrieve games following the given ID with keyset pagination
+
+        :param AsyncSession db: The database session
+        :param Optional[int] after_id: The ID of the last game of the previous
+        page, games from the beginning are returned if it is absent
+        :param int limit: The maximum number of games to return
+
+        :return List[Game]: List of game objects ordered by ID
+        """
+        query = select(Game).order_by(Game.id).limit(limit)
+        if after_id is not None:
+            query = query.where(Game.id > after_id)
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    @staticmethod
+    async def stream_games(
+        db: AsyncSession, chunk_size: int = 1000
+    ) -> AsyncIterator[List[Row]]:
+        """
+        Stream all games ordered by ID from the server-side cursor in chunks
+
+        Plain rows are selected instead of ORM objects, so the session identity
+        map does not grow with the number of streamed games
+
+        :param AsyncSession db: The database session
+        :param int chunk_size: The number of rows in one chunk
+
+        :yield List[Row]: Rows with the games table columns
+        """
+        result = await db.stream(
+            select(*Game.__table__.columns)
+            .order_by(Game.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions(chunk_size):
+            yield rows
+
     @staticmethod
     async def get_all_game_modes_names(
         db: AsyncSession, skip: int = 0, limit: int = 100
@@ -117,17 +165,76 @@ class CRUDGame:
     @staticmethod
     async def update_game_result(
         db: AsyncSession, game_id: int, game_data: Dict[str, Any]
-    ) -> Game:
+    ) -> Tuple[Game, int]:
         """
         Update an existing game result based on the provided game ID and data.
 
+        The game row is locked and its previous status and scores are returned
+        by the same UPDATE ... RETURNING statement. The difference is added to
+        the user mode totals in the same transaction, so the totals change only
+        when the game becomes completed or its completed result is changed
+
         :param AsyncSession db: The database session
         :param int game_id: The ID of the game to update
         :param Dict[str, Any] game_data: The data to update the game with
 
-        :return Game: The updated game object
+        :return Tuple[Game, int]: The updated game object and the change of
+        the correct score added to the user mode totals
         """
-        return await CRUDBase.update(db=db, model=Game, id=game_id, obj_data=game_data)
+        previous_game = (
+            select(Game.id, Game.status, Game.correct_score, Game.incorrect_score)
+            .where(Game.id == game_id)
+            .with_for_update()
+            .cte("previous_game")
+        )
+        obj_data = {key: value for key, value in game_data.items() if key != "id"}
+        try:
+            result = await db.execute(
+                update(Game)
+                .where(Game.id == previous_game.c.id)
+                .values(**obj_data)
+                .returning(
+                    Game,
+                    previous_game.c.status,
+                    previous_game.c.correct_score,
+                    previous_game.c.incorrect_score,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            row = result.one_or_none()
+            if row is None:
+                await db.rollback()
+                raise NoResultFound(f"Game with ID {game_id} not found.")
+            game, previous_status, previous_correct, previous_incorrect = row
+
+            games_delta = correct_delta = incorrect_delta = 0
+            if previous_status == GameStatus.completed:
+                games_delta -= 1
+                correct_delta -= previous_correct or 0
+                incorrect_delta -= previous_incorrect or 0
+            if game.status == GameStatus.completed:
+                games_delta += 1
+                correct_delta += game.correct_score or 0
+                incorrect_delta += game.incorrect_score or 0
+            if game.mode_name and any((games_delta, correct_delta, incorrect_delta)):
+                await CRUDUserModeStats.apply_delta(
+                    db=db,
+                    user_sub_id=game.user_sub_id,
+                    mode_name=game.mode_name,
+                    games=games_delta,
+                    correct=correct_delta,
+                    incorrect=incorrect_delta,
+                    last_played=(
+                        game.finished_at
+                        if game.status == GameStatus.completed
+                        else None
+                    ),
+                )
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise IntegrityError(f"Error updating Game with ID {game_id}.")
+        return game, correct_delta
 
     @staticmethod
     async def get_in_progress_games_for_dates(
@@ -149,31 +256,163 @@ class CRUDGame:
         return await CRUDBase.get_filtered(db, Game, filters)
 
     @staticmethod
-    async def create_default_game_modes(db: AsyncSession):
+    async def fail_stale_in_progress_games(
+        db: AsyncSession, started_before: datetime
+    ) -> List[int]:
         """
-        Default game modes creation if they do not already exist
+        Mark all games in progress started before the given time as failed
+
+        The games are updated by single UPDATE ... RETURNING statement in one
+        transaction, so the cost does not depend on the number of expired games
 
         :param AsyncSession db: The database session
+        :param datetime started_before: The upper bound of the start time
+
+        :return List[int]: IDs of the failed games
         """
-        # Check if the default game modes already exist
-        existing_modes = await CRUDBase.get_all(db, GameModes)
-        if not existing_modes:
-            try:
-                # Create default game modes
-                music_mode = GameModes(name="music")
-                arithmetic_mode = GameModes(name="arithmetic")
-                trigonometry_mode = GameModes(name="trigonometry")
+        result = await db.execute(
+            update(Game)
+            .where(
+                Game.status == GameStatus.in_progress,
+                Game.started_at < started_before,
+            )
+            .values(status=GameStatus.failed)
+            .returning(Game.id)
+            .execution_options(synchronize_session=False)
+        )
+        failed_game_ids = list(result.scalars().all())
+        await db.commit()
+        return failed_game_ids
 
-                await CRUDBase.create(
-                    db=db, model=GameModes, obj_data={"name": music_mode.name}
-                )
-                await CRUDBase.create(
-                    db=db, model=GameModes, obj_data={"name": arithmetic_mode.name}
-                )
-                await CRUDBase.create(
-                    db=db, model=GameModes, obj_data={"name": trigonometry_mode.name}
-                )
+    @staticmethod
+    async def fail_in_progress_games_by_ids(
+        db: AsyncSession, game_ids: List[int]
+    ) -> List[int]:
+        """
+        Mark the given games as failed if they are still in progress
 
-            except IntegrityError:
-                # Handle the case where the modes might already exist
-                await db.rollback()
+        :param AsyncSession db: The database session
+        :param List[int] game_ids: IDs of the games to fail
+
+        :return List[int]: IDs of the failed games
+        """
+        if not game_ids:
+            return []
+        result = await db.execute(
+            update(Game)
+            .where(Game.id.in_(game_ids), Game.status == GameStatus.in_progress)
+            .values(status=GameStatus.failed)
+            .returning(Game.id)
+            .execution_options(synchronize_session=False)
+        )
+        failed_game_ids = list(result.scalars().all())
+        await db.commit()
+        return failed_game_ids
+
+    @staticmethod
+    async def get_last_completed_game_position(
+        db: AsyncSession, finished_before: datetime
+    ) -> Optional[Tuple[datetime, int]]:
+        """
+        Retrieve the position of the last completed game finished before the time
+
+        :param AsyncSession db: The database session
+        :param datetime finished_before: The upper bound of the finish time
+
+        :return Optional[Tuple[datetime, int]]: The game finished_at and ID,
+        None if there are no such games
+        """
+        result = await db.execute(
+            select(Game.finished_at, Game.id)
+            .where(
+                Game.status == GameStatus.completed,
+                Game.finished_at.is_not(None),
+                Game.finished_at <= finished_before,
+            )
+            .order_by(Game.finished_at.desc(), Game.id.desc())
+            .limit(1)
+        )
+        row = result.first()
+        return (row.finished_at, row.id) if row else None
+
+    @staticmethod
+    async def get_completed_games_after(
+        db: AsyncSession,
+        after: Tuple[datetime, int],
+        finished_before: datetime,
+        limit: int = 1000,
+    ) -> List[Row]:
+        """
+        Retrieve completed games following the given position in finish order
+
+        :param AsyncSession db: The database session
+        :param Tuple[datetime, int] after: The last processed game finished_at and ID
+        :param datetime finished_before: The upper bound of the finish time
+        :param int limit: The maximum number of games to return
+
+        :return List[Row]: Rows with id, user_sub_id, mode_name, finished_at,
+        correct_score and incorrect_score values ordered by finished_at and ID
+        """
+        result = await db.execute(
+            select(
+                Game.id,
+                Game.user_sub_id,
+                Game.mode_name,
+                Game.finished_at,
+                Game.correct_score,
+                Game.incorrect_score,
+            )
+            .where(
+                Game.status == GameStatus.completed,
+                tuple_(Game.finished_at, Game.id) > tuple_(*after),
+                Game.finished_at <= finished_before,
+            )
+            .order_by(Game.finished_at, Game.id)
+            .limit(limit)
+        )
+        return result.all()
+
+    @staticmethod
+    async def get_completed_scores_since(
+        db: AsyncSession, finished_since: datetime
+    ) -> List[Row]:
+        """
+        Retrieve correct scores of games completed since the given time grouped
+        by user and game mode
+
+        :param AsyncSession db: The database session
+        :param datetime finished_since: The lower bound of the finish time
+
+        :return List[Row]: Rows with user_sub_id, mode_name and correct_score values
+        """
+        result = await db.execute(
+            select(
+                Game.user_sub_id,
+                Game.mode_name,
+                func.coalesce(func.sum(Game.correct_score), 0).label("correct_score"),
+            )
+            .where(
+                Game.status == GameStatus.completed,
+                Game.finished_at >= finished_since,
+                Game.mode_name.is_not(None),
+            )
+            .group_by(Game.user_sub_id, Game.mode_name)
+        )
+        return result.all()
+
+    @staticmethod
+    async def create_default_game_modes(db: AsyncSession):
+        """
+        Default game modes creation if they do not already exist
+
+        The modes are written by single INSERT ... ON CONFLICT DO NOTHING
+        statement, so the creation is safe for concurrently started replicas
+
+        :param AsyncSession db: The database session
+        """
+        await CRUDBase.upsert_many(
+            db=db,
+            model=GameModes,
+            objs_data=[{"name": name} for name in DEFAULT_GAME_MODES_NAMES],
+            conflict_columns=["name"],
+        )
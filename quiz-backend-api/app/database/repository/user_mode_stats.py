@@ -0,0 +1,152 @@
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from uuid import UUID
+
+from app.database.models import Game, GameStatus, UserModeStats
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class CRUDUserModeStats:
+    @staticmethod
+    async def apply_delta(
+        db: AsyncSession,
+        user_sub_id: UUID,
+        mode_name: str,
+        games: int,
+        correct: int,
+        incorrect: int,
+        last_played: Optional[datetime] = None,
+    ) -> None:
+        """
+        Add the delta to the user mode totals with INSERT ... ON CONFLICT DO UPDATE
+
+        The statement is not committed, so it is applied in the transaction
+        of the caller together with the game change
+
+        :param AsyncSession db: The database session
+        :param UUID user_sub_id: The subscription ID of the user
+        :param str mode_name: The game mode name
+        :param int games: The change of the number of completed games
+        :param int correct: The change of the number of correct answers
+        :param int incorrect: The change of the number of incorrect answers
+        :param Optional[datetime] last_played: The finish time of the game
+        """
+        statement = pg_insert(UserModeStats).values(
+            user_sub_id=user_sub_id,
+            mode_name=mode_name,
+            games=games,
+            correct=correct,
+            incorrect=incorrect,
+            last_played=last_played,
+        )
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[UserModeStats.user_sub_id, UserModeStats.mode_name],
+                set_={
+                    "games": UserModeStats.games + statement.excluded.games,
+                    "correct": UserModeStats.correct + statement.excluded.correct,
+                    "incorrect": UserModeStats.incorrect
+                    + statement.excluded.incorrect,
+                    # GREATEST ignores NULL values
+                    "last_played": func.greatest(
+                        UserModeStats.last_played, statement.excluded.last_played
+                    ),
+                },
+            )
+        )
+
+    @staticmethod
+    async def backfill(db: AsyncSession) -> int:
+        """
+        Recalculate the totals of all users and modes from the completed games
+        with INSERT ... SELECT ... ON CONFLICT DO UPDATE
+
+        The games table is locked for writes until the commit, so the deltas of
+        the games completed meanwhile are added on top of the recalculated totals
+
+        :param AsyncSession db: The database session
+
+        :return int: The number of written totals
+        """
+        totals = (
+            select(
+                Game.user_sub_id,
+                Game.mode_name,
+                func.count(),
+                func.coalesce(func.sum(Game.correct_score), 0),
+                func.coalesce(func.sum(Game.incorrect_score), 0),
+                func.max(Game.finished_at),
+            )
+            .where(Game.status == GameStatus.completed, Game.mode_name.is_not(None))
+            .group_by(Game.user_sub_id, Game.mode_name)
+        )
+        statement = pg_insert(UserModeStats).from_select(
+            [
+                "user_sub_id",
+                "mode_name",
+                "games",
+                "correct",
+                "incorrect",
+                "last_played",
+            ],
+            totals,
+        )
+        await db.execute(text("LOCK TABLE games IN SHARE MODE"))
+        result = await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[UserModeStats.user_sub_id, UserModeStats.mode_name],
+                set_={
+                    column: statement.excluded[column]
+                    for column in ("games", "correct", "incorrect", "last_played")
+                },
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+    @staticmethod
+    async def get_by_users_modes(
+        db: AsyncSession, users_modes: List[Tuple[UUID, str]]
+    ) -> List[UserModeStats]:
+        """
+        Retrieve totals of the given users and modes by primary key
+
+        :param AsyncSession db: The database session
+        :param List[Tuple[UUID, str]] users_modes: Pairs of user subscription ID
+        and game mode name
+
+        :return List[UserModeStats]: Totals of the played pairs
+        """
+        if not users_modes:
+            return []
+        result = await db.execute(
+            select(UserModeStats).where(
+                tuple_(UserModeStats.user_sub_id, UserModeStats.mode_name).in_(
+                    users_modes
+                )
+            )
+        )
+        return result.scalars().all()
+
+    @staticmethod
+    async def stream_all(
+        db: AsyncSession, chunk_size: int = 1000
+    ) -> AsyncIterator[List[Row]]:
+        """
+        Stream totals of all users and modes in primary key order in chunks
+
+        :param AsyncSession db: The database session
+        :param int chunk_size: The number of rows in one chunk
+
+        :yield List[Row]: Rows with the user_mode_stats table columns
+        """
+        result = await db.stream(
+            select(*UserModeStats.__table__.columns)
+            .order_by(UserModeStats.user_sub_id, UserModeStats.mode_name)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions(chunk_size):
+            yield rows
@@ -52,14 +52,6 @@ class GameResult(BaseModel):
         orm_mode = True  # This allows compatibility with ORM models if needed
 
 
-class GameScoreResult(BaseModel):
-    correct_score: int
-    incorrect_score: int
-
-    class Config:
-        orm_mode = True  # This allows compatibility with ORM models if needed
-
-
 class QuestionRequest(BaseModel):
     user_token: str
     mode: str
@@ -1,6 +1,8 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
-from pathlib import Path
+from typing import AsyncGenerator
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import FastAPI, status
@@ -17,11 +19,25 @@ from app.routers import (
     stats,
     translations,
 )
-from app.services.counter_answers_validating import compare_and_update_answers_by_mode
-from app.services.game_status_service import check_failed_games
-from app.services.translation_service import load_translations_key_db
+from app.services.counter_answers_validating import (
+    backfill_user_mode_stats_if_missing,
+    sync_stats,
+)
+from app.services.game_status_service import check_failed_games, expire_due_games
+from app.services.leaderboard_service import rebuild_leaderboards_if_missing
+from app.services.remarks_service import migrate_legacy_recommendations
+from app.services.stats_service import migrate_legacy_user_stats
+from app.services.translation_service import translations_file_watcher
+from app.utils.http_client import http_client
+from app.utils.keydb import async_keydb_instance, keydb_connection_pool
+from app.utils.metrics import (
+    PrometheusMiddleware,
+    instrument_job,
+    instrument_scheduler,
+    metrics_endpoint,
+)
+from app.utils.token_cache import token_cache
 
-app = FastAPI(docs_url="/api/v1/docs", openapi_url="/api/v1/openapi")
 scheduler = AsyncIOScheduler()
 
 logger = configure_logging_handler()
@@ -36,26 +52,24 @@ ORIGINS = os.getenv("ORIGINS")
 origins = ORIGINS.split(sep=",")
 
 KEYDB_PASSWORD = os.getenv("KEYDB_PASSWORD")
+TRANSLATIONS_WATCH_SECONDS = int(os.getenv("TRANSLATIONS_WATCH_SECONDS", "10"))
+STATS_SYNC_INTERVAL_SECONDS = int(os.getenv("STATS_SYNC_INTERVAL_SECONDS", "15"))
+GAME_DEADLINES_POLL_SECONDS = int(os.getenv("GAME_DEADLINES_POLL_SECONDS", "5"))
 
 
-# Set up CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-
-# Database creation
-@app.on_event("startup")
-async def startup():
+@asynccontextmanager
+async def lifespan_handler(application: FastAPI) -> AsyncGenerator[None, None]:
     """
-    Starting database creation
+    Application start and shutdown handler
 
+    Starting database creation, shared HTTP, KeyDB and Kafka clients, token
+    cache invalidation listener and scheduled jobs
     """
-    game_modes_names = []
+    await http_client.start()
+    await game.kafka_producer.start()
+    application.state.producer = game.kafka_producer
+    application.state.keydb = async_keydb_instance
+    token_invalidation_task = asyncio.create_task(token_cache.listen_invalidations())
 
     async with engine.begin() as connector:
         await connector.run_sync(Base.metadata.create_all)
@@ -63,25 +77,66 @@ async def startup():
     # Create default game modes
     async for db in get_db():
         await CRUDGame.create_default_game_modes(db=db)
-        game_modes_names = await CRUDGame.get_all_game_modes_names(db=db)
+        # Tables are created by create_all, so the history is aggregated here
+        # before the statistics and the boards are built from it
+        await backfill_user_mode_stats_if_missing(db=db)
 
-    load_translations_key_db(
-        file_path=Path(__file__).resolve().parent / "utils" / "translations.json"
-    )
+    await translations_file_watcher.check(keydb=async_keydb_instance)
+    await migrate_legacy_user_stats(keydb=async_keydb_instance)
+    await migrate_legacy_recommendations(keydb=async_keydb_instance)
+    async for db in get_db():
+        await rebuild_leaderboards_if_missing(db=db, keydb=async_keydb_instance)
     logger.info("Database creation was finished")
-    scheduler.add_job(check_failed_games, "interval", minutes=1)
-    for mode in game_modes_names:
-        scheduler.add_job(
-            compare_and_update_answers_by_mode,
-            "interval",
-            minutes=1,
-            args=[mode],
-            next_run_time=datetime.now(),  # Running job immediately and then every minute
-        )
-        logger.info("Scheduler job started for mode: %s", mode)
+    scheduler.add_job(
+        instrument_job(expire_due_games),
+        "interval",
+        seconds=GAME_DEADLINES_POLL_SECONDS,
+        max_instances=1,
+    )
+    # Safety net for games missing in the deadlines sorted set
+    scheduler.add_job(instrument_job(check_failed_games), "interval", minutes=15)
+    scheduler.add_job(
+        instrument_job(translations_file_watcher.check),
+        "interval",
+        seconds=TRANSLATIONS_WATCH_SECONDS,
+        kwargs={"keydb": async_keydb_instance},
+    )
+    scheduler.add_job(
+        instrument_job(sync_stats),
+        "interval",
+        seconds=STATS_SYNC_INTERVAL_SECONDS,
+        max_instances=1,
+        next_run_time=datetime.now(),  # Running job immediately and then periodically
+    )
+    instrument_scheduler(scheduler)
     scheduler.start()
     logger.info("Sheduler was started")
     logger.info("Game backend was started")
+    yield
+    scheduler.shutdown(wait=False)
+    # Pending Kafka messages are delivered before the shutdown
+    await game.kafka_producer.stop()
+    token_invalidation_task.cancel()
+    await http_client.stop()
+    await keydb_connection_pool.disconnect()
+    logger.info("Game backend shutdown")
+
+
+app = FastAPI(
+    docs_url="/api/v1/docs", openapi_url="/api/v1/openapi", lifespan=lifespan_handler
+)
+
+# Set up CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=origins,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+app.add_middleware(PrometheusMiddleware, application=app)
+app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 
 # Include routers
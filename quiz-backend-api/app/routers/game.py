@@ -1,17 +1,26 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime, timezone
+
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from redis import asyncio as aioredis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.brokers.kafka import KafkaProducer
-from app.database.db import get_db
+from app.database.db import get_db, get_read_db, pin_primary_reads
+from app.database.models import GameStatus
 from app.database.repository.game import CRUDGame
 from app.database.schemas import GameRequest, GameResponse, GameResult
 from app.services.game import (
     create_game,
+    export_games,
     fetch_games,
     oauth2_scheme,
     update_game_result,
     verify_permission,
 )
+from app.utils.keydb import get_keydb
 
 router = APIRouter()
 
@@ -27,14 +36,16 @@ kafka_producer = KafkaProducer(
 async def create_game_result(
     game_request: GameRequest,
     db: AsyncSession = Depends(get_db),
-    _: str = Depends(oauth2_scheme),
+    keydb: aioredis.Redis = Depends(get_keydb),
+    token: str = Depends(oauth2_scheme),
 ):
     """
     Create new game result
 
     :param GameRequest game_request: The request object containing game details
     :param AsyncSession db: The database session dependency
-    :param str _: The OAuth2 token dependency
+    :param aioredis.Redis keydb: The KeyDB client dependency
+    :param str token: The OAuth2 token dependency
 
     :return GameResponse: The created game response
     """
@@ -47,41 +58,92 @@ async def create_game_result(
         "latency_seconds": latency_seconds,
         "status": "in_progress",
     }
-    return await create_game(db=db, game_data=game_data)
+    game = await create_game(db=db, keydb=keydb, game_data=game_data)
+    await pin_primary_reads(keydb=keydb, token=token)
+    return game
 
 
-@router.patch("/results")
+@router.patch("/results", response_model=GameResponse)
 async def submit_game_result(
     result: GameResult,
     db: AsyncSession = Depends(get_db),
-    _: str = Depends(oauth2_scheme),
+    keydb: aioredis.Redis = Depends(get_keydb),
+    token: str = Depends(oauth2_scheme),
 ):
     """
     Submit the result of completed game
 
+    Following reads of the client are served by the primary database for
+    a short period, so the submitted result is visible to it immediately
+
     :param GameResult result: The result object containing game result details
     :param AsyncSession db: The database session dependency
-    :param str _: The OAuth2 token dependency
+    :param aioredis.Redis keydb: The KeyDB client dependency
+    :param str token: The OAuth2 token dependency
 
-    :return Any: The updated game result
+    :return GameResponse: The updated game result
     """
-    return await update_game_result(
-        db=db, game_id=result.id, game_data=result.dict()
+    game_data = result.dict()
+    if result.status == GameStatus.completed:
+        # Server time keeps the finish order reliable for statistics sync
+        game_data["finished_at"] = datetime.now(timezone.utc)
+    game = await update_game_result(
+        db=db, keydb=keydb, game_id=result.id, game_data=game_data
     )
+    await pin_primary_reads(keydb=keydb, token=token)
+    return game
 
 
 @router.get("/results")
 async def fetch_games_results(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    cursor: Optional[int] = Query(default=None, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
     _: dict = Depends(verify_permission(["admin"])),
 ):
     """
-    Fetch all results
+    Fetch page of results
 
-    The route retrieves a list of game results from the database.
+    The route retrieves a page of game results from the read replica ordered
+    by their IDs. The cursor of the next page is returned in the X-Next-Cursor
+    header, the header is absent on the last page.
 
+    :param Response response: The response used for the cursor header
+    :param Optional[int] cursor: The cursor returned with the previous page
+    :param int limit: The maximum number of results on the page
+    :param AsyncSession db: The database session dependency
     :param _ dict: A dictionary containing the request context, used for permission verification
 
-    :returns List[Dict[str, Any]]: List of users dictionaries
+    :returns List[Dict[str, Any]]: List of games dictionaries
     """
-    return await fetch_games(db=db)
+    games, next_cursor = await fetch_games(db=db, after_id=cursor, limit=limit)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return games
+
+
+@router.get("/results/export")
+async def export_games_results(
+    export_format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    _: dict = Depends(verify_permission(["admin"])),
+) -> StreamingResponse:
+    """
+    Export all results
+
+    The route streams all game results as newline-delimited JSON or CSV
+    without loading them into memory.
+
+    :param str export_format: "ndjson" or "csv"
+    :param _ dict: A dictionary containing the request context, used for permission verification
+
+    :returns StreamingResponse: Streamed games
+    """
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_games(export_format=export_format),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="games.{export_format}"'
+        },
+    )
@@ -1,40 +1,36 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+from redis import asyncio as aioredis
 
 from app.services.game import oauth2_scheme
-from app.utils.keydb import keydb_instance
+from app.services.remarks_service import fetch_user_recommendations
+from app.utils.keydb import get_keydb
 
 router = APIRouter()
 
 
 @router.get("/{user_sub_id}")
-def get_user_data(user_sub_id, _: str = Depends(oauth2_scheme)):
+async def get_user_data(
+    user_sub_id,
+    _: str = Depends(oauth2_scheme),
+    keydb: aioredis.Redis = Depends(get_keydb),
+):
     """
     Retrieve user data based on the provided user subscription ID.
 
     The endpoint fetches user recommendations stored in KeyDB for the specified
-    user subscription ID. It retrieves all relevant keys and decodes the stored
-    hash maps into list of dictionaries
+    user subscription ID. Recommendations of all modes are kept in single
+    per-user hash as encoded entries, so they are read in one round trip
+    and served without decoding
 
     :param str user_sub_id: The subscription ID of the user with retrieved data
     :param str _: The OAuth2 token dependency for authentication
+    :param aioredis.Redis keydb: The KeyDB client dependency
 
     :return List[Dict[str, str]]: List of user recommendation data, where each entry is a dictionary
              containing the recommendation details
     """
-    # Retrieve the data from Redis
-    user_data = []
-    keys = keydb_instance.keys(f"*{user_sub_id}-recommendations*")
-    for key in keys:
-        # Retrieve the hash map for each key
-        retrieved_entry = keydb_instance.hgetall(key)
-        if retrieved_entry:
-            # Decode bytes to strings
-            user_data.append(
-                {
-                    k.decode("utf-8"): v.decode("utf-8")
-                    for k, v in retrieved_entry.items()
-                }
-            )
+    user_data = await fetch_user_recommendations(keydb=keydb, user_sub_id=user_sub_id)
 
     if user_data:
-        return user_data
+        return Response(content=user_data, media_type="application/json")
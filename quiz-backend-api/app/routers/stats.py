@@ -1,49 +1,105 @@
-from fastapi import APIRouter, Depends
-
-from app.database.schemas import GameScoreResult
-from app.services.game import oauth2_scheme
-from app.utils.keydb import keydb_instance
+from fastapi import APIRouter, Depends, Query
+from redis import asyncio as aioredis
+
+from app.services.counter_answers_validating import repair_stats
+from app.services.game import oauth2_scheme, verify_permission
+from app.services.leaderboard_service import (
+    LeaderboardPeriod,
+    fetch_leaderboard,
+    fetch_user_rank,
+)
+from app.services.stats_service import fetch_user_mode_stats, fetch_user_stats
+from app.utils.keydb import get_keydb
 
 router = APIRouter()
 
 
 @router.get("/all/{user_sub_id}")
-def fetch_all_user_data(user_sub_id, _: str = Depends(oauth2_scheme)):
+async def fetch_all_user_data(
+    user_sub_id,
+    _: str = Depends(oauth2_scheme),
+    keydb: aioredis.Redis = Depends(get_keydb),
+):
     """
     Fetch all user data based on the provided user subscription ID.
 
     The endpoint retrieves all user-related data stored in KeyDB for the specified
-    user subscription ID. It collects all relevant keys and decodes the stored
-    hash maps into a list of dictionaries
+    user subscription ID. Statistics of all modes are kept in single per-user hash
+    and are read in one round trip
 
     :param str user_sub_id: The subscription ID of the user fetched data
     :param str _: The OAuth2 token dependency for authentication
+    :param aioredis.Redis keydb: The KeyDB client dependency
 
     :return List[Dict[str, str]]: List of user data entries, where each entry is a dictionary
              containing the user details
     """
-    # Retrieve the data from Redis
-    user_data = []
-    keys = keydb_instance.keys(f"*{user_sub_id}--*")
-    for key in keys:
-        # Retrieve the hash map for each key
-        retrieved_entry = keydb_instance.hgetall(key)
-        if retrieved_entry:
-            # Decode bytes to strings
-            user_data.append(
-                {
-                    k.decode("utf-8"): v.decode("utf-8")
-                    for k, v in retrieved_entry.items()
-                }
-            )
+    user_data = await fetch_user_stats(keydb=keydb, user_sub_id=user_sub_id)
 
     if user_data:
         return user_data
 
 
+# Declared before "/{user_sub_id}/{mode}", which would match "/leaderboard/{mode}"
+@router.get("/leaderboard/{mode}")
+async def fetch_mode_leaderboard(
+    mode: str,
+    period: LeaderboardPeriod = Query(default="all"),
+    limit: int = Query(default=10, ge=1, le=100),
+    _: str = Depends(oauth2_scheme),
+    keydb: aioredis.Redis = Depends(get_keydb),
+) -> list[dict[str, str | int]]:
+    """
+    Fetch top users of the mode leaderboard.
+
+    Users are ranked by the number of correct answers in completed games,
+    kept in KeyDB sorted set, so the cost is O(log N + limit)
+
+    :param str mode: The game mode name
+    :param LeaderboardPeriod period: "all" for all-time board, "week" for
+    the current week board
+    :param int limit: The number of top users
+    :param str _: The OAuth2 token dependency for authentication
+    :param aioredis.Redis keydb: The KeyDB client dependency
+
+    :return list[dict[str, str | int]]: Entries with rank, user_sub_id and
+    score values ordered by rank
+    """
+    return await fetch_leaderboard(keydb=keydb, mode=mode, period=period, limit=limit)
+
+
+@router.get("/leaderboard/{mode}/{user_sub_id}")
+async def fetch_user_leaderboard_rank(
+    mode: str,
+    user_sub_id: str,
+    period: LeaderboardPeriod = Query(default="all"),
+    _: str = Depends(oauth2_scheme),
+    keydb: aioredis.Redis = Depends(get_keydb),
+) -> dict[str, str | int] | None:
+    """
+    Fetch rank of the user on the mode leaderboard.
+
+    :param str mode: The game mode name
+    :param str user_sub_id: The subscription ID of the user
+    :param LeaderboardPeriod period: "all" for all-time board, "week" for
+    the current week board
+    :param str _: The OAuth2 token dependency for authentication
+    :param aioredis.Redis keydb: The KeyDB client dependency
+
+    :return dict[str, str | int] | None: Entry with rank, user_sub_id and
+    score values, or None if the user is not ranked
+    """
+    return await fetch_user_rank(
+        keydb=keydb, mode=mode, period=period, user_sub_id=user_sub_id
+    )
+
+
 @router.get("/{user_sub_id}/{mode}")
-def fetch_current_mode_user_data(
-    mode: str, user_sub_id, _: str = Depends(oauth2_scheme)
+async def fetch_current_mode_user_data(
+    mode: str,
+    user_sub_id,
+    _: str = Depends(oauth2_scheme),
+    keydb: aioredis.Redis = Depends(get_keydb),
 ) -> dict | None:
     """
     Fetch user data for the current mode based on the user subscription ID.
@@ -55,50 +111,25 @@ def fetch_current_mode_user_data(
     :param str mode: The mode for which user data is to be retrieved
     :param str user_sub_id: The subscription ID of the user
     :param str _: The OAuth2 token dependency for authentication
+    :param aioredis.Redis keydb: The KeyDB client dependency
 
     :return dict | None: Dictionary containing the user data for the specified mode,
              or None if no data is found
     """
-    # Retrieve the data from Redis
-    current_mode_user_data = None
-    retrieved_entry = keydb_instance.hgetall(f"{user_sub_id}--{mode}")
-    if retrieved_entry:
-        current_mode_user_data = {
-            k.decode("utf-8"): v.decode("utf-8") for k, v in retrieved_entry.items()
-        }
-        current_mode_user_data["mode"] = mode
+    return await fetch_user_mode_stats(keydb=keydb, user_sub_id=user_sub_id, mode=mode)
 
-    return current_mode_user_data
 
-
-@router.patch("/{user_sub_id}/{mode}")
-def update_current_mode_user_data(
-    mode: str,
-    game_score_result: GameScoreResult,
-    user_sub_id: str,
-    _: str = Depends(oauth2_scheme),
-):
+@router.post("/repair")
+async def repair_users_data(
+    _: dict = Depends(verify_permission(["admin"])),
+) -> dict[str, str | int]:
     """
-    Update user data for the current mode based on the user subscription ID.
+    Full rebuild of the users statistics from the completed games
 
-    The endpoint updates the user data in KeyDB for a specific mode
-    using the provided game score results. It sets multiple fields in the
-    hash associated with the user subscription ID and mode
+    The repair is rate-limited for all replicas
 
-    :param str mode: The mode for which user data is to be updated
-    :param GameScoreResult game_score_result: The result object containing game score details
-    :param str user_sub_id: The user subscription ID
-    :param str _: The OAuth2 token dependency for authentication
+    :param dict _: The admin permission dependency
+
+    :return dict[str, str | int]: Repair status and number of updated entries
     """
-    # Retrieve the data from Redis
-    game_score_result_dictionary = game_score_result.dict()
-    key = f"{user_sub_id}--{mode}"
-    # Using hsetall to set multiple fields in the hash
-    keydb_instance.hset(
-        key,
-        mapping={
-            "mode": mode,
-            "correct_score": game_score_result_dictionary["correct_score"],
-            "incorrect_score": game_score_result_dictionary["incorrect_score"],
-        },
-    )
+    return await repair_stats()
@@ -1,27 +1,89 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import Response
+from redis import asyncio as aioredis
 
-from app.utils.keydb import keydb_instance
+from app.services.game import verify_permission
+from app.services.translation_service import (
+    load_translations_key_db,
+    translation_bundle_cache,
+)
+from app.utils.keydb import get_keydb
 
 router = APIRouter()
 
+TRANSLATIONS_CACHE_CONTROL = "public, no-cache"
+
+
+def is_etag_matched(if_none_match: str | None, etag: str) -> bool:
+    """
+    Checking whether the client already has the current bundle version
+
+    :param str | None if_none_match: The If-None-Match request header
+    :param str etag: Entity tag of the current bundle
+
+    :return bool: True if the client copy is up to date
+    """
+    if not if_none_match:
+        return False
+    client_etags = [
+        client_etag.strip().removeprefix("W/")
+        for client_etag in if_none_match.split(",")
+    ]
+    return "*" in client_etags or etag in client_etags
+
+
+@router.post("/reload")
+async def reload_translations(
+    _: dict = Depends(verify_permission(["admin"])),
+    keydb: aioredis.Redis = Depends(get_keydb),
+) -> dict[str, str]:
+    """
+    Reload translations from the translations file
+
+    New version is switched atomically, other replicas pick it up on their
+    next version check
+
+    :param dict _: The admin permission dependency
+    :param aioredis.Redis keydb: The KeyDB client dependency
+
+    :return dict[str, str]: Current translations version
+    """
+    version = await load_translations_key_db(keydb=keydb)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Translations loading error",
+        )
+    translation_bundle_cache.checked_at = 0.0
+    return {"version": version}
+
 
 @router.get("/{language}")
-async def get_translations(language: str):
+async def get_translations(
+    language: str,
+    if_none_match: str | None = Header(default=None),
+    keydb: aioredis.Redis = Depends(get_keydb),
+) -> Response:
     """
     Retrieve translations for the specified language.
 
-    The endpoint fetches all translation entries stored in KeyDB for the
-    given language. It returns dictionary where the keys are the translation
-    identifiers and the values are the corresponding translated strings
+    The endpoint serves pre-encoded translation bundle from process memory.
+    It returns dictionary where the keys are the translation identifiers and
+    the values are the corresponding translated strings. Requests with
+    If-None-Match header containing the current entity tag are answered with
+    304 Not Modified without body
 
     :param str language: The language code for retrieved translations
+    :param str | None if_none_match: Entity tags of the client cached bundle
+    :param aioredis.Redis keydb: The KeyDB client dependency
 
-    :return Dict[str, str]: Dictionary containing translation identifiers as keys and
+    :return Response: JSON dictionary containing translation identifiers as keys and
              their corresponding translated strings as values
     """
-    keys = keydb_instance.keys(f"translations:{language}:*")
-    translations = {
-        key.decode("utf-8").split(":")[-1]: keydb_instance.get(key).decode("utf-8")
-        for key in keys
-    }
-    return translations
+    etag, bundle = await translation_bundle_cache.get_bundle(
+        keydb=keydb, language=language
+    )
+    headers = {"ETag": etag, "Cache-Control": TRANSLATIONS_CACHE_CONTROL}
+    if is_etag_matched(if_none_match=if_none_match, etag=etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=bundle, media_type="application/json", headers=headers)
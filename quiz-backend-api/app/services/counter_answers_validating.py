@@ -1,69 +1,278 @@
+import os
+from datetime import datetime, timedelta, timezone
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from redis.exceptions import LockError
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.database.db import get_db
 from app.database.repository.game import CRUDGame
+from app.database.repository.user_mode_stats import CRUDUserModeStats
 from app.configs.logging_handler import configure_logging_handler
-from app.utils.keydb import keydb_instance
+from app.services.leaderboard_service import LEADERBOARDS_BUILT_KEY
+from app.services.stats_service import (
+    build_stats_key,
+    build_stats_mapping,
+    fetch_users_modes_stats,
+    save_users_modes_stats,
+)
+from app.utils.keydb import async_keydb_instance
 
 logger = configure_logging_handler()
 scheduler = AsyncIOScheduler()
 game_crud = CRUDGame()
+user_mode_stats_crud = CRUDUserModeStats()
+
+STATS_SYNC_CHUNK_SIZE = int(os.getenv("STATS_SYNC_CHUNK_SIZE", "1000"))
+# Games finished later are processed on the next tick, so transactions
+# committed out of finish order are not skipped by the watermark
+STATS_SYNC_SETTLE_SECONDS = int(os.getenv("STATS_SYNC_SETTLE_SECONDS", "5"))
+STATS_SYNC_LOCK_TIMEOUT_SECONDS = int(
+    os.getenv("STATS_SYNC_LOCK_TIMEOUT_SECONDS", "300")
+)
+STATS_REPAIR_INTERVAL_SECONDS = int(
+    os.getenv("STATS_REPAIR_INTERVAL_SECONDS", "600")
+)
+STATS_SYNC_WATERMARK_KEY = "stats:sync:watermark"
+STATS_SYNC_LOCK_KEY = "stats:sync:lock"
+STATS_REPAIR_MARKER_KEY = "stats:sync:repair"
+STATS_BACKFILL_MARKER_KEY = "stats:backfilled"
+
+
+async def fetch_watermark() -> tuple[datetime, int] | None:
+    """
+    Position of the last completed game applied to the cached statistics
+
+    :return tuple[datetime, int] | None: The game finished_at and ID, None if
+    the statistics were never built
+    """
+    watermark = await async_keydb_instance.hgetall(STATS_SYNC_WATERMARK_KEY)
+    if not watermark:
+        return None
+    return (
+        datetime.fromisoformat(watermark[b"finished_at"].decode("utf-8")),
+        int(watermark[b"id"]),
+    )
+
+
+def build_watermark_mapping(position: tuple[datetime, int]) -> dict[str, str | int]:
+    """
+    Watermark hash fields
+
+    :param tuple[datetime, int] position: The game finished_at and ID
+
+    :return dict[str, str | int]: Watermark hash content
+    """
+    return {"finished_at": position[0].isoformat(), "id": position[1]}
 
 
-async def compare_and_update_answers_by_mode(mode: str):
+async def apply_completed_games(
+    db: AsyncSession, watermark: tuple[datetime, int]
+) -> int:
     """
-    Compare and update user answers in the cache based on the specified mode.
+    Refreshing statistics of the users and modes with games completed after
+    the watermark
 
-    The function retrieves all distinct user subscription IDs and their
-    completed game scores from the database. It compares the scores stored
-    in the SQL database with those in the cache (KeyDB) for the specified
-    mode. If differences are found, it updates the cache with the latest
-    scores
+    Totals of the touched users and modes are read from user_mode_stats by
+    primary key and written together with the new watermark in one KeyDB
+    transaction. Totals are written as absolute values, so the game applied
+    more than once is not counted twice. The session has to be bound to the
+    primary, the game not yet replayed by a replica lagging longer than
+    STATS_SYNC_SETTLE_SECONDS would stay behind the watermark forever
 
-    :param str mode: The mode for which user answers are to be compared and updated
+    :param AsyncSession db: The database session
+    :param tuple[datetime, int] watermark: The last applied game finished_at and ID
 
-    :return: None
+    :return int: Number of applied games
     """
-    logger.info("Scheduler started to compare and update answers for mode %s", mode)
-    async for db in get_db():
-        # Fetch all user_sub_ids
-        user_sub_ids = await game_crud.get_all_distinct_by_column_name(
-            db=db, column_name="user_sub_id"
+    finished_before = datetime.now(timezone.utc) - timedelta(
+        seconds=STATS_SYNC_SETTLE_SECONDS
+    )
+    applied_games_number = 0
+    while True:
+        games = await game_crud.get_completed_games_after(
+            db=db,
+            after=watermark,
+            finished_before=finished_before,
+            limit=STATS_SYNC_CHUNK_SIZE,
         )
-        user_sub_id_sql_db_scores = {"correct_score": 0, "incorrect_score": 0}
-        for user_sub_id in user_sub_ids:
-            completed_games = await game_crud.fetch_distinct_games_by_filters(
-                db=db,
-                filters={
-                    "user_sub_id": user_sub_id,
-                    "mode_name": mode,
-                    "status": "completed",
-                },
+        if not games:
+            return applied_games_number
+
+        users_modes_stats = await user_mode_stats_crud.get_by_users_modes(
+            db=db,
+            users_modes=list(
+                {(game.user_sub_id, game.mode_name) for game in games if game.mode_name}
+            ),
+        )
+        watermark = (games[-1].finished_at, games[-1].id)
+
+        async with async_keydb_instance.pipeline(transaction=True) as pipeline:
+            for user_mode_stats in users_modes_stats:
+                pipeline.hset(
+                    build_stats_key(str(user_mode_stats.user_sub_id)),
+                    mapping=build_stats_mapping(
+                        mode=user_mode_stats.mode_name,
+                        correct_score=user_mode_stats.correct,
+                        incorrect_score=user_mode_stats.incorrect,
+                    ),
+                )
+            pipeline.hset(
+                STATS_SYNC_WATERMARK_KEY, mapping=build_watermark_mapping(watermark)
             )
-            for game in completed_games:
-                user_sub_id_sql_db_scores["correct_score"] += game.correct_score
-                user_sub_id_sql_db_scores["incorrect_score"] += game.incorrect_score
-            cache_db_key = f"{user_sub_id}--{mode}"
-            retrieved_entry = keydb_instance.hgetall(cache_db_key)
-            if retrieved_entry:
-                user_sub_id_cache_db_scores = {
-                    k.decode("utf-8"): v.decode("utf-8")
-                    for k, v in retrieved_entry.items()
-                }
-            else:
-                user_sub_id_cache_db_scores = {"correct_score": 0, "incorrect_score": 0}
-
-            if (
-                user_sub_id_sql_db_scores["correct_score"]
-                != user_sub_id_cache_db_scores["correct_score"]
-                or user_sub_id_sql_db_scores["incorrect_score"]
-                != user_sub_id_cache_db_scores["incorrect_score"]
+            await pipeline.execute()
+        applied_games_number += len(games)
+
+
+async def rebuild_stats(db: AsyncSession) -> int:
+    """
+    Full rebuild of the cached statistics
+
+    Totals of all users and modes are read from user_mode_stats in primary key
+    order, compared with the cache chunk by chunk and only differing entries
+    are written. The watermark is removed for the rebuild time, so interrupted
+    rebuild is started again by the next tick
+
+    :param AsyncSession db: The database session
+
+    :return int: Number of updated cache entries
+    """
+    await async_keydb_instance.delete(STATS_SYNC_WATERMARK_KEY)
+    position = await game_crud.get_last_completed_game_position(
+        db=db,
+        finished_before=datetime.now(timezone.utc)
+        - timedelta(seconds=STATS_SYNC_SETTLE_SECONDS),
+    )
+    # Empty history starts from the beginning of time
+    position = position or (datetime.min.replace(tzinfo=timezone.utc), 0)
+
+    updated_entries_number = 0
+    async for rows in user_mode_stats_crud.stream_all(
+        db=db, chunk_size=STATS_SYNC_CHUNK_SIZE
+    ):
+        users_modes = [(str(row.user_sub_id), row.mode_name) for row in rows]
+        users_modes_cache_db_scores = await fetch_users_modes_stats(
+            keydb=async_keydb_instance, users_modes=users_modes
+        )
+        changed_users_modes_scores = {}
+        for user_mode, row, cache_db_scores in zip(
+            users_modes, rows, users_modes_cache_db_scores
+        ):
+            cache_db_scores = cache_db_scores or {
+                "correct_score": "0",
+                "incorrect_score": "0",
+            }
+            # Cached values are strings, so they are compared as strings
+            if (str(row.correct), str(row.incorrect)) != (
+                cache_db_scores["correct_score"],
+                cache_db_scores["incorrect_score"],
             ):
-                keydb_instance.hset(
-                    cache_db_key,
-                    mapping={
-                        "mode": mode,
-                        "correct_score": user_sub_id_sql_db_scores["correct_score"],
-                        "incorrect_score": user_sub_id_sql_db_scores["incorrect_score"],
-                    },
-                )
-    logger.info("Scheduler finished to compare and update answers for mode %s", mode)
+                changed_users_modes_scores[user_mode] = {
+                    "correct_score": row.correct,
+                    "incorrect_score": row.incorrect,
+                }
+
+        await save_users_modes_stats(
+            keydb=async_keydb_instance,
+            users_modes_scores=changed_users_modes_scores,
+        )
+        updated_entries_number += len(changed_users_modes_scores)
+
+    await async_keydb_instance.hset(
+        STATS_SYNC_WATERMARK_KEY, mapping=build_watermark_mapping(position)
+    )
+    logger.info(
+        "Statistics rebuild finished, %s entries updated", updated_entries_number
+    )
+    return updated_entries_number
+
+
+async def backfill_user_mode_stats_if_missing(db: AsyncSession) -> int:
+    """
+    One-off filling of user_mode_stats with the games completed before the
+    table existed
+
+    The totals are filled once for all replicas, the marker key is removed if
+    the filling fails, so it is retried by the next start. The cached
+    statistics and the boards read from the table are rebuilt afterwards
+
+    :param AsyncSession db: The database session
+
+    :return int: Number of written totals, 0 if the table was filled
+    """
+    if not await async_keydb_instance.set(STATS_BACKFILL_MARKER_KEY, 1, nx=True):
+        return 0
+    try:
+        totals_number = await user_mode_stats_crud.backfill(db=db)
+    except Exception:
+        await async_keydb_instance.delete(STATS_BACKFILL_MARKER_KEY)
+        raise
+    await async_keydb_instance.delete(STATS_SYNC_WATERMARK_KEY, LEADERBOARDS_BUILT_KEY)
+    logger.info("User mode statistics backfill wrote %s totals", totals_number)
+    return totals_number
+
+
+async def sync_stats() -> None:
+    """
+    Scheduled statistics synchronization
+
+    Only the games completed since the previous tick are applied, so the tick
+    cost depends on the number of new games. Full rebuild is done only if the
+    statistics were never built or the previous rebuild was interrupted.
+    Games are read from the primary, as the watermark moves past the games
+    the replica has not replayed yet. Application instances share KeyDB lock,
+    so one tick runs at a time
+    """
+    lock = async_keydb_instance.lock(
+        STATS_SYNC_LOCK_KEY, timeout=STATS_SYNC_LOCK_TIMEOUT_SECONDS
+    )
+    if not await lock.acquire(blocking=False):
+        return
+    try:
+        async for db in get_db():
+            watermark = await fetch_watermark()
+            if watermark is None:
+                await rebuild_stats(db=db)
+                continue
+            applied_games_number = await apply_completed_games(
+                db=db, watermark=watermark
+            )
+            if applied_games_number:
+                logger.info("Statistics sync applied %s games", applied_games_number)
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            logger.warning("Statistics sync lock expired before release")
+
+
+async def repair_stats() -> dict[str, str | int]:
+    """
+    Explicit full rebuild of the cached statistics
+
+    The repair is allowed once per STATS_REPAIR_INTERVAL_SECONDS for all
+    replicas and waits for the running synchronization tick
+
+    :return dict[str, str | int]: Repair status and number of updated entries
+    """
+    if not await async_keydb_instance.set(
+        STATS_REPAIR_MARKER_KEY, 1, nx=True, ex=STATS_REPAIR_INTERVAL_SECONDS
+    ):
+        return {"status": "rate_limited", "updated": 0}
+
+    lock = async_keydb_instance.lock(
+        STATS_SYNC_LOCK_KEY, timeout=STATS_SYNC_LOCK_TIMEOUT_SECONDS
+    )
+    if not await lock.acquire(blocking=True, blocking_timeout=30):
+        await async_keydb_instance.delete(STATS_REPAIR_MARKER_KEY)
+        return {"status": "busy", "updated": 0}
+    try:
+        updated_entries_number = 0
+        async for db in get_db():
+            updated_entries_number = await rebuild_stats(db=db)
+        return {"status": "completed", "updated": updated_entries_number}
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            logger.warning("Statistics repair lock expired before release")
@@ -1,16 +1,36 @@
+import csv
+import io
+import json
 import os
-from typing import Any
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
 
-import httpx
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from redis import asyncio as aioredis
+from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.configs.logging_handler import configure_logging_handler
+from app.database.db import get_replica_db
+from app.database.models import Game, GameStatus
 from app.database.repository.game import CRUDGame
+from app.services.game_status_service import (
+    register_game_deadline,
+    remove_game_deadline,
+)
+from app.services.jwks import JWKSUnavailableError, jwks_verifier
+from app.services.leaderboard_service import record_leaderboard_score
+from app.utils.http_client import http_client
+from app.utils.token_cache import token_cache
 
 load_dotenv()
 
+logger = configure_logging_handler()
+
 game_crud = CRUDGame()
 
 AUTH_BACKEND_DOMAIN = (
@@ -22,11 +42,69 @@ if os.getenv("REACT_APP_NODE_MODE") != "production":
         f"{os.getenv('REACT_APP_BACKEND_URL')}{os.getenv('REACT_APP_DOMAIN_NAME')}"
     )
 
+# Remote introspection is used only as fallback when Keycloak JWKS is unavailable
+AUTH_REMOTE_INTROSPECTION = os.getenv("AUTH_REMOTE_INTROSPECTION", "false") == "true"
+INTROSPECTION_TIMEOUT_SECONDS = float(os.getenv("INTROSPECTION_TIMEOUT_SECONDS", "3"))
+GAMES_EXPORT_CHUNK_SIZE = int(os.getenv("GAMES_EXPORT_CHUNK_SIZE", "1000"))
+GAMES_EXPORT_COLUMNS = [column.name for column in Game.__table__.columns]
+
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{AUTH_BACKEND_DOMAIN}/api-auth/v1/auth/token"
 )
 
 
+async def introspect_token_remotely(token: str) -> dict[str, Any]:
+    """
+    Token introspection through the authentication backend
+
+    Results are cached until the token expiration, so repeated requests with
+    the same token do not reach the authentication backend again
+
+    :param str token: The token to be introspected
+
+    :return dict[str, Any]: Token information returned by the authentication backend
+    """
+    token_info = await token_cache.get(token=token)
+    if token_info is not None:
+        return token_info
+
+    headers = {"Authorization": f"Bearer {token}"}
+    token_info_response = await http_client.post(
+        f"{AUTH_BACKEND_DOMAIN}/api-auth/v1/auth/introspect",
+        headers=headers,
+        timeout=INTROSPECTION_TIMEOUT_SECONDS,
+    )
+    token_info_response.raise_for_status()  # Raises an error for 4xx/5xx responses
+
+    token_info = token_info_response.json()  # Parse the JSON response
+    await token_cache.set(token=token, token_info=token_info)
+    return token_info
+
+
+async def decode_token(token: str) -> dict[str, Any]:
+    """
+    Token claims obtaining
+
+    The token is verified locally against cached Keycloak signing keys.
+    Remote introspection is used only if it is enabled with
+    AUTH_REMOTE_INTROSPECTION and the signing keys cannot be obtained
+
+    :param str token: The token to be verified
+
+    :return dict[str, Any]: Verified token claims
+    """
+    try:
+        return await jwks_verifier.verify(token=token)
+    except JWKSUnavailableError as error:
+        if not AUTH_REMOTE_INTROSPECTION:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Token signing keys are unavailable",
+            ) from error
+        logger.warning("Keycloak JWKS is unavailable, remote introspection is used")
+        return await introspect_token_remotely(token=token)
+
+
 def verify_permission(required_roles: list):
     """
     Verify user permissions based on required roles.
@@ -49,25 +127,16 @@ def verify_permission(required_roles: list):
         token: str = Depends(oauth2_scheme),
     ) -> dict[str, str]:
         try:
-            headers = {"Authorization": f"Bearer {token}"}
-            async with httpx.AsyncClient() as client:
-                token_info_response = await client.post(
-                    f"{AUTH_BACKEND_DOMAIN}/api-auth/v1/auth/introspect",
-                    headers=headers,
-                )
-
-                token_info_response.raise_for_status()  # Raises an error for 4xx/5xx responses
-
-                token_info = token_info_response.json()  # Parse the JSON response
-                user_groups = token_info.get("groups", [])
-                for role in required_roles:
-                    if role not in user_groups:
-                        raise HTTPException(
-                            status_code=status.HTTP_403_FORBIDDEN,
-                            detail=f"Role '{role}' is required to perform this action",
-                        )
-
-                return token_info_response
+            token_info = await decode_token(token=token)
+            user_groups = token_info.get("groups", [])
+            for role in required_roles:
+                if role not in user_groups:
+                    raise HTTPException(
+                        status_code=status.HTTP_403_FORBIDDEN,
+                        detail=f"Role '{role}' is required to perform this action",
+                    )
+
+            return token_info
         except Exception as exception:
             if (
                 exception
@@ -90,26 +159,19 @@ async def verify_token(token: str = Depends(oauth2_scheme)) -> dict[str, str]:
     """
     Verify the provided token.
 
-    This function checks the validity of the token by sending a request to the
-    authentication backend. If the token is valid, it returns the token information.
+    This function checks the validity of the token signature and claims against
+    Keycloak signing keys. If the token is valid, it returns the token information.
     If the token is invalid, an HTTP 401 Unauthorized error is raised
 
     :param str token: The token to be verified
 
-    :returns dict[str, str] token_info_response: Dictionary containing the token information
+    :returns dict[str, str] token_info: Dictionary containing the token information
     if the token is valid
     """
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-
-        async with httpx.AsyncClient() as client:
-            token_info_response = await client.post(
-                f"{AUTH_BACKEND_DOMAIN}/api-auth/v1/auth/introspect", headers=headers
-            )
-
-            token_info_response.raise_for_status()  # Raises an error for 4xx/5xx responses
-
-        return token_info_response
+        return await decode_token(token=token)
+    except HTTPException:
+        raise
     except Exception as exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -117,30 +179,46 @@ async def verify_token(token: str = Depends(oauth2_scheme)) -> dict[str, str]:
         ) from exception
 
 
-async def create_game(db: AsyncSession, game_data: dict):
+async def create_game(db: AsyncSession, keydb: aioredis.Redis, game_data: dict):
     """
     Create new game entry in the database.
 
     This function takes the game data and creates a new game record in the database.
+    Games in progress are registered in the deadlines sorted set, so they are
+    failed right after their latency has elapsed
 
     :param AsyncSession db: The database session to use for the operation
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
     :param dict game_data: A dictionary containing the data for the new game
 
     :returns: The created game record.
     :rtype: Any
     """
-    return await game_crud.create(db=db, game_data=game_data)
-
-
-async def update_game_result(db: AsyncSession, game_id: int, game_data: dict[str, Any]):
+    game = await game_crud.create(db=db, game_data=game_data)
+    if game.status == GameStatus.in_progress:
+        await register_game_deadline(keydb=keydb, game=game)
+    return game
+
+
+async def update_game_result(
+    db: AsyncSession,
+    keydb: aioredis.Redis,
+    game_id: int,
+    game_data: dict[str, Any],
+):
     """
     Update the result of an existing game.
 
-    This function updates the game result for a specific game identified by its ID.
+    This function updates the game result for a specific game identified by its ID
+    with single UPDATE ... RETURNING statement. Finished games are removed from
+    the deadlines sorted set and the change of their correct score is added to
+    the mode leaderboards
 
     :param db: The database session to use for the operation.
     :type db: AsyncSession
 
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+
     :param game_id: The ID of the game to update
     :type game_id: int
 
@@ -148,18 +226,118 @@ async def update_game_result(db: AsyncSession, game_id: int, game_data: dict[str
 
     :returns Any: The updated game record
     """
-    return await game_crud.update_game_result(
-        db=db, game_id=game_id, game_data=game_data
-    )
+    try:
+        game, correct_score_delta = await game_crud.update_game_result(
+            db=db, game_id=game_id, game_data=game_data
+        )
+    except NoResultFound as exception:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=str(exception)
+        ) from exception
+    if game.status != GameStatus.in_progress:
+        await remove_game_deadline(keydb=keydb, game_id=game_id)
+    if correct_score_delta:
+        await record_leaderboard_score(
+            keydb=keydb,
+            user_sub_id=str(game.user_sub_id),
+            mode=game.mode_name,
+            score_delta=correct_score_delta,
+            finished_at=game.finished_at,
+        )
+    return game
+
+
+async def fetch_games(
+    db: AsyncSession, after_id: Optional[int] = None, limit: int = 100
+) -> tuple[list[Game], Optional[int]]:
+    """
+    Fetching page of games from the database.
+    The function retrieves games following the cursor ordered by their IDs,
+    so every page costs the same regardless of its depth
 
+    :param AsyncSession db: The database session to use for the operation
+    :param Optional[int] after_id: The cursor returned with the previous page
+    :param int limit: The maximum number of games on the page
 
-async def fetch_games(db: AsyncSession):
+    :returns tuple[list[Game], Optional[int]]: Page of game records and the cursor
+    of the next page, None if there are no more games
     """
-    Fetching all games from the database.
-    The function retrieves all game records from the database
+    games = await game_crud.get_games_after(db=db, after_id=after_id, limit=limit)
+    next_cursor = games[-1].id if len(games) == limit else None
+    return games, next_cursor
 
-    :param AsyncSession db: The database session to use for the operation
 
-    :returns Any: List of all game records
+def serialize_export_value(value: Any) -> Any:
+    """
+    Converting database value into JSON and CSV compatible one
+
+    :param Any value: The column value
+
+    :returns Any: Serializable value
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def encode_ndjson_chunk(rows: list[dict[str, Any]]) -> bytes:
+    """
+    Encoding rows as newline-delimited JSON
+
+    :param list[dict[str, Any]] rows: Serializable rows
+
+    :returns bytes: One JSON object per line
+    """
+    return "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+
+
+def encode_csv_chunk(rows: list[dict[str, Any]], with_header: bool) -> bytes:
+    """
+    Encoding rows as CSV
+
+    :param list[dict[str, Any]] rows: Serializable rows
+    :param bool with_header: Whether the header line is written first
+
+    :returns bytes: CSV lines
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=GAMES_EXPORT_COLUMNS)
+    if with_header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def export_games(export_format: str) -> AsyncIterator[bytes]:
+    """
+    Streaming all games as NDJSON or CSV chunks.
+
+    Games are read from the server-side cursor, so memory usage does not
+    depend on the number of games. The session is opened by the generator
+    itself, as it outlives the request dependencies
+
+    :param str export_format: "ndjson" or "csv"
+
+    :yield bytes: Encoded chunk of games
     """
-    return await game_crud.get_all_games(db=db)
+    if export_format == "csv":
+        yield encode_csv_chunk(rows=[], with_header=True)
+    async for db in get_replica_db():
+        async for rows in game_crud.stream_games(
+            db=db, chunk_size=GAMES_EXPORT_CHUNK_SIZE
+        ):
+            serialized_rows = [
+                {
+                    column: serialize_export_value(value)
+                    for column, value in row._mapping.items()
+                }
+                for row in rows
+            ]
+            if export_format == "csv":
+                yield encode_csv_chunk(rows=serialized_rows, with_header=False)
+            else:
+                yield encode_ndjson_chunk(rows=serialized_rows)
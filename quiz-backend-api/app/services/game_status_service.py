@@ -1,63 +1,112 @@
 # In app/services/game_status_service.py
 
+import os
 from datetime import datetime, timedelta, timezone
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from redis import asyncio as aioredis
 
 from app.configs.logging_handler import configure_logging_handler
 from app.database.db import get_db
-from app.database.models import GameStatus
+from app.database.models import Game
 from app.database.repository.game import CRUDGame
+from app.utils.keydb import async_keydb_instance
 
 logger = configure_logging_handler()
 
+# Games in progress for longer than this period are considered failed
+GAME_EXPIRY_SECONDS = int(os.getenv("GAME_EXPIRY_SECONDS", "3600"))
+# Time allowed for submitting the result after the game latency has elapsed
+GAME_DEADLINE_GRACE_SECONDS = int(os.getenv("GAME_DEADLINE_GRACE_SECONDS", "30"))
+GAME_DEADLINES_BATCH_SIZE = int(os.getenv("GAME_DEADLINES_BATCH_SIZE", "500"))
+GAME_DEADLINES_KEY = "games:deadlines"
+
 # Initialize the scheduler
 scheduler = AsyncIOScheduler()
 
 
+async def register_game_deadline(keydb: aioredis.Redis, game: Game) -> None:
+    """
+    Adding the game into the sorted set scored by its deadline timestamp
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param Game game: The created game
+    """
+    deadline = (
+        game.started_at.timestamp()
+        + (game.latency_seconds or 0)
+        + GAME_DEADLINE_GRACE_SECONDS
+    )
+    await keydb.zadd(GAME_DEADLINES_KEY, {str(game.id): deadline})
+
+
+async def remove_game_deadline(keydb: aioredis.Redis, game_id: int) -> None:
+    """
+    Removing the finished game from the deadlines sorted set
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param int game_id: The ID of the finished game
+    """
+    await keydb.zrem(GAME_DEADLINES_KEY, str(game_id))
+
+
+async def expire_due_games() -> None:
+    """
+    Failing the games whose deadline has passed
+
+    Only due entries are read from the sorted set, so the cost depends on
+    the number of expired games. The entries are removed after the database
+    update, so interrupted batch is retried by the next run. Replicas
+    processing the same batch are harmless, as only games still in progress
+    are updated
+    """
+    while True:
+        due_game_ids = await async_keydb_instance.zrangebyscore(
+            GAME_DEADLINES_KEY,
+            min="-inf",
+            max=datetime.now(timezone.utc).timestamp(),
+            start=0,
+            num=GAME_DEADLINES_BATCH_SIZE,
+        )
+        if not due_game_ids:
+            return
+        failed_game_ids = []
+        async for db in get_db():
+            failed_game_ids = await CRUDGame.fail_in_progress_games_by_ids(
+                db=db, game_ids=[int(game_id) for game_id in due_game_ids]
+            )
+        await async_keydb_instance.zrem(GAME_DEADLINES_KEY, *due_game_ids)
+        if failed_game_ids:
+            logger.info(
+                "Games %s status updated to 'failed'.",
+                ", ".join(map(str, failed_game_ids)),
+            )
+        if len(due_game_ids) < GAME_DEADLINES_BATCH_SIZE:
+            return
+
+
 async def check_failed_games():
     """
     Check and update the status of in-progress failed games.
 
-    This function retrieves in-progress games from the database for today
-    and the day before yesterday. If any game has been in progress for
-    more than one hour, its status is updated to "failed". The function
-    logs the status updates for each affected game
+    All games which have been in progress for more than GAME_EXPIRY_SECONDS
+    are marked as "failed" by single bulk UPDATE, regardless of their age.
+    The sweep is safety net for games missing in the deadlines sorted set.
+    The function logs IDs of the affected games
     """
-    logger.info("Sheduler started !!!!!!")
     async for db in get_db():
         game_crud = CRUDGame()
-        # Get the current time
-        current_time = datetime.now(timezone.utc)
-
-        # Define the start and end of today
-        today_start = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-
-        # Define the start and end of the day before yesterday
-        day_before_yesterday_start = today_start - timedelta(days=2)
-        day_before_yesterday_end = today_start - timedelta(days=1)
-
-        # Fetch in-progress games for today and the day before yesterday
-        games_today = await game_crud.get_in_progress_games_for_dates(
-            db, today_start, today_end
+        started_before = datetime.now(timezone.utc) - timedelta(
+            seconds=GAME_EXPIRY_SECONDS
         )
-        games_day_before_yesterday = await game_crud.get_in_progress_games_for_dates(
-            db, day_before_yesterday_start, day_before_yesterday_end
+        failed_game_ids = await game_crud.fail_stale_in_progress_games(
+            db=db, started_before=started_before
         )
-
-        # Combine the results
-        all_games = games_today + games_day_before_yesterday
-
-        for game in all_games:
-            # Check if the game has been in progress for more than an hour
-            if game.started_at < (current_time - timedelta(hours=1)):
-                # Update the game status to "failed"
-                game_data = {"status": GameStatus.failed}
-                await game_crud.update_game_result(
-                    db=db, game_id=game.id, game_data=game_data
-                )
-                logger.info("Game ID %s status updated to 'failed'.", game.id)
+        if failed_game_ids:
+            logger.info(
+                "Games %s status updated to 'failed'.",
+                ", ".join(map(str, failed_game_ids)),
+            )
 
 
 def start_scheduler():
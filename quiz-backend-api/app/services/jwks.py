@@ -0,0 +1,196 @@
+import asyncio
+import os
+import time
+from typing import Any, Final
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+from app.configs.logging_handler import configure_logging_handler
+from app.utils.http_client import http_client
+
+load_dotenv()
+
+logger = configure_logging_handler()
+
+KEYCLOAK_URL: Final[str] = os.getenv("KEYCLOAK_URL", "")
+KEYCLOAK_JWKS_URL: Final[str] = os.getenv(
+    "KEYCLOAK_JWKS_URL", f"{KEYCLOAK_URL}/protocol/openid-connect/certs"
+)
+KC_TOKEN_AUDIENCE: Final[str | None] = os.getenv("KC_TOKEN_AUDIENCE") or None
+KC_TOKEN_ISSUER: Final[str | None] = os.getenv("KC_TOKEN_ISSUER") or None
+ALGORITHMS: Final[list[str]] = ["RS256"]
+JWKS_MAX_AGE_SECONDS: Final[int] = int(os.getenv("JWKS_MAX_AGE_SECONDS", "3600"))
+JWKS_MIN_REFRESH_INTERVAL_SECONDS: Final[int] = int(
+    os.getenv("JWKS_MIN_REFRESH_INTERVAL_SECONDS", "30")
+)
+
+
+class JWKSUnavailableError(Exception):
+    """
+    Raised when the signing keys cannot be obtained from Keycloak
+    """
+
+
+class JWKSVerifier:
+    """
+    Offline verification of Keycloak access tokens
+
+    The class keeps Keycloak JSON Web Key Set in process memory, validates
+    RS256 signatures, expiration, audience and issuer locally and refreshes
+    the key set only when it is outdated or the token refers to unknown key ID
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        audience: str | None = None,
+        issuer: str | None = None,
+        max_age_seconds: int = JWKS_MAX_AGE_SECONDS,
+        min_refresh_interval_seconds: int = JWKS_MIN_REFRESH_INTERVAL_SECONDS,
+    ):
+        """
+        Initialize the JWKSVerifier instance
+
+        :param str jwks_url: Keycloak certificates endpoint
+        :param str | None audience: Expected "aud" claim, not verified if absent
+        :param str | None issuer: Expected "iss" claim, not verified if absent
+        :param int max_age_seconds: Period after which the key set is fetched again
+        :param int min_refresh_interval_seconds: Minimal pause between refreshes
+        caused by unknown key IDs
+        """
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.issuer = issuer
+        self.max_age_seconds = max_age_seconds
+        self.min_refresh_interval_seconds = min_refresh_interval_seconds
+        self.keys: dict[str, dict[str, Any]] = {}
+        self.fetched_at: float = 0.0
+        self.attempted_at: float = 0.0
+        self.refresh_lock = asyncio.Lock()
+
+    async def fetch_keys(self) -> dict[str, dict[str, Any]]:
+        """
+        Fetching the key set from Keycloak
+
+        :return dict[str, dict[str, Any]]: Signing keys by their key IDs
+        """
+        try:
+            response = await http_client.get(self.jwks_url)
+            response.raise_for_status()
+        except httpx.HTTPError as error:
+            logger.exception("Keycloak JWKS fetching error - %s", error)
+            raise JWKSUnavailableError(str(error)) from error
+
+        return {
+            key["kid"]: key
+            for key in response.json().get("keys", [])
+            if key.get("use", "sig") == "sig" and "kid" in key
+        }
+
+    def is_outdated(self) -> bool:
+        """
+        Checking whether the cached key set is older than its maximum age
+
+        :return bool: True if the key set has to be fetched again
+        """
+        return time.monotonic() - self.fetched_at > self.max_age_seconds
+
+    async def refresh_keys(self, force: bool = False) -> None:
+        """
+        Refreshing cached key set
+
+        Concurrent callers share a single request. Refreshes caused by unknown
+        key IDs and retries after failed fetching are throttled by the minimal
+        refresh interval
+
+        :param bool force: Refresh even if the cached key set is not outdated
+        """
+        async with self.refresh_lock:
+            now = time.monotonic()
+            if self.keys and (
+                now - self.attempted_at < self.min_refresh_interval_seconds
+            ):
+                return
+            if self.keys and not force and not self.is_outdated():
+                return
+            self.attempted_at = now
+            self.keys = await self.fetch_keys()
+            self.fetched_at = time.monotonic()
+            logger.info("Keycloak JWKS was refreshed, %s keys cached", len(self.keys))
+
+    async def get_signing_key(self, kid: str) -> dict[str, Any]:
+        """
+        Signing key obtaining by its ID
+
+        Already cached keys keep being used if Keycloak is temporarily unavailable
+
+        :param str kid: Key ID from the token header
+
+        :return dict[str, Any]: JSON Web Key
+        """
+        try:
+            if not self.keys or self.is_outdated():
+                await self.refresh_keys()
+            if kid not in self.keys:
+                await self.refresh_keys(force=True)
+        except JWKSUnavailableError:
+            if kid not in self.keys:
+                raise
+            logger.warning("Outdated Keycloak JWKS is used for token verification")
+
+        if kid not in self.keys:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token signing key is unknown",
+            )
+        return self.keys[kid]
+
+    async def verify(self, token: str) -> dict[str, Any]:
+        """
+        Token signature and claims verification
+
+        :param str token: Encoded access token
+
+        :return dict[str, Any]: Verified token claims
+        """
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except JWTError as error:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Error token format"
+            ) from error
+
+        signing_key = await self.get_signing_key(kid=kid)
+        try:
+            return jwt.decode(
+                token,
+                key=signing_key,
+                algorithms=ALGORITHMS,
+                audience=self.audience,
+                issuer=self.issuer,
+                options={
+                    "verify_aud": self.audience is not None,
+                    "verify_at_hash": False,
+                },
+            )
+        except ExpiredSignatureError as error:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Token period expired"
+            ) from error
+        except JWTClaimsError as error:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail=str(error)
+            ) from error
+        except JWTError as error:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Token is not valid"
+            ) from error
+
+
+jwks_verifier = JWKSVerifier(
+    jwks_url=KEYCLOAK_JWKS_URL, audience=KC_TOKEN_AUDIENCE, issuer=KC_TOKEN_ISSUER
+)
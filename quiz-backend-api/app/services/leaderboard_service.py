@@ -0,0 +1,289 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Final, Literal
+
+from redis import asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.configs.logging_handler import configure_logging_handler
+from app.database.repository.game import CRUDGame
+from app.database.repository.user_mode_stats import CRUDUserModeStats
+
+logger = configure_logging_handler()
+
+game_crud = CRUDGame()
+user_mode_stats_crud = CRUDUserModeStats()
+
+LEADERBOARD_KEY_PREFIX: Final[str] = "leaderboard"
+LEADERBOARDS_BUILT_KEY: Final[str] = "leaderboard:built"
+LEADERBOARD_REBUILD_SUFFIX: Final[str] = "rebuild"
+# Present while the boards are rebuilt, increments are also recorded into
+# the pending keys then and merged into the rebuilt boards before the switch
+LEADERBOARDS_REBUILDING_KEY: Final[str] = "leaderboard:rebuilding"
+LEADERBOARD_PENDING_SUFFIX: Final[str] = "pending"
+LEADERBOARD_REBUILD_TIMEOUT_SECONDS: Final[int] = int(
+    os.getenv("LEADERBOARD_REBUILD_TIMEOUT_SECONDS", "600")
+)
+# Weekly boards are kept for a few weeks after their end and then expire
+LEADERBOARD_WEEKLY_TTL_SECONDS: Final[int] = int(
+    os.getenv("LEADERBOARD_WEEKLY_TTL_SECONDS", str(5 * 7 * 24 * 3600))
+)
+LEADERBOARD_REBUILD_CHUNK_SIZE: Final[int] = int(
+    os.getenv("LEADERBOARD_REBUILD_CHUNK_SIZE", "1000")
+)
+
+LeaderboardPeriod = Literal["all", "week"]
+
+
+def build_week_name(moment: datetime) -> str:
+    """
+    ISO week name of the moment in UTC
+
+    :param datetime moment: The moment within the week
+
+    :return str: Week name in "{year}-W{week}" format
+    """
+    year, week, _ = moment.astimezone(timezone.utc).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def build_leaderboard_key(
+    mode: str, period: LeaderboardPeriod, moment: datetime | None = None
+) -> str:
+    """
+    Key of the sorted set ranking users of the mode by their correct answers
+
+    :param str mode: Game mode name
+    :param LeaderboardPeriod period: "all" for all-time board, "week" for
+    board of the week containing the moment
+    :param datetime | None moment: The moment within the week, the current
+    time is used if it is absent
+
+    :return str: Sorted set key
+    """
+    if period == "all":
+        return f"{LEADERBOARD_KEY_PREFIX}:{mode}:all"
+    week_name = build_week_name(moment or datetime.now(timezone.utc))
+    return f"{LEADERBOARD_KEY_PREFIX}:{mode}:week:{week_name}"
+
+
+async def record_leaderboard_score(
+    keydb: aioredis.Redis,
+    user_sub_id: str,
+    mode: str,
+    score_delta: int,
+    finished_at: datetime | None = None,
+) -> None:
+    """
+    Adding the change of the user correct answers to the all-time and weekly
+    boards of the mode with ZINCRBY in one transaction
+
+    During the boards rebuild the change is also added to the pending keys,
+    as the rebuilt boards replace the current ones. The game is committed
+    before, so the change missed by the marker check is read by the rebuild
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param str user_sub_id: The subscription ID of the user
+    :param str mode: Game mode name
+    :param int score_delta: The change of the number of correct answers
+    :param datetime | None finished_at: The game finish time choosing the
+    weekly board, the current time is used if it is absent
+    """
+    all_time_key = build_leaderboard_key(mode=mode, period="all")
+    weekly_key = build_leaderboard_key(mode=mode, period="week", moment=finished_at)
+    rebuilding = await keydb.exists(LEADERBOARDS_REBUILDING_KEY)
+    async with keydb.pipeline(transaction=True) as pipeline:
+        pipeline.zincrby(all_time_key, score_delta, user_sub_id)
+        pipeline.zincrby(weekly_key, score_delta, user_sub_id)
+        pipeline.expire(weekly_key, LEADERBOARD_WEEKLY_TTL_SECONDS)
+        if rebuilding:
+            for leaderboard_key in (all_time_key, weekly_key):
+                pending_key = f"{leaderboard_key}:{LEADERBOARD_PENDING_SUFFIX}"
+                pipeline.zincrby(pending_key, score_delta, user_sub_id)
+                pipeline.expire(pending_key, LEADERBOARD_REBUILD_TIMEOUT_SECONDS)
+        await pipeline.execute()
+
+
+async def fetch_leaderboard(
+    keydb: aioredis.Redis, mode: str, period: LeaderboardPeriod, limit: int
+) -> list[dict[str, str | int]]:
+    """
+    Top users of the mode board
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param str mode: Game mode name
+    :param LeaderboardPeriod period: "all" or "week"
+    :param int limit: The number of top users
+
+    :return list[dict[str, str | int]]: Entries with rank, user_sub_id and
+    score values ordered by rank
+    """
+    top_users = await keydb.zrevrange(
+        build_leaderboard_key(mode=mode, period=period), 0, limit - 1, withscores=True
+    )
+    return [
+        {"rank": rank, "user_sub_id": user_sub_id.decode("utf-8"), "score": int(score)}
+        for rank, (user_sub_id, score) in enumerate(top_users, start=1)
+    ]
+
+
+async def fetch_user_rank(
+    keydb: aioredis.Redis, mode: str, period: LeaderboardPeriod, user_sub_id: str
+) -> dict[str, str | int] | None:
+    """
+    Rank and score of the user on the mode board in single round trip
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param str mode: Game mode name
+    :param LeaderboardPeriod period: "all" or "week"
+    :param str user_sub_id: The subscription ID of the user
+
+    :return dict[str, str | int] | None: Entry with rank, user_sub_id and
+    score values, None if the user is not ranked
+    """
+    leaderboard_key = build_leaderboard_key(mode=mode, period=period)
+    async with keydb.pipeline(transaction=False) as pipeline:
+        pipeline.zrevrank(leaderboard_key, user_sub_id)
+        pipeline.zscore(leaderboard_key, user_sub_id)
+        rank, score = await pipeline.execute()
+    if rank is None:
+        return None
+    return {"rank": rank + 1, "user_sub_id": user_sub_id, "score": int(score)}
+
+
+async def rebuild_leaderboards(db: AsyncSession, keydb: aioredis.Redis) -> int:
+    """
+    Building all-time and current week boards of all modes from the database
+
+    All-time scores are read from user_mode_stats and weekly ones are summed
+    over the games completed since the week start, both from one REPEATABLE
+    READ snapshot of the primary. Boards are written into temporary keys.
+    Increments recorded during the rebuild are collected in the pending keys
+    and merged with ZUNIONSTORE when the boards are switched in one
+    transaction, so readers never see half-built board and the games
+    committed after the snapshot are not lost
+
+    :param AsyncSession db: The primary database session without started
+    transaction
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+
+    :return int: Number of written board entries
+    """
+    now = datetime.now(timezone.utc)
+    week_start = (now - timedelta(days=now.weekday())).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    modes = await game_crud.get_all_game_modes_names(db=db)
+    # The snapshot of the boards is taken by a new transaction after the
+    # rebuilding marker is set
+    await db.rollback()
+    leaderboard_keys = {
+        build_leaderboard_key(mode=mode, period=period): period
+        for mode in modes
+        for period in ("all", "week")
+    }
+    async with keydb.pipeline(transaction=True) as pipeline:
+        for leaderboard_key in leaderboard_keys:
+            pipeline.delete(
+                f"{leaderboard_key}:{LEADERBOARD_REBUILD_SUFFIX}",
+                f"{leaderboard_key}:{LEADERBOARD_PENDING_SUFFIX}",
+            )
+        pipeline.set(
+            LEADERBOARDS_REBUILDING_KEY, 1, ex=LEADERBOARD_REBUILD_TIMEOUT_SECONDS
+        )
+        await pipeline.execute()
+    try:
+        entries_number = await write_rebuilt_leaderboards(
+            db=db, keydb=keydb, week_start=week_start
+        )
+        async with keydb.pipeline(transaction=True) as pipeline:
+            for leaderboard_key, period in leaderboard_keys.items():
+                rebuilt_key = f"{leaderboard_key}:{LEADERBOARD_REBUILD_SUFFIX}"
+                pending_key = f"{leaderboard_key}:{LEADERBOARD_PENDING_SUFFIX}"
+                # Missing keys are empty sets, the board is removed if both are
+                pipeline.zunionstore(leaderboard_key, [rebuilt_key, pending_key])
+                pipeline.delete(rebuilt_key, pending_key)
+                if period == "week":
+                    pipeline.expire(leaderboard_key, LEADERBOARD_WEEKLY_TTL_SECONDS)
+            pipeline.delete(LEADERBOARDS_REBUILDING_KEY)
+            await pipeline.execute()
+    except Exception:
+        await keydb.delete(LEADERBOARDS_REBUILDING_KEY)
+        raise
+    logger.info("Leaderboards rebuild finished, %s entries written", entries_number)
+    return entries_number
+
+
+async def write_rebuilt_leaderboards(
+    db: AsyncSession, keydb: aioredis.Redis, week_start: datetime
+) -> int:
+    """
+    Writing the boards of the database snapshot into the temporary keys
+
+    :param AsyncSession db: The primary database session without started
+    transaction
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param datetime week_start: The start of the current week
+
+    :return int: Number of written board entries
+    """
+    await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    entries_number = 0
+    async for rows in user_mode_stats_crud.stream_all(
+        db=db, chunk_size=LEADERBOARD_REBUILD_CHUNK_SIZE
+    ):
+        modes_scores: dict[str, dict[str, int]] = defaultdict(dict)
+        for row in rows:
+            if row.games:
+                modes_scores[row.mode_name][str(row.user_sub_id)] = row.correct
+        async with keydb.pipeline(transaction=False) as pipeline:
+            for mode, users_scores in modes_scores.items():
+                pipeline.zadd(
+                    f"{build_leaderboard_key(mode=mode, period='all')}"
+                    f":{LEADERBOARD_REBUILD_SUFFIX}",
+                    users_scores,
+                )
+                entries_number += len(users_scores)
+            await pipeline.execute()
+
+    weekly_modes_scores: dict[str, dict[str, int]] = defaultdict(dict)
+    for row in await game_crud.get_completed_scores_since(
+        db=db, finished_since=week_start
+    ):
+        weekly_modes_scores[row.mode_name][str(row.user_sub_id)] = row.correct_score
+    async with keydb.pipeline(transaction=False) as pipeline:
+        for mode, users_scores in weekly_modes_scores.items():
+            pipeline.zadd(
+                f"{build_leaderboard_key(mode=mode, period='week')}"
+                f":{LEADERBOARD_REBUILD_SUFFIX}",
+                users_scores,
+            )
+            entries_number += len(users_scores)
+        await pipeline.execute()
+
+    return entries_number
+
+
+async def rebuild_leaderboards_if_missing(
+    db: AsyncSession, keydb: aioredis.Redis
+) -> int:
+    """
+    Cold start building of the boards
+
+    The boards are built once for all replicas, the marker key is removed if
+    the building fails, so it is retried by the next start
+
+    :param AsyncSession db: The database session
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+
+    :return int: Number of written board entries, 0 if the boards were built
+    """
+    if not await keydb.set(LEADERBOARDS_BUILT_KEY, 1, nx=True):
+        return 0
+    try:
+        return await rebuild_leaderboards(db=db, keydb=keydb)
+    except Exception:
+        await keydb.delete(LEADERBOARDS_BUILT_KEY)
+        raise
@@ -0,0 +1,121 @@
+import json
+from typing import Final
+
+from redis import asyncio as aioredis
+
+from app.configs.logging_handler import configure_logging_handler
+
+logger = configure_logging_handler()
+
+RECOMMENDATIONS_KEY_PREFIX: Final[str] = "recommendations"
+RECOMMENDATIONS_MIGRATION_MARKER_KEY: Final[str] = "recommendations:migrated"
+LEGACY_RECOMMENDATIONS_KEY_SEPARATOR: Final[str] = "-recommendations-"
+MIGRATION_BATCH_SIZE: Final[int] = 500
+
+
+def build_recommendations_key(user_sub_id: str) -> str:
+    """
+    Key of the hash containing recommendations of all user modes
+
+    :param str user_sub_id: The subscription ID of the user
+
+    :return str: Hash key
+    """
+    return f"{RECOMMENDATIONS_KEY_PREFIX}:{user_sub_id}"
+
+
+async def fetch_user_recommendations(
+    keydb: aioredis.Redis, user_sub_id: str
+) -> bytes | None:
+    """
+    Recommendations of all user modes obtaining in single round trip
+
+    Entries are stored as encoded JSON objects and are joined into JSON array
+    without decoding
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param str user_sub_id: The subscription ID of the user
+
+    :return bytes | None: Encoded list of recommendations, None if there are
+    no recommendations
+    """
+    recommendations = await keydb.hvals(build_recommendations_key(user_sub_id))
+    if not recommendations:
+        return None
+    return b"[" + b",".join(recommendations) + b"]"
+
+
+async def migrate_legacy_recommendations(keydb: aioredis.Redis) -> int:
+    """
+    Moving "{user_sub_id}-recommendations-{mode}" hashes into per-user hashes
+
+    Legacy keys are found with incremental SCAN, so KeyDB is not blocked.
+    Entries already written in the new layout are not overwritten. The migration
+    is skipped once the marker key is set
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+
+    :return int: Number of migrated legacy keys
+    """
+    if await keydb.exists(RECOMMENDATIONS_MIGRATION_MARKER_KEY):
+        return 0
+
+    migrated_keys_number = 0
+    legacy_keys = []
+    async for legacy_key in keydb.scan_iter(
+        match=f"*{LEGACY_RECOMMENDATIONS_KEY_SEPARATOR}*", count=MIGRATION_BATCH_SIZE
+    ):
+        legacy_keys.append(legacy_key)
+        if len(legacy_keys) >= MIGRATION_BATCH_SIZE:
+            migrated_keys_number += await migrate_legacy_keys_batch(
+                keydb=keydb, legacy_keys=legacy_keys
+            )
+            legacy_keys = []
+    if legacy_keys:
+        migrated_keys_number += await migrate_legacy_keys_batch(
+            keydb=keydb, legacy_keys=legacy_keys
+        )
+
+    await keydb.set(RECOMMENDATIONS_MIGRATION_MARKER_KEY, 1)
+    logger.info("Recommendations migration moved %s keys", migrated_keys_number)
+    return migrated_keys_number
+
+
+async def migrate_legacy_keys_batch(
+    keydb: aioredis.Redis, legacy_keys: list[bytes]
+) -> int:
+    """
+    Moving batch of legacy recommendations hashes with two pipelined round trips
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param list[bytes] legacy_keys: Legacy keys in
+    "{user_sub_id}-recommendations-{mode}" format
+
+    :return int: Number of migrated legacy keys
+    """
+    async with keydb.pipeline(transaction=False) as pipeline:
+        for legacy_key in legacy_keys:
+            pipeline.hgetall(legacy_key)
+        # Keys of other types matched by the pattern are returned as errors
+        legacy_entries = await pipeline.execute(raise_on_error=False)
+
+    migrated_keys_number = 0
+    async with keydb.pipeline(transaction=False) as pipeline:
+        for legacy_key, legacy_entry in zip(legacy_keys, legacy_entries):
+            user_sub_id, _, mode = legacy_key.decode("utf-8").partition(
+                LEGACY_RECOMMENDATIONS_KEY_SEPARATOR
+            )
+            if not user_sub_id or not isinstance(legacy_entry, dict):
+                continue
+            recommendations_dictionary = {
+                k.decode("utf-8"): v.decode("utf-8") for k, v in legacy_entry.items()
+            }
+            pipeline.hsetnx(
+                build_recommendations_key(user_sub_id),
+                mode,
+                json.dumps(recommendations_dictionary),
+            )
+            pipeline.delete(legacy_key)
+            migrated_keys_number += 1
+        await pipeline.execute()
+    return migrated_keys_number
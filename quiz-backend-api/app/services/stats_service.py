@@ -0,0 +1,241 @@
+from typing import Final
+
+from redis import asyncio as aioredis
+
+from app.configs.logging_handler import configure_logging_handler
+
+logger = configure_logging_handler()
+
+STATS_KEY_PREFIX: Final[str] = "stats"
+STATS_FIELDS: Final[tuple[str, ...]] = ("correct_score", "incorrect_score")
+STATS_MIGRATION_MARKER_KEY: Final[str] = "stats:migrated"
+LEGACY_STATS_KEY_SEPARATOR: Final[str] = "--"
+MIGRATION_BATCH_SIZE: Final[int] = 500
+
+
+def build_stats_key(user_sub_id: str) -> str:
+    """
+    Key of the hash containing statistics of all user modes
+
+    :param str user_sub_id: The subscription ID of the user
+
+    :return str: Hash key
+    """
+    return f"{STATS_KEY_PREFIX}:{user_sub_id}"
+
+
+def build_stats_mapping(
+    mode: str, correct_score: int, incorrect_score: int
+) -> dict[str, int]:
+    """
+    Hash fields of the mode statistics
+
+    :param str mode: Game mode name
+    :param int correct_score: Number of correct answers
+    :param int incorrect_score: Number of incorrect answers
+
+    :return dict[str, int]: Fields in "{mode}:{field}" format with their values
+    """
+    return {
+        f"{mode}:correct_score": correct_score,
+        f"{mode}:incorrect_score": incorrect_score,
+    }
+
+
+def group_stats_by_mode(retrieved_entry: dict) -> dict[str, dict[str, str]]:
+    """
+    Grouping hash fields by game modes
+
+    :param dict retrieved_entry: Raw hash content in "{mode}:{field}" format
+
+    :return dict[str, dict[str, str]]: Decoded statistics by mode name
+    """
+    stats_by_mode: dict[str, dict[str, str]] = {}
+    for raw_field, raw_value in retrieved_entry.items():
+        field = raw_field.decode("utf-8") if isinstance(raw_field, bytes) else raw_field
+        value = raw_value.decode("utf-8") if isinstance(raw_value, bytes) else raw_value
+        mode, _, stat_name = field.rpartition(":")
+        if mode and stat_name in STATS_FIELDS:
+            stats_by_mode.setdefault(mode, {"mode": mode})[stat_name] = value
+    return stats_by_mode
+
+
+def decode_mode_stats(mode: str, values: list[bytes | None]) -> dict[str, str] | None:
+    """
+    Decoding mode statistics fields returned by HMGET
+
+    :param str mode: Game mode name
+    :param list[bytes | None] values: Raw values in STATS_FIELDS order
+
+    :return dict[str, str] | None: Entry with mode, correct_score and
+    incorrect_score values, None if the mode was not played
+    """
+    if all(value is None for value in values):
+        return None
+    current_mode_user_data = {"mode": mode}
+    for field, value in zip(STATS_FIELDS, values):
+        current_mode_user_data[field] = value.decode("utf-8") if value else "0"
+    return current_mode_user_data
+
+
+async def fetch_user_stats(
+    keydb: aioredis.Redis, user_sub_id: str
+) -> list[dict[str, str]]:
+    """
+    Statistics of all user modes obtaining in single round trip
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param str user_sub_id: The subscription ID of the user
+
+    :return list[dict[str, str]]: Entries with mode, correct_score and
+    incorrect_score values
+    """
+    retrieved_entry = await keydb.hgetall(build_stats_key(user_sub_id))
+    return list(group_stats_by_mode(retrieved_entry).values())
+
+
+async def fetch_user_mode_stats(
+    keydb: aioredis.Redis, user_sub_id: str, mode: str
+) -> dict[str, str] | None:
+    """
+    Statistics of the user mode obtaining
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param str user_sub_id: The subscription ID of the user
+    :param str mode: Game mode name
+
+    :return dict[str, str] | None: Entry with mode, correct_score and
+    incorrect_score values, None if the mode was not played
+    """
+    values = await keydb.hmget(
+        build_stats_key(user_sub_id), [f"{mode}:{field}" for field in STATS_FIELDS]
+    )
+    return decode_mode_stats(mode=mode, values=values)
+
+
+async def fetch_users_modes_stats(
+    keydb: aioredis.Redis, users_modes: list[tuple[str, str]]
+) -> list[dict[str, str] | None]:
+    """
+    Statistics obtaining for several users and modes in one pipelined round trip
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param list[tuple[str, str]] users_modes: Pairs of user subscription ID
+    and game mode name
+
+    :return list[dict[str, str] | None]: Entries in the pairs order, None if
+    the mode was not played
+    """
+    async with keydb.pipeline(transaction=False) as pipeline:
+        for user_sub_id, mode in users_modes:
+            pipeline.hmget(
+                build_stats_key(user_sub_id),
+                [f"{mode}:{field}" for field in STATS_FIELDS],
+            )
+        users_values = await pipeline.execute()
+
+    return [
+        decode_mode_stats(mode=mode, values=values)
+        for (_, mode), values in zip(users_modes, users_values)
+    ]
+
+
+async def save_users_modes_stats(
+    keydb: aioredis.Redis, users_modes_scores: dict[tuple[str, str], dict[str, int]]
+) -> None:
+    """
+    Statistics storing for several users and modes in one pipelined round trip
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param dict[tuple[str, str], dict[str, int]] users_modes_scores: Correct
+    and incorrect scores by user subscription ID and game mode name pairs
+    """
+    if not users_modes_scores:
+        return
+    async with keydb.pipeline(transaction=False) as pipeline:
+        for (user_sub_id, mode), scores in users_modes_scores.items():
+            pipeline.hset(
+                build_stats_key(user_sub_id),
+                mapping=build_stats_mapping(
+                    mode=mode,
+                    correct_score=scores["correct_score"],
+                    incorrect_score=scores["incorrect_score"],
+                ),
+            )
+        await pipeline.execute()
+
+
+async def migrate_legacy_user_stats(keydb: aioredis.Redis) -> int:
+    """
+    Moving "{user_sub_id}--{mode}" hashes into per-user statistics hashes
+
+    Legacy keys are found with incremental SCAN, so KeyDB is not blocked.
+    Values already written in the new layout are not overwritten. The migration
+    is skipped once the marker key is set
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+
+    :return int: Number of migrated legacy keys
+    """
+    if await keydb.exists(STATS_MIGRATION_MARKER_KEY):
+        return 0
+
+    migrated_keys_number = 0
+    legacy_keys = []
+    async for legacy_key in keydb.scan_iter(
+        match=f"*{LEGACY_STATS_KEY_SEPARATOR}*", count=MIGRATION_BATCH_SIZE
+    ):
+        legacy_keys.append(legacy_key)
+        if len(legacy_keys) >= MIGRATION_BATCH_SIZE:
+            migrated_keys_number += await migrate_legacy_keys_batch(
+                keydb=keydb, legacy_keys=legacy_keys
+            )
+            legacy_keys = []
+    if legacy_keys:
+        migrated_keys_number += await migrate_legacy_keys_batch(
+            keydb=keydb, legacy_keys=legacy_keys
+        )
+
+    await keydb.set(STATS_MIGRATION_MARKER_KEY, 1)
+    logger.info("User statistics migration moved %s keys", migrated_keys_number)
+    return migrated_keys_number
+
+
+async def migrate_legacy_keys_batch(
+    keydb: aioredis.Redis, legacy_keys: list[bytes]
+) -> int:
+    """
+    Moving batch of legacy statistics hashes with two pipelined round trips
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param list[bytes] legacy_keys: Legacy keys in "{user_sub_id}--{mode}" format
+
+    :return int: Number of migrated legacy keys
+    """
+    async with keydb.pipeline(transaction=False) as pipeline:
+        for legacy_key in legacy_keys:
+            pipeline.hgetall(legacy_key)
+        # Keys of other types matched by the pattern are returned as errors
+        legacy_entries = await pipeline.execute(raise_on_error=False)
+
+    migrated_keys_number = 0
+    async with keydb.pipeline(transaction=False) as pipeline:
+        for legacy_key, legacy_entry in zip(legacy_keys, legacy_entries):
+            user_sub_id, _, mode = legacy_key.decode("utf-8").rpartition(
+                LEGACY_STATS_KEY_SEPARATOR
+            )
+            if (
+                not user_sub_id
+                or not isinstance(legacy_entry, dict)
+                or b"correct_score" not in legacy_entry
+            ):
+                continue
+            stats_key = build_stats_key(user_sub_id)
+            for field in STATS_FIELDS:
+                pipeline.hsetnx(
+                    stats_key, f"{mode}:{field}", legacy_entry.get(field.encode(), 0)
+                )
+            pipeline.delete(legacy_key)
+            migrated_keys_number += 1
+        await pipeline.execute()
+    return migrated_keys_number
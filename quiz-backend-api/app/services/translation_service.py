@@ -1,16 +1,120 @@
+import hashlib
 import json
+import os
+import time
+from pathlib import Path
+from typing import Final
+
+from redis import asyncio as aioredis
 
 from app.configs.logging_handler import configure_logging_handler
-from app.utils.keydb import keydb_instance
 
 logger = configure_logging_handler()
 
+TRANSLATIONS_FILE_PATH: Final[Path] = Path(
+    os.getenv(
+        "TRANSLATIONS_FILE_PATH",
+        str(Path(__file__).resolve().parent.parent / "utils" / "translations.json"),
+    )
+)
+TRANSLATIONS_CURRENT_KEY: Final[str] = "translations:current"
+TRANSLATIONS_VERSION_CHECK_SECONDS: Final[float] = float(
+    os.getenv("TRANSLATIONS_VERSION_CHECK_SECONDS", "5")
+)
+# Previous version is kept for replicas which have not switched yet
+TRANSLATIONS_PREVIOUS_VERSION_TTL_SECONDS: Final[int] = int(
+    os.getenv("TRANSLATIONS_PREVIOUS_VERSION_TTL_SECONDS", "3600")
+)
+EMPTY_BUNDLE: Final[bytes] = b"{}"
+
+
+def build_bundles_key(version: str) -> str:
+    """
+    Key of the hash containing bundles of all languages for the version
+
+    :param str version: Translations version
+
+    :return str: Hash key
+    """
+    return f"translations:{version}:bundles"
+
+
+def encode_bundle(translations: dict[str, str]) -> bytes:
+    """
+    Serializing language translations into JSON bundle
+
+    Keys are sorted, so the same content always produces the same bytes
+
+    :param dict[str, str] translations: Translated strings by their identifiers
+
+    :return bytes: Encoded bundle
+    """
+    return json.dumps(
+        translations, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def calculate_etag(bundle: bytes) -> str:
+    """
+    Entity tag calculation from the bundle content
+
+    :param bytes bundle: Encoded bundle
+
+    :return str: Quoted SHA-256 hexadecimal digest
+    """
+    return f'"{hashlib.sha256(bundle).hexdigest()}"'
+
+
+def build_translation_bundles(
+    translations: dict[str, dict[str, str]],
+) -> dict[str, bytes]:
+    """
+    Grouping translations from the file format by languages
+
+    :param dict[str, dict[str, str]] translations: Translated strings by
+    identifiers and languages
+
+    :return dict[str, bytes]: Encoded bundles by language codes
+    """
+    languages_translations: dict[str, dict[str, str]] = {}
+    for key, value in translations.items():
+        for lang, text in value.items():
+            languages_translations.setdefault(lang, {})[key] = text
+    return {
+        lang: encode_bundle(language_translations)
+        for lang, language_translations in languages_translations.items()
+    }
+
+
+def calculate_version(bundles: dict[str, bytes]) -> str:
+    """
+    Content-addressed version of the translations
+
+    :param dict[str, bytes] bundles: Encoded bundles by language codes
 
-def load_translations_key_db(file_path: str) -> None:
+    :return str: Shortened SHA-256 hexadecimal digest of all bundles
+    """
+    digest = hashlib.sha256()
+    for lang in sorted(bundles):
+        digest.update(lang.encode("utf-8"))
+        digest.update(bundles[lang])
+    return digest.hexdigest()[:16]
+
+
+async def load_translations_key_db(
+    keydb: aioredis.Redis, file_path: Path = TRANSLATIONS_FILE_PATH
+) -> str | None:
     """
     Loading translations from JSON file and store them in cache database
 
-    :param str file_path: The path to containing translations JSON file
+    Bundles are written into new versioned keyspace and the current version
+    pointer is switched in the same transaction, so readers never see
+    half-updated language. Loading unchanged file does not write anything
+
+    :param aioredis.Redis keydb: Asynchronous KeyDB client
+    :param Path file_path: The path to containing translations JSON file
+
+    :return str | None: Current translations version, None if loading failed
     """
     try:
         logger.info("file_path=%s", file_path)
@@ -18,13 +122,133 @@ def load_translations_key_db(file_path: str) -> None:
         # Translations to load into KeyDB
         with file_path.open(mode="r", encoding="utf-8") as file:
             translations = json.load(file)
-        logger.info("file_translations=%s", translations)
-        for key, value in translations.items():
-            for lang, text in value.items():
-                keydb_instance.set(f"translations:{lang}:{key}", text)
+        bundles = build_translation_bundles(translations=translations)
+        version = calculate_version(bundles=bundles)
+
+        current_version = await keydb.get(TRANSLATIONS_CURRENT_KEY)
+        previous_version = current_version.decode("utf-8") if current_version else None
+        if previous_version == version:
+            logger.info("Translations version %s is already loaded", version)
+            return version
+
+        bundles_key = build_bundles_key(version)
+        async with keydb.pipeline(transaction=True) as pipeline:
+            pipeline.delete(bundles_key)
+            if bundles:
+                pipeline.hset(bundles_key, mapping=bundles)
+            pipeline.set(TRANSLATIONS_CURRENT_KEY, version)
+            if previous_version:
+                pipeline.expire(
+                    build_bundles_key(previous_version),
+                    TRANSLATIONS_PREVIOUS_VERSION_TTL_SECONDS,
+                )
+            await pipeline.execute()
+        logger.info("Translations version %s was loaded", version)
+        return version
     except FileNotFoundError:
         print("Error: The translations.json file was not found")
     except json.JSONDecodeError:
         print("Error: The translations.json file is not a valid JSON")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
+    return None
+
+
+class TranslationsFileWatcher:
+    """
+    Reloading translations when the file modification time changes
+    """
+
+    def __init__(self, file_path: Path = TRANSLATIONS_FILE_PATH):
+        """
+        Initialize the TranslationsFileWatcher instance
+
+        :param Path file_path: The path to containing translations JSON file
+        """
+        self.file_path = file_path
+        self.modified_at: float | None = None
+
+    async def check(self, keydb: aioredis.Redis) -> None:
+        """
+        Scheduled check of the translations file
+
+        :param aioredis.Redis keydb: Asynchronous KeyDB client
+        """
+        try:
+            modified_at = self.file_path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if modified_at == self.modified_at:
+            return
+        if await load_translations_key_db(keydb=keydb, file_path=self.file_path):
+            self.modified_at = modified_at
+
+
+class TranslationBundleCache:
+    """
+    Process memory copy of the translation bundles
+
+    Bundles are served as pre-encoded bytes. KeyDB is asked only for the
+    current version pointer at most once per check interval and the bundles
+    are read again only after the version changes
+    """
+
+    def __init__(
+        self, check_interval_seconds: float = TRANSLATIONS_VERSION_CHECK_SECONDS
+    ):
+        """
+        Initialize the TranslationBundleCache instance
+
+        :param float check_interval_seconds: Period between version checks
+        """
+        self.check_interval_seconds = check_interval_seconds
+        self.version: str | None = None
+        self.checked_at: float = 0.0
+        self.bundles: dict[str, tuple[str, bytes]] = {}
+
+    async def refresh_version(self, keydb: aioredis.Redis) -> None:
+        """
+        Current version checking, cached bundles are dropped after its change
+
+        :param aioredis.Redis keydb: Asynchronous KeyDB client
+        """
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval_seconds:
+            return
+        version = await keydb.get(TRANSLATIONS_CURRENT_KEY)
+        version = version.decode("utf-8") if version else None
+        if version != self.version:
+            logger.info("Translations version changed to %s", version)
+            self.version = version
+            self.bundles = {}
+        self.checked_at = now
+
+    async def get_bundle(
+        self, keydb: aioredis.Redis, language: str
+    ) -> tuple[str, bytes]:
+        """
+        Language bundle obtaining
+
+        :param aioredis.Redis keydb: Asynchronous KeyDB client
+        :param str language: The language code
+
+        :return tuple[str, bytes]: Entity tag and encoded bundle
+        """
+        await self.refresh_version(keydb=keydb)
+        cached_bundle = self.bundles.get(language)
+        if cached_bundle is not None:
+            return cached_bundle
+        if self.version is None:
+            return calculate_etag(EMPTY_BUNDLE), EMPTY_BUNDLE
+
+        bundle = await keydb.hget(build_bundles_key(self.version), language)
+        if bundle is None:
+            # Unknown languages are not cached to keep memory bounded
+            return calculate_etag(EMPTY_BUNDLE), EMPTY_BUNDLE
+        cached_bundle = (calculate_etag(bundle), bundle)
+        self.bundles[language] = cached_bundle
+        return cached_bundle
+
+
+translation_bundle_cache = TranslationBundleCache()
+translations_file_watcher = TranslationsFileWatcher()
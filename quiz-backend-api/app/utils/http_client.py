@@ -0,0 +1,289 @@
+import asyncio
+import os
+import time
+from typing import Any, Final
+
+import httpx
+
+from app.configs.logging_handler import configure_logging_handler
+from app.utils.metrics import (
+    HTTP_CLIENT_POOL_CONNECTIONS,
+    HTTP_CLIENT_POOL_WAIT_SECONDS,
+    HTTP_CLIENT_REQUESTS_IN_PROGRESS,
+    HTTP_CLIENT_REQUESTS_TOTAL,
+    HTTP_CLIENT_RETRIES_TOTAL,
+)
+
+logger = configure_logging_handler()
+
+HTTP_CLIENT_MAX_CONNECTIONS: Final[int] = int(
+    os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "100")
+)
+HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: Final[int] = int(
+    os.getenv("HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS", "20")
+)
+HTTP_CLIENT_KEEPALIVE_EXPIRY: Final[float] = float(
+    os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "30")
+)
+HTTP_CLIENT_HTTP2: Final[bool] = os.getenv("HTTP_CLIENT_HTTP2", "false") == "true"
+HTTP_CLIENT_TIMEOUT: Final[float] = float(os.getenv("HTTP_CLIENT_TIMEOUT", "5"))
+HTTP_CLIENT_POOL_TIMEOUT: Final[float] = float(
+    os.getenv("HTTP_CLIENT_POOL_TIMEOUT", "2")
+)
+HTTP_CLIENT_RETRIES: Final[int] = int(os.getenv("HTTP_CLIENT_RETRIES", "2"))
+HTTP_CLIENT_RETRY_BUDGET_RATIO: Final[float] = float(
+    os.getenv("HTTP_CLIENT_RETRY_BUDGET_RATIO", "0.2")
+)
+RETRYABLE_STATUS_CODES: Final[frozenset[int]] = frozenset({502, 503, 504})
+# The first httpcore trace event of the request after the pool has handed
+# over the connection, connecting a new one or sending over a reused one
+POOL_ACQUIRED_TRACE_EVENTS: Final[frozenset[str]] = frozenset(
+    {
+        "connection.connect_tcp.started",
+        "connection.connect_unix_socket.started",
+        "http11.send_request_headers.started",
+        "http2.send_request_headers.started",
+    }
+)
+
+
+class RetryBudget:
+    """
+    Limiting retries to the share of the regular requests
+
+    Every request deposits a part of a token, every retry withdraws a whole one.
+    When dependency is down the retries stop instead of multiplying the load
+    """
+
+    def __init__(self, ratio: float, max_tokens: float = 10.0):
+        """
+        Initialize the RetryBudget instance
+
+        :param float ratio: Allowed retries number per request
+        :param float max_tokens: Maximum number of accumulated retries
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self) -> None:
+        """
+        Registering a regular request
+        """
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Retry permission obtaining
+
+        :return bool: True if the retry fits into the budget
+        """
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class HTTPClient:
+    """
+    Application-scoped HTTP client for service-to-service calls
+
+    The class owns single connection pool with keep-alive and optional HTTP/2,
+    applies per-call timeouts and retries limited by retry budget and exports
+    connection pool metrics to Prometheus. The client is started and stopped
+    by the application lifespan
+    """
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_CLIENT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        http2: bool = HTTP_CLIENT_HTTP2,
+        timeout: float = HTTP_CLIENT_TIMEOUT,
+        pool_timeout: float = HTTP_CLIENT_POOL_TIMEOUT,
+        retries: int = HTTP_CLIENT_RETRIES,
+        retry_budget_ratio: float = HTTP_CLIENT_RETRY_BUDGET_RATIO,
+    ):
+        """
+        Initialize the HTTPClient instance
+
+        :param int max_connections: Maximum number of opened connections
+        :param int max_keepalive_connections: Maximum number of idle connections
+        :param float keepalive_expiry: Idle connection lifetime in seconds
+        :param bool http2: HTTP/2 usage if the h2 package is installed
+        :param float timeout: Default request timeout in seconds
+        :param float pool_timeout: Maximum waiting time for free connection
+        :param int retries: Default retries number for failed requests
+        :param float retry_budget_ratio: Allowed retries number per request
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.timeout = httpx.Timeout(timeout, pool=pool_timeout)
+        self.retries = retries
+        self.retry_budget = RetryBudget(ratio=retry_budget_ratio)
+        self.transport: httpx.AsyncHTTPTransport | None = None
+        self.client: httpx.AsyncClient | None = None
+        HTTP_CLIENT_POOL_CONNECTIONS.labels(state="in_use").set_function(
+            lambda: self.count_connections(idle=False)
+        )
+        HTTP_CLIENT_POOL_CONNECTIONS.labels(state="idle").set_function(
+            lambda: self.count_connections(idle=True)
+        )
+
+    async def start(self) -> httpx.AsyncClient:
+        """
+        Creation active HTTP client
+
+        :return httpx.AsyncClient: Pooled HTTP client
+        """
+        if self.client is None:
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401  # pylint: disable=C0415,W0611
+                except ImportError:
+                    logger.warning("Package h2 is not installed, HTTP/1.1 is used")
+                    http2 = False
+            self.transport = httpx.AsyncHTTPTransport(limits=self.limits, http2=http2)
+            self.client = httpx.AsyncClient(
+                transport=self.transport, timeout=self.timeout
+            )
+            logger.info("Application HTTP client was started, HTTP/2=%s", http2)
+        return self.client
+
+    async def stop(self) -> None:
+        """
+        Closing pooled connections
+        """
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+            self.transport = None
+            logger.info("Application HTTP client was finished")
+
+    def count_connections(self, idle: bool) -> int:
+        """
+        Number of the opened pool connections in the state
+
+        The httpcore pool is kept by the httpx transport, its connections are
+        read at the metrics scrape
+
+        :param bool idle: Whether idle or in-use connections are counted
+
+        :return int: The connections number, 0 if the client is not started
+        """
+        if self.transport is None:
+            return 0
+        return sum(
+            1
+            for connection in self.transport._pool.connections  # pylint: disable=W0212
+            if not connection.is_closed() and connection.is_idle() == idle
+        )
+
+    @staticmethod
+    def trace_pool_wait(started_at: float):
+        """
+        Trace callback measuring time until the request obtains connection
+
+        The time ends before connecting, so TCP and TLS handshakes of new
+        connections are not included
+
+        :param float started_at: Request start time
+
+        :return Callable: Callback for httpcore trace extension
+        """
+        measured = False
+
+        async def trace(event_name: str, _: dict[str, Any]) -> None:
+            nonlocal measured
+            if not measured and event_name in POOL_ACQUIRED_TRACE_EVENTS:
+                measured = True
+                HTTP_CLIENT_POOL_WAIT_SECONDS.observe(time.perf_counter() - started_at)
+
+        return trace
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        timeout: float | None = None,
+        retries: int | None = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Sending request through the pooled client
+
+        Connection errors and 502/503/504 responses are retried with
+        exponential backoff while the retry budget allows it
+
+        :param str method: HTTP method
+        :param str url: Request URL
+        :param float | None timeout: Request timeout overriding the default one
+        :param int | None retries: Retries number overriding the default one
+        :param kwargs: Other httpx request arguments
+
+        :return httpx.Response: Received response
+        """
+        if self.client is None:
+            raise RuntimeError("Application HTTP client is not started")
+        retries = self.retries if retries is None else retries
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, pool=self.timeout.pool)
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            HTTP_CLIENT_REQUESTS_TOTAL.inc()
+            started_at = time.perf_counter()
+            try:
+                with HTTP_CLIENT_REQUESTS_IN_PROGRESS.track_inprogress():
+                    response = await self.client.request(
+                        method,
+                        url,
+                        extensions={"trace": self.trace_pool_wait(started_at)},
+                        **kwargs,
+                    )
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                failure: httpx.Response | httpx.TransportError = response
+            except httpx.TransportError as error:
+                failure = error
+
+            if attempt >= retries or not self.retry_budget.withdraw():
+                if isinstance(failure, httpx.Response):
+                    return failure
+                raise failure
+            attempt += 1
+            HTTP_CLIENT_RETRIES_TOTAL.inc()
+            logger.warning("Retrying %s %s, attempt %s", method, url, attempt)
+            await asyncio.sleep(0.05 * 2**attempt)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Sending GET request
+
+        :param str url: Request URL
+        :param kwargs: Other request arguments
+
+        :return httpx.Response: Received response
+        """
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Sending POST request
+
+        :param str url: Request URL
+        :param kwargs: Other request arguments
+
+        :return httpx.Response: Received response
+        """
+        return await self.request("POST", url, **kwargs)
+
+
+http_client = HTTPClient()
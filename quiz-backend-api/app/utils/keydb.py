@@ -1,7 +1,96 @@
 import os
+import time
+from typing import Any, Final
 
-from redis import StrictRedis
+from fastapi import Request
+from redis import asyncio as aioredis
+from redis.asyncio.client import Pipeline
+
+from app.utils.metrics import KEYDB_COMMAND_DURATION_SECONDS
 
 KEYDB_PASSWORD = os.getenv("KEYDB_PASSWORD")
-# Connect to KeyDB
-keydb_instance = StrictRedis(host="keydb", port=6379, password=KEYDB_PASSWORD)
+KEYDB_MAX_CONNECTIONS: Final[int] = int(os.getenv("KEYDB_MAX_CONNECTIONS", "50"))
+KEYDB_POOL_TIMEOUT: Final[float] = float(os.getenv("KEYDB_POOL_TIMEOUT", "5"))
+
+
+class InstrumentedPipeline(Pipeline):
+    """
+    KeyDB pipeline measuring latency of the whole batch
+    """
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        """
+        Executing all buffered commands in single round trip
+
+        :param bool raise_on_error: Whether the first command error is raised
+
+        :return list[Any]: Results of the commands
+        """
+        command = "MULTI" if self.is_transaction else "PIPELINE"
+        started_at = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error=raise_on_error)
+        finally:
+            KEYDB_COMMAND_DURATION_SECONDS.labels(command=command).observe(
+                time.perf_counter() - started_at
+            )
+
+
+class InstrumentedRedis(aioredis.Redis):
+    """
+    KeyDB client measuring latency of every command
+    """
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        """
+        Executing command and recording its latency
+
+        :param args: Command name and its arguments
+
+        :return Any: Command result
+        """
+        started_at = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            KEYDB_COMMAND_DURATION_SECONDS.labels(command=str(args[0]).upper()).observe(
+                time.perf_counter() - started_at
+            )
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint: str | None = None
+    ) -> InstrumentedPipeline:
+        """
+        Creating measured pipeline
+
+        :param bool transaction: Whether the commands are wrapped in MULTI/EXEC
+        :param str | None shard_hint: Unused sharding hint
+
+        :return InstrumentedPipeline: New pipeline
+        """
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+# Connect to KeyDB, waiting callers share bounded pool instead of opening new sockets
+keydb_connection_pool = aioredis.BlockingConnectionPool(
+    host="keydb",
+    port=6379,
+    password=KEYDB_PASSWORD,
+    max_connections=KEYDB_MAX_CONNECTIONS,
+    timeout=KEYDB_POOL_TIMEOUT,
+)
+async_keydb_instance = InstrumentedRedis(connection_pool=keydb_connection_pool)
+
+
+async def get_keydb(request: Request) -> aioredis.Redis:
+    """
+    Dependency function to retrieve the KeyDB client from the FastAPI application state
+
+    :param Request request: The FastAPI request object, which provides access
+    to the application state
+
+    :returns aioredis.Redis: The KeyDB client instance stored in the application state
+    """
+    return request.app.state.keydb
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Final
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.configs.logging_handler import configure_logging_handler
+from app.utils.keydb import async_keydb_instance
+
+logger = configure_logging_handler()
+
+TOKEN_CACHE_MAX_SIZE: Final[int] = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+TOKEN_CACHE_MAX_TTL_SECONDS: Final[int] = int(
+    os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "300")
+)
+TOKEN_CACHE_KEY_PREFIX: Final[str] = "introspect"
+TOKEN_CACHE_INVALIDATION_CHANNEL: Final[str] = "introspect:invalidate"
+
+
+def hash_token(token: str) -> str:
+    """
+    Token hashing, so raw bearer tokens never become cache keys
+
+    :param str token: Encoded token
+
+    :return str: SHA-256 hexadecimal digest of the token
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def fetch_session_id(token_info: dict[str, Any]) -> str | None:
+    """
+    Keycloak session identifier obtaining from token claims
+
+    :param dict[str, Any] token_info: Token claims or introspection result
+
+    :return str | None: Session identifier if it is presented
+    """
+    return token_info.get("sid") or token_info.get("session_state")
+
+
+class TokenIntrospectionCache:
+    """
+    Two-tier cache of token introspection results
+
+    The first tier is bounded in-process LRU, the second one is shared KeyDB
+    storage keyed by SHA-256 of the token. Entries never outlive the token
+    "exp" claim and are grouped by Keycloak session for logout invalidation
+    """
+
+    def __init__(
+        self,
+        keydb: aioredis.Redis,
+        max_size: int = TOKEN_CACHE_MAX_SIZE,
+        max_ttl_seconds: int = TOKEN_CACHE_MAX_TTL_SECONDS,
+    ):
+        """
+        Initialize the TokenIntrospectionCache instance
+
+        :param aioredis.Redis keydb: Asynchronous KeyDB client
+        :param int max_size: Maximum number of entries in process memory
+        :param int max_ttl_seconds: Maximum entry lifetime in seconds
+        """
+        self.keydb = keydb
+        self.max_size = max_size
+        self.max_ttl_seconds = max_ttl_seconds
+        self.entries: OrderedDict[str, tuple[float, str | None, dict[str, Any]]] = (
+            OrderedDict()
+        )
+
+    def calculate_ttl(self, token_info: dict[str, Any]) -> int:
+        """
+        Entry lifetime calculation bounded by the token expiration
+
+        :param dict[str, Any] token_info: Introspection result
+
+        :return int: Lifetime in seconds, zero if the result must not be cached
+        """
+        expires_at = token_info.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return 0
+        return max(0, min(self.max_ttl_seconds, int(expires_at - time.time())))
+
+    def get_local(self, token_hash: str) -> dict[str, Any] | None:
+        """
+        Entry obtaining from the in-process tier
+
+        :param str token_hash: Token hash
+
+        :return dict[str, Any] | None: Cached introspection result
+        """
+        entry = self.entries.get(token_hash)
+        if entry is None:
+            return None
+        expires_at, _, token_info = entry
+        if expires_at <= time.monotonic():
+            del self.entries[token_hash]
+            return None
+        self.entries.move_to_end(token_hash)
+        return token_info
+
+    def set_local(self, token_hash: str, token_info: dict[str, Any], ttl: int) -> None:
+        """
+        Entry storing in the in-process tier with the least recently used eviction
+
+        :param str token_hash: Token hash
+        :param dict[str, Any] token_info: Introspection result
+        :param int ttl: Entry lifetime in seconds
+        """
+        self.entries[token_hash] = (
+            time.monotonic() + ttl,
+            fetch_session_id(token_info),
+            token_info,
+        )
+        self.entries.move_to_end(token_hash)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate_local(self, session_id: str) -> None:
+        """
+        In-process entries removing for the finished session
+
+        :param str session_id: Keycloak session identifier
+        """
+        for token_hash in [
+            token_hash
+            for token_hash, (_, entry_session_id, _) in self.entries.items()
+            if entry_session_id == session_id
+        ]:
+            del self.entries[token_hash]
+
+    async def get(self, token: str) -> dict[str, Any] | None:
+        """
+        Cached introspection result obtaining
+
+        :param str token: Encoded token
+
+        :return dict[str, Any] | None: Cached introspection result
+        """
+        token_hash = hash_token(token)
+        token_info = self.get_local(token_hash)
+        if token_info is not None:
+            return token_info
+
+        try:
+            cached_value = await self.keydb.get(
+                f"{TOKEN_CACHE_KEY_PREFIX}:{token_hash}"
+            )
+        except RedisError as error:
+            logger.warning("Introspection cache reading error - %s", error)
+            return None
+        if cached_value is None:
+            return None
+
+        token_info = json.loads(cached_value)
+        ttl = self.calculate_ttl(token_info)
+        if ttl:
+            self.set_local(token_hash, token_info, ttl)
+        return token_info
+
+    async def set(self, token: str, token_info: dict[str, Any]) -> None:
+        """
+        Introspection result storing in both tiers
+
+        :param str token: Encoded token
+        :param dict[str, Any] token_info: Introspection result
+        """
+        ttl = self.calculate_ttl(token_info)
+        if not ttl:
+            return
+        token_hash = hash_token(token)
+        self.set_local(token_hash, token_info, ttl)
+
+        session_id = fetch_session_id(token_info)
+        try:
+            async with self.keydb.pipeline(transaction=False) as pipeline:
+                pipeline.set(
+                    f"{TOKEN_CACHE_KEY_PREFIX}:{token_hash}",
+                    json.dumps(token_info),
+                    ex=ttl,
+                )
+                if session_id:
+                    session_key = f"{TOKEN_CACHE_KEY_PREFIX}:sid:{session_id}"
+                    pipeline.sadd(session_key, token_hash)
+                    pipeline.expire(session_key, self.max_ttl_seconds)
+                await pipeline.execute()
+        except RedisError as error:
+            logger.warning("Introspection cache writing error - %s", error)
+
+    async def listen_invalidations(self) -> None:
+        """
+        Evicting in-process entries of the sessions finished on other replicas
+        """
+        pubsub = self.keydb.pubsub()
+        await pubsub.subscribe(TOKEN_CACHE_INVALIDATION_CHANNEL)
+        try:
+            while True:
+                try:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                except RedisError as error:
+                    logger.warning("Introspection cache invalidation error - %s", error)
+                    await asyncio.sleep(1)
+                    continue
+                if message and message.get("data"):
+                    session_id = message["data"]
+                    if isinstance(session_id, bytes):
+                        session_id = session_id.decode("utf-8")
+                    self.invalidate_local(session_id)
+        finally:
+            await pubsub.aclose()
+
+
+token_cache = TokenIntrospectionCache(keydb=async_keydb_instance)
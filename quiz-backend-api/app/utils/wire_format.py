@@ -0,0 +1,85 @@
+import json
+from typing import Any, Final, Sequence
+
+import msgpack
+
+# Kafka record header naming the payload format and its version. Records
+# without the header are JSON, as produced by quiz-backend-chat
+WIRE_FORMAT_HEADER: Final[str] = "content-format"
+JSON_FORMAT: Final[bytes] = b"json"
+MSGPACK_FORMAT: Final[bytes] = b"msgpack/1"
+# Answer messages are packed as msgpack arrays in the fields order, so the
+# field names are not repeated in every record
+ANSWER_MESSAGE_FORMAT: Final[bytes] = b"answer/1"
+ANSWER_MESSAGE_FIELDS: Final[tuple[str, ...]] = (
+    "gameId",
+    "mode",
+    "question",
+    "userAnswer",
+    "correctAnswer",
+    "isCorrect",
+    "answerTime",
+)
+
+
+class UnsupportedWireFormatError(ValueError):
+    """
+    Raised for records in unknown format or version
+    """
+
+
+def encode_message(
+    message: dict[str, Any], wire_format: bytes = MSGPACK_FORMAT
+) -> tuple[bytes, list[tuple[str, bytes]]]:
+    """
+    Serializing the message into the Kafka record value and headers
+
+    :param dict[str, Any] message: The message fields
+    :param bytes wire_format: JSON_FORMAT, MSGPACK_FORMAT or ANSWER_MESSAGE_FORMAT
+
+    :return tuple[bytes, list[tuple[str, bytes]]]: The record value and headers
+    """
+    if wire_format == ANSWER_MESSAGE_FORMAT:
+        value = msgpack.packb([message.get(field) for field in ANSWER_MESSAGE_FIELDS])
+    elif wire_format == MSGPACK_FORMAT:
+        value = msgpack.packb(message)
+    elif wire_format == JSON_FORMAT:
+        value = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    else:
+        raise UnsupportedWireFormatError(f"Unknown wire format {wire_format!r}")
+    return value, [(WIRE_FORMAT_HEADER, wire_format)]
+
+
+def find_wire_format(headers: Sequence[tuple[str, bytes]] | None) -> bytes:
+    """
+    Payload format of the Kafka record
+
+    :param Sequence[tuple[str, bytes]] | None headers: The record headers
+
+    :return bytes: The format from the header, JSON_FORMAT if it is absent
+    """
+    for key, value in headers or ():
+        if key == WIRE_FORMAT_HEADER:
+            return value
+    return JSON_FORMAT
+
+
+def decode_message(
+    value: bytes, headers: Sequence[tuple[str, bytes]] | None = None
+) -> dict[str, Any]:
+    """
+    Deserializing the Kafka record value according to its format header
+
+    :param bytes value: The record value
+    :param Sequence[tuple[str, bytes]] | None headers: The record headers
+
+    :return dict[str, Any]: The message fields
+    """
+    wire_format = find_wire_format(headers)
+    if wire_format == ANSWER_MESSAGE_FORMAT:
+        return dict(zip(ANSWER_MESSAGE_FIELDS, msgpack.unpackb(value)))
+    if wire_format == MSGPACK_FORMAT:
+        return msgpack.unpackb(value)
+    if wire_format == JSON_FORMAT:
+        return json.loads(value)
+    raise UnsupportedWireFormatError(f"Unknown wire format {wire_format!r}")
@@ -9,6 +9,7 @@ import pytest
 from dotenv import load_dotenv
 from fastapi import status
 from httpx import AsyncClient, Client, ConnectError, ReadError, Response
+from sqlalchemy.ext.asyncio import create_async_engine
 
 from .data_generating_testing import (
     generate_random_keycloak_token,
@@ -25,6 +26,9 @@ KEYCLOAK_ADMIN_PASSWORD = os.getenv("KEYCLOAK_ADMIN_PASSWORD")
 KC_PORT = os.getenv("KC_PORT")
 QUIZ_BACKEND_PORT = os.getenv("QUIZ_BACKEND_PORT")
 KEYDB_PORT = os.getenv("KEYDB_PORT")
+BACKEND_POSTGRES_USER = os.getenv("BACKEND_POSTGRES_USER")
+BACKEND_POSTGRES_PASSWORD = os.getenv("BACKEND_POSTGRES_PASSWORD")
+BACKEND_POSTGRES_DB = os.getenv("BACKEND_POSTGRES_DB")
 
 USER, PASSWORD = generate_test_credentials()
 ACCESS_TOKEN = generate_random_keycloak_token()
@@ -328,3 +332,32 @@ async def common_user_tokens(backend_container_quiz_runner) -> dict[str, str]:
         "refresh_token": response.json()["refresh_token"],
         "user_sub_id": response_token_introspection.json()["sub"],
     }
+
+
+@pytest.fixture(scope="function")
+async def game_db_connection(backend_container_quiz_runner, docker_ip, docker_services):
+    """
+    Fixture that provides connection to the game database container
+
+    The connection is opened after the backend quiz container has created
+    the schema and its transaction is rolled back after the test
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    :param str docker_ip: The IP address of the Docker service
+    :param docker_services docker_services: The Docker services fixture
+
+    :yield AsyncConnection: Connection to the game database
+    """
+    port_db = docker_services.port_for("db", 5432)
+    engine = create_async_engine(
+        f"postgresql+asyncpg://{BACKEND_POSTGRES_USER}:{BACKEND_POSTGRES_PASSWORD}"
+        f"@{docker_ip}:{port_db}/{BACKEND_POSTGRES_DB}"
+    )
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            yield connection
+            await transaction.rollback()
+    finally:
+        await engine.dispose()
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from app.brokers import kafka
+from app.brokers.kafka import KafkaProducer
+
+
+class RecordingProducer:
+    """
+    Replacement of AIOKafkaProducer keeping the sent records, their deliveries
+    are resolved by flush as the broker acknowledgements
+    """
+
+    def __init__(self):
+        self.records = []
+        self.deliveries = []
+        self.stopped = False
+
+    async def send(self, topic, key=None, value=None, headers=None):
+        delivery = asyncio.get_running_loop().create_future()
+        self.records.append((topic, key, value, headers))
+        self.deliveries.append(delivery)
+        return delivery
+
+    async def flush(self):
+        for offset, delivery in enumerate(self.deliveries):
+            if not delivery.done():
+                delivery.set_result(offset)
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    """
+    Fixture that runs the tests on asyncio, the only loop supported by aiokafka
+
+    :return str: The anyio backend name
+    """
+    return "asyncio"
+
+
+@pytest.fixture
+def kafka_producer() -> KafkaProducer:
+    """
+    Fixture that provides the Kafka producer sending into RecordingProducer
+
+    :return KafkaProducer: The producer with the recording client
+    """
+    producer = KafkaProducer(
+        bootstrap_servers="kafka:9092", topic="events", compression_type=None
+    )
+    producer.producer = RecordingProducer()
+    return producer
+
+
+@pytest.mark.anyio
+async def test_produce_message_requires_started_producer():
+    """
+    Testing that the message is not accepted before the producer is started.
+    """
+    producer = KafkaProducer(
+        bootstrap_servers="kafka:9092", topic="events", compression_type=None
+    )
+    with pytest.raises(RuntimeError):
+        await producer.produce_message(key="key", value="value")
+
+
+@pytest.mark.anyio
+async def test_produce_many_sends_headers_and_flush_waits_deliveries(
+    kafka_producer,
+):
+    """
+    Testing that the messages are sent with their headers and delivered by flush.
+
+    The deliveries are only pending after produce_many and all of them are
+    resolved and released once flush returns
+
+    :param kafka_producer: Fixture that provides the Kafka producer sending
+        into RecordingProducer
+    """
+    headers = [("content-format", b"msgpack/1")]
+    deliveries = await kafka_producer.produce_many(
+        [("first", b"1", headers), (None, "2", None)]
+    )
+    assert kafka_producer.producer.records == [
+        ("events", b"first", b"1", headers),
+        ("events", None, b"2", None),
+    ]
+    assert not any(delivery.done() for delivery in deliveries)
+
+    await kafka_producer.flush()
+    assert [delivery.result() for delivery in deliveries] == [0, 1]
+    assert not kafka_producer.pending_deliveries
+
+
+@pytest.mark.anyio
+async def test_stop_delivers_pending_messages(kafka_producer):
+    """
+    Testing that stopping the producer delivers the pending messages first.
+
+    :param kafka_producer: Fixture that provides the Kafka producer sending
+        into RecordingProducer
+    """
+    delivery = await kafka_producer.produce_message(key="key", value="value")
+
+    await kafka_producer.stop()
+    assert delivery.done()
+    assert kafka_producer.producer.stopped
+    assert not kafka_producer.pending_deliveries
+
+
+def test_missing_codec_falls_back_to_gzip(monkeypatch):
+    """
+    Testing that the codec without installed library is replaced with gzip.
+    """
+    monkeypatch.setitem(kafka.KAFKA_CODECS_CHECKS, "zstd", lambda: False)
+    producer = KafkaProducer(
+        bootstrap_servers="kafka:9092", topic="events", compression_type="zstd"
+    )
+    assert producer.compression_type == "gzip"
@@ -1,8 +1,65 @@
+import asyncio
+import csv
+import json
 import random
 from datetime import datetime, timezone
 
 import pytest
 from fastapi import status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from app.database.repository.crud_base import CRUDBase
+
+STATS_SYNC_WAIT_ATTEMPTS = 60
+
+
+class RowsBase(DeclarativeBase):
+    pass
+
+
+class GameModeRow(RowsBase):
+    """
+    Mapping of the game modes table, the application models are not imported,
+    as their module connects to the configured database
+    """
+
+    __tablename__ = "game_modes"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(unique=True)
+GAMES_HOT_QUERIES_INDEXES = [
+    (
+        "SELECT correct_score, incorrect_score FROM games "
+        "WHERE user_sub_id = '00000000-0000-0000-0000-000000000000' "
+        "AND mode_name = 'music' AND status = 'completed'",
+        "ix_games_user_sub_id_mode_name_status",
+    ),
+    (
+        "SELECT correct_score, incorrect_score FROM games "
+        "WHERE user_sub_id = '00000000-0000-0000-0000-000000000000' "
+        "AND status = 'completed'",
+        "ix_games_user_sub_id_mode_name_status",
+    ),
+    (
+        "UPDATE games SET status = 'failed' "
+        "WHERE status = 'in_progress' AND started_at < now() - interval '1 hour'",
+        "ix_games_in_progress_started_at",
+    ),
+    (
+        "SELECT id FROM games "
+        "WHERE started_at >= now() - interval '2 days' "
+        "AND started_at < now() - interval '1 day'",
+        "ix_games_started_at_brin",
+    ),
+    (
+        "SELECT id FROM games WHERE status = 'completed' "
+        "AND (finished_at, id) > (now() - interval '1 hour', 0) "
+        "ORDER BY finished_at, id LIMIT 1000",
+        "ix_games_completed_finished_at_id",
+    ),
+]
 
 
 @pytest.mark.anyio
@@ -22,6 +79,26 @@ async def test_health_check(backend_container_quiz_runner):
     assert response.status_code == status.HTTP_200_OK
 
 
+@pytest.mark.anyio
+async def test_metrics(backend_container_quiz_runner):
+    """
+    Testing the Prometheus metrics endpoint.
+
+    The test verifies that GET request to the `/metrics` endpoint returns
+    request latency histogram labelled with route templates
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    """
+    async_quiz_client = backend_container_quiz_runner["quiz_backend"]
+    await async_quiz_client.get(url="/check-game")
+    response = await async_quiz_client.get(url="/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert 'http_request_duration_seconds_count{method="GET",route="/check-game"' in (
+        response.text
+    )
+
+
 @pytest.mark.anyio
 async def test_admin_user_create_game_result(
     backend_container_quiz_runner, admin_user_tokens
@@ -140,6 +217,187 @@ async def test_admin_user_submit_game_result(
         json=game_result,
     )
     assert response.status_code == status.HTTP_200_OK
+    assert response.json()["id"] == game_result["id"]
+    assert response.json()["status"] == "completed"
+    assert response.json()["correct_score"] == correct_score
+    assert response.json()["incorrect_score"] == incorrect_score
+
+
+@pytest.mark.anyio
+async def test_submit_unknown_game_result(
+    backend_container_quiz_runner, admin_user_tokens
+):
+    """
+    Testing submitting result of the game which does not exist.
+
+    The test verifies that PATCH request to the `/api/v1/games/results`
+    endpoint with unknown game ID returns 404 Not Found
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    :param admin_user_tokens: Dictionary containing the access token and refresh token
+        for admin user, used for authentication in the request
+    """
+    async_quiz_client = backend_container_quiz_runner["quiz_backend"]
+    game_result = {
+        "id": 2**31 - 1,
+        "status": "completed",
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "correct_score": 1,
+        "incorrect_score": 1,
+        "total_score": 2,
+    }
+    response = await async_quiz_client.patch(
+        url="/api/v1/games/results",
+        headers={"Authorization": f"Bearer {admin_user_tokens['access_token']}"},
+        json=game_result,
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.anyio
+async def test_user_mode_stats_follow_game_results(
+    backend_container_quiz_runner, admin_user_tokens, game_db_connection
+):
+    """
+    Testing that per-user mode totals are changed together with the game result.
+
+    The test completes the game and checks that its scores are added to the
+    user_mode_stats row, then fails the same game and checks that the scores
+    are subtracted again
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    :param admin_user_tokens: Dictionary containing the access token and refresh token
+        for admin user, used for authentication in the request
+    :param game_db_connection: Fixture that provides connection to the game
+        database container
+    """
+    async_quiz_client = backend_container_quiz_runner["quiz_backend"]
+    headers = {"Authorization": f"Bearer {admin_user_tokens['access_token']}"}
+    mode = random.choice(["music", "arithmetic", "trigonometry"])
+
+    async def fetch_user_mode_totals() -> tuple[int, int, int]:
+        result = await game_db_connection.execute(
+            text(
+                "SELECT games, correct, incorrect FROM user_mode_stats "
+                "WHERE user_sub_id = :user_sub_id AND mode_name = :mode_name"
+            ),
+            {"user_sub_id": admin_user_tokens["user_sub_id"], "mode_name": mode},
+        )
+        row = result.first()
+        return tuple(row) if row else (0, 0, 0)
+
+    initial_totals = await fetch_user_mode_totals()
+    response_creation = await async_quiz_client.post(
+        url="/api/v1/games/create",
+        headers=headers,
+        json={
+            "user_sub_id": admin_user_tokens["user_sub_id"],
+            "latency_seconds": 180,
+            "mode": mode,
+        },
+    )
+    assert response_creation.status_code == status.HTTP_200_OK
+
+    correct_score = random.randint(5, 20)
+    incorrect_score = random.randint(5, 20)
+    game_result = {
+        "id": response_creation.json()["id"],
+        "status": "completed",
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "correct_score": correct_score,
+        "incorrect_score": incorrect_score,
+        "total_score": correct_score + incorrect_score,
+    }
+    response = await async_quiz_client.patch(
+        url="/api/v1/games/results", headers=headers, json=game_result
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert await fetch_user_mode_totals() == (
+        initial_totals[0] + 1,
+        initial_totals[1] + correct_score,
+        initial_totals[2] + incorrect_score,
+    )
+
+    response = await async_quiz_client.patch(
+        url="/api/v1/games/results",
+        headers=headers,
+        json={**game_result, "status": "failed"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert await fetch_user_mode_totals() == initial_totals
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("period", ["all", "week"])
+async def test_leaderboard_follows_game_results(
+    backend_container_quiz_runner, common_user_tokens, period
+):
+    """
+    Testing the mode leaderboard.
+
+    The test completes the game and checks that the correct score of the
+    user on the mode leaderboard grows by the game correct score, and that
+    the top of the leaderboard is ordered by scores
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    :param common_user_tokens: Dictionary containing the access token and refresh
+        token for common user, used for authentication in the request
+    :param str period: The leaderboard period
+    """
+    async_quiz_client = backend_container_quiz_runner["quiz_backend"]
+    headers = {"Authorization": f"Bearer {common_user_tokens['access_token']}"}
+    user_sub_id = common_user_tokens["user_sub_id"]
+    mode = random.choice(["music", "arithmetic", "trigonometry"])
+    rank_url = f"/api/v1/stats/leaderboard/{mode}/{user_sub_id}"
+
+    response = await async_quiz_client.get(
+        url=rank_url, headers=headers, params={"period": period}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    initial_score = response.json()["score"] if response.json() else 0
+
+    response_creation = await async_quiz_client.post(
+        url="/api/v1/games/create",
+        headers=headers,
+        json={"user_sub_id": user_sub_id, "latency_seconds": 180, "mode": mode},
+    )
+    assert response_creation.status_code == status.HTTP_200_OK
+    correct_score = random.randint(5, 20)
+    response_result = await async_quiz_client.patch(
+        url="/api/v1/games/results",
+        headers=headers,
+        json={
+            "id": response_creation.json()["id"],
+            "status": "completed",
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "correct_score": correct_score,
+            "incorrect_score": 0,
+            "total_score": correct_score,
+        },
+    )
+    assert response_result.status_code == status.HTTP_200_OK
+
+    response = await async_quiz_client.get(
+        url=rank_url, headers=headers, params={"period": period}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["score"] == initial_score + correct_score
+    assert response.json()["rank"] >= 1
+
+    response = await async_quiz_client.get(
+        url=f"/api/v1/stats/leaderboard/{mode}",
+        headers=headers,
+        params={"period": period, "limit": 100},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    scores = [entry["score"] for entry in response.json()]
+    assert scores == sorted(scores, reverse=True)
+    assert [entry["rank"] for entry in response.json()] == list(
+        range(1, len(scores) + 1)
+    )
 
 
 @pytest.mark.anyio
@@ -196,6 +454,102 @@ async def test_common_user_submit_game_result(
     assert response.status_code == status.HTTP_200_OK
 
 
+@pytest.mark.anyio
+async def test_admin_user_fetch_games_results_pages(
+    backend_container_quiz_runner, admin_user_tokens
+):
+    """
+    Testing keyset pagination of the game results.
+
+    The test creates games and walks `/api/v1/games/results` pages using
+    the X-Next-Cursor header. It checks that pages do not overlap and
+    that every created game is returned
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    :param admin_user_tokens: Dictionary containing the access token and refresh token
+        for admin user, used for authentication in the request
+    """
+    async_quiz_client = backend_container_quiz_runner["quiz_backend"]
+    headers = {"Authorization": f"Bearer {admin_user_tokens['access_token']}"}
+    created_game_ids = set()
+    for _ in range(3):
+        response_creation = await async_quiz_client.post(
+            url="/api/v1/games/create",
+            headers=headers,
+            json={
+                "user_sub_id": admin_user_tokens["user_sub_id"],
+                "latency_seconds": 180,
+                "mode": "music",
+            },
+        )
+        assert response_creation.status_code == status.HTTP_200_OK
+        created_game_ids.add(response_creation.json()["id"])
+
+    fetched_game_ids = []
+    params = {"limit": 2}
+    while True:
+        response = await async_quiz_client.get(
+            url="/api/v1/games/results", headers=headers, params=params
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) <= 2
+        fetched_game_ids.extend(game["id"] for game in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            break
+        params["cursor"] = next_cursor
+
+    assert fetched_game_ids == sorted(set(fetched_game_ids))
+    assert created_game_ids <= set(fetched_game_ids)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+async def test_admin_user_export_games_results(
+    backend_container_quiz_runner, admin_user_tokens, export_format
+):
+    """
+    Testing streaming export of the game results.
+
+    The test verifies that `/api/v1/games/results/export` streams
+    the created game in the requested format
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    :param admin_user_tokens: Dictionary containing the access token and refresh token
+        for admin user, used for authentication in the request
+    :param str export_format: The export format
+    """
+    async_quiz_client = backend_container_quiz_runner["quiz_backend"]
+    headers = {"Authorization": f"Bearer {admin_user_tokens['access_token']}"}
+    response_creation = await async_quiz_client.post(
+        url="/api/v1/games/create",
+        headers=headers,
+        json={
+            "user_sub_id": admin_user_tokens["user_sub_id"],
+            "latency_seconds": 180,
+            "mode": "music",
+        },
+    )
+    assert response_creation.status_code == status.HTTP_200_OK
+    game_id = response_creation.json()["id"]
+
+    response = await async_quiz_client.get(
+        url="/api/v1/games/results/export",
+        headers=headers,
+        params={"export_format": export_format},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    lines = response.text.splitlines()
+    if export_format == "csv":
+        exported_games = list(csv.DictReader(lines))
+        assert str(game_id) in {game["id"] for game in exported_games}
+    else:
+        exported_games = [json.loads(line) for line in lines]
+        assert game_id in {game["id"] for game in exported_games}
+
+
 @pytest.mark.anyio
 async def test_get_translations(backend_container_quiz_runner):
     """
@@ -220,6 +574,63 @@ async def test_get_translations(backend_container_quiz_runner):
     assert isinstance(response.json(), dict)
 
 
+@pytest.mark.anyio
+async def test_get_translations_not_modified(backend_container_quiz_runner):
+    """
+    Testing revalidation of the cached translations.
+
+    The test verifies that the `/api/v1/translations/{language}` endpoint
+    returns entity tag of the bundle and answers request with the same
+    tag in `If-None-Match` header with 304 Not Modified and empty body
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    """
+    async_quiz_client = backend_container_quiz_runner["quiz_backend"]
+    response = await async_quiz_client.get("/api/v1/translations/en")
+    assert response.status_code == status.HTTP_200_OK
+    etag = response.headers["etag"]
+
+    response = await async_quiz_client.get(
+        "/api/v1/translations/en", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["etag"] == etag
+    assert not response.content
+
+
+@pytest.mark.anyio
+async def test_admin_user_reload_translations(
+    backend_container_quiz_runner, admin_user_tokens
+):
+    """
+    Testing reloading translations by admin user.
+
+    The test verifies that translations can be reloaded by sending POST
+    request to the `/api/v1/translations/reload` endpoint. It checks that
+    the response status code is 200 OK, that the response contains the
+    current version and that unchanged file keeps the same version
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    :param admin_user_tokens: Dictionary containing the access token and refresh token
+        for admin user, used for authentication in the request
+    """
+    async_quiz_client = backend_container_quiz_runner["quiz_backend"]
+    headers = {"Authorization": f"Bearer {admin_user_tokens['access_token']}"}
+    response = await async_quiz_client.post(
+        url="/api/v1/translations/reload", headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    version = response.json()["version"]
+
+    response = await async_quiz_client.post(
+        url="/api/v1/translations/reload", headers=headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["version"] == version
+
+
 @pytest.mark.anyio
 async def test_fetch_all_admin_user_stats(
     backend_container_quiz_runner, admin_user_tokens
@@ -276,20 +687,24 @@ async def test_fetch_all_admin_user_stats(
 
 @pytest.mark.anyio
 async def test_fetch_all_common_user_stats(
-    backend_container_quiz_runner, common_user_tokens
+    backend_container_quiz_runner, common_user_tokens, game_db_connection
 ):
     """
     Testing fetching all user data based on user subscription ID.
 
     This test verifies that all user-related data can be fetched
     by sending GET request to the `/api/v1/stats/all/{user_sub_id}`
-    endpoint. It checks that the response status code is 200 OK
-    and that the response is a list
+    endpoint. The initial totals are read once the sync has applied all
+    previously completed games, then the totals have to become exactly the
+    initial ones plus the scores of the completed games, so double counting
+    fails the test
 
     :param backend_container_quiz_runner: Fixture that provides way to
         run the backend quiz container and interact with it during tests
     :param common_user_tokens: Fixture that provides the token and refresh token
         for common user
+    :param game_db_connection: Fixture that provides connection to the game
+        database
     """
     async_quiz_client = backend_container_quiz_runner["quiz_backend"]
     user_sub_id = common_user_tokens["user_sub_id"]
@@ -299,6 +714,47 @@ async def test_fetch_all_common_user_stats(
     latency_seconds_list = [21, 90, 180]
     creation_counter_numbers = random.randint(1, 5)
 
+    headers = {"Authorization": f"Bearer {common_user_tokens['access_token']}"}
+
+    async def fetch_mode_scores() -> dict[str, tuple[int, int]]:
+        response = await async_quiz_client.get(
+            url=f"/api/v1/stats/all/{user_sub_id}", headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert isinstance(response.json(), list)
+        return {
+            entry["mode"]: (int(entry["correct_score"]), int(entry["incorrect_score"]))
+            for entry in response.json()
+            if int(entry["correct_score"]) or int(entry["incorrect_score"])
+        }
+
+    async def wait_mode_scores(
+        expected_scores: dict[str, tuple[int, int]],
+    ) -> dict[str, tuple[int, int]]:
+        # Statistics are synchronized from completed games by the scheduled job
+        for _ in range(STATS_SYNC_WAIT_ATTEMPTS):
+            mode_scores = await fetch_mode_scores()
+            if mode_scores == expected_scores:
+                break
+            await asyncio.sleep(1)
+        return mode_scores
+
+    result = await game_db_connection.execute(
+        text(
+            "SELECT mode_name, sum(correct_score), sum(incorrect_score) FROM games "
+            "WHERE user_sub_id = :user_sub_id AND status = 'completed' "
+            "AND mode_name IS NOT NULL GROUP BY mode_name"
+        ),
+        {"user_sub_id": user_sub_id},
+    )
+    completed_scores = {
+        mode: (int(correct), int(incorrect))
+        for mode, correct, incorrect in result.all()
+        if correct or incorrect
+    }
+    initial_scores = await wait_mode_scores(completed_scores)
+    assert initial_scores == completed_scores
+
     for _ in range(creation_counter_numbers):
         correct_score = random.randint(5, 20)
         incorrect_score = random.randint(5, 20)
@@ -308,43 +764,273 @@ async def test_fetch_all_common_user_stats(
             "user_sub_id": user_sub_id,
             "latency_seconds": random.choice(latency_seconds_list),
             "mode": mode,
+        }
+        response_creation = await async_quiz_client.post(
+            url="/api/v1/games/create", headers=headers, json=game_request
+        )
+        assert response_creation.status_code == status.HTTP_200_OK
+        game_result = {
+            "id": response_creation.json()["id"],
             "status": "completed",
             "finished_at": datetime.now(timezone.utc).isoformat(),
             "correct_score": correct_score,
             "incorrect_score": incorrect_score,
             "total_score": total_score,
         }
+        response_result = await async_quiz_client.patch(
+            url="/api/v1/games/results", headers=headers, json=game_result
+        )
+        assert response_result.status_code == status.HTTP_200_OK
+        modes_incorrect_score[mode] += incorrect_score
+        modes_correct_score[mode] += correct_score
+
+    expected_scores = dict(initial_scores)
+    for mode in modes_list:
+        if modes_incorrect_score[mode] or modes_correct_score[mode]:
+            initial_correct, initial_incorrect = initial_scores.get(mode, (0, 0))
+            expected_scores[mode] = (
+                initial_correct + modes_correct_score[mode],
+                initial_incorrect + modes_incorrect_score[mode],
+            )
+    assert await wait_mode_scores(expected_scores) == expected_scores
+
+
+@pytest.mark.anyio
+async def test_common_user_stats_are_not_writable(
+    backend_container_quiz_runner, common_user_tokens
+):
+    """
+    Testing that mode statistics cannot be written by clients.
+
+    Statistics are maintained by the server from completed games, so the
+    removed PATCH `/api/v1/stats/{user_sub_id}/{mode}` endpoint answers
+    405 Method Not Allowed
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    :param common_user_tokens: Fixture that provides the token and refresh token
+        for common user
+    """
+    async_quiz_client = backend_container_quiz_runner["quiz_backend"]
+    response = await async_quiz_client.patch(
+        url=f"/api/v1/stats/{common_user_tokens['user_sub_id']}/music",
+        headers={"Authorization": f"Bearer {common_user_tokens['access_token']}"},
+        json={"correct_score": 100, "incorrect_score": 0},
+    )
+    assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+
+@pytest.mark.anyio
+async def test_stats_sync_applies_late_committed_games(
+    backend_container_quiz_runner, common_user_tokens, game_db_connection
+):
+    """
+    Testing that the game committed after a later finished game is synchronized.
+
+    The game result becomes visible late, as it does on a lagging replica:
+    its row is locked by the test, so the result submission commits only
+    after the next game of the user is already completed. Both games have
+    to be added to the cached statistics
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    :param common_user_tokens: Fixture that provides the token and refresh token
+        for common user
+    :param game_db_connection: Fixture that provides connection to the game
+        database
+    """
+    async_quiz_client = backend_container_quiz_runner["quiz_backend"]
+    user_sub_id = common_user_tokens["user_sub_id"]
+    headers = {"Authorization": f"Bearer {common_user_tokens['access_token']}"}
+    mode = random.choice(["music", "arithmetic", "trigonometry"])
+
+    async def fetch_mode_scores() -> tuple[int, int]:
+        response = await async_quiz_client.get(
+            url=f"/api/v1/stats/all/{user_sub_id}", headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        for entry in response.json():
+            if entry["mode"] == mode:
+                return int(entry["correct_score"]), int(entry["incorrect_score"])
+        return 0, 0
+
+    async def wait_mode_scores(expected_scores: tuple[int, int]) -> tuple[int, int]:
+        for _ in range(STATS_SYNC_WAIT_ATTEMPTS):
+            mode_scores = await fetch_mode_scores()
+            if mode_scores == expected_scores:
+                break
+            await asyncio.sleep(1)
+        return mode_scores
+
+    result = await game_db_connection.execute(
+        text(
+            "SELECT coalesce(sum(correct_score), 0), coalesce(sum(incorrect_score), 0) "
+            "FROM games WHERE user_sub_id = :user_sub_id AND mode_name = :mode_name "
+            "AND status = 'completed'"
+        ),
+        {"user_sub_id": user_sub_id, "mode_name": mode},
+    )
+    completed_scores = tuple(int(score) for score in result.one())
+    initial_scores = await wait_mode_scores(completed_scores)
+    assert initial_scores == completed_scores
+
+    game_results = []
+    for _ in range(2):
         response_creation = await async_quiz_client.post(
             url="/api/v1/games/create",
-            headers={"Authorization": f"Bearer {common_user_tokens['access_token']}"},
-            json=game_request,
+            headers=headers,
+            json={"user_sub_id": user_sub_id, "latency_seconds": 180, "mode": mode},
         )
         assert response_creation.status_code == status.HTTP_200_OK
-        modes_incorrect_score[mode] += incorrect_score
-        modes_correct_score[mode] += correct_score
-        game_request = {
-            "correct_score": modes_correct_score[mode],
-            "incorrect_score": modes_incorrect_score[mode],
-        }
-        response_score_creation = await async_quiz_client.patch(
-            url=f"/api/v1/stats/{user_sub_id}/{mode}",
-            headers={"Authorization": f"Bearer {common_user_tokens['access_token']}"},
-            json=game_request,
+        correct_score = random.randint(5, 20)
+        incorrect_score = random.randint(5, 20)
+        game_results.append(
+            {
+                "id": response_creation.json()["id"],
+                "status": "completed",
+                "correct_score": correct_score,
+                "incorrect_score": incorrect_score,
+                "total_score": correct_score + incorrect_score,
+            }
         )
-        assert response_score_creation.status_code == status.HTTP_200_OK
+    late_game_result, next_game_result = game_results
 
-    response = await async_quiz_client.get(
-        url=f"/api/v1/stats/all/{user_sub_id}",
-        headers={"Authorization": f"Bearer {common_user_tokens['access_token']}"},
+    async with game_db_connection.engine.connect() as lock_connection:
+        async with lock_connection.begin():
+            await lock_connection.execute(
+                text("SELECT id FROM games WHERE id = :id FOR UPDATE"),
+                {"id": late_game_result["id"]},
+            )
+            late_submission = asyncio.create_task(
+                async_quiz_client.patch(
+                    url="/api/v1/games/results",
+                    headers=headers,
+                    json={
+                        **late_game_result,
+                        "finished_at": datetime.now(timezone.utc).isoformat(),
+                    },
+                )
+            )
+            await asyncio.sleep(1)
+            response = await async_quiz_client.patch(
+                url="/api/v1/games/results",
+                headers=headers,
+                json={
+                    **next_game_result,
+                    "finished_at": datetime.now(timezone.utc).isoformat(),
+                },
+            )
+            assert response.status_code == status.HTTP_200_OK
+            assert not late_submission.done()
+            await asyncio.sleep(1)
+    assert (await late_submission).status_code == status.HTTP_200_OK
+
+    expected_scores = (
+        initial_scores[0]
+        + late_game_result["correct_score"]
+        + next_game_result["correct_score"],
+        initial_scores[1]
+        + late_game_result["incorrect_score"]
+        + next_game_result["incorrect_score"],
     )
-    assert response.status_code == status.HTTP_200_OK
-    assert isinstance(response.json(), list)
-    for mode in modes_list:
-        if (modes_incorrect_score[mode] == 0) and (modes_correct_score[mode] == 0):
-            continue
-        score_dictionary = {
-            "mode": mode,
-            "correct_score": str(modes_correct_score[mode]),
-            "incorrect_score": str(modes_incorrect_score[mode]),
-        }
-        assert score_dictionary in response.json()
+    assert await wait_mode_scores(expected_scores) == expected_scores
+
+
+@pytest.mark.anyio
+async def test_user_mode_stats_include_games_history(
+    backend_container_quiz_runner, game_db_connection
+):
+    """
+    Testing that user_mode_stats contains totals of all completed games.
+
+    The table is created at the application start, the games completed before
+    are aggregated by the startup backfill and later ones are added with the
+    result updates, so no user and mode pair differs from the games table
+
+    :param backend_container_quiz_runner: Fixture that provides way to
+        run the backend quiz container and interact with it during tests
+    :param game_db_connection: Fixture that provides connection to the game
+        database
+    """
+    result = await game_db_connection.execute(
+        text(
+            "SELECT user_sub_id, mode_name, count(*), "
+            "coalesce(sum(correct_score), 0), coalesce(sum(incorrect_score), 0) "
+            "FROM games WHERE status = 'completed' AND mode_name IS NOT NULL "
+            "GROUP BY user_sub_id, mode_name "
+            "EXCEPT SELECT user_sub_id, mode_name, games, correct, incorrect "
+            "FROM user_mode_stats"
+        )
+    )
+    assert result.all() == []
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(("query", "index_name"), GAMES_HOT_QUERIES_INDEXES)
+async def test_games_hot_queries_use_indexes(game_db_connection, query, index_name):
+    """
+    Testing that the games table hot queries are planned with their indexes.
+
+    The test runs EXPLAIN for every hot query with sequential scans disabled,
+    because the planner prefers them on small test tables regardless of
+    indexes, and checks that the plan contains the expected index
+
+    :param game_db_connection: Fixture that provides connection to the game
+        database container
+    :param str query: The hot query
+    :param str index_name: The name of the index expected in the query plan
+    """
+    await game_db_connection.execute(text("SET LOCAL enable_seqscan = off"))
+    await game_db_connection.execute(text("ANALYZE games"))
+    plan = await game_db_connection.execute(text(f"EXPLAIN {query}"))
+    plan_text = "\n".join(row[0] for row in plan)
+    assert index_name in plan_text, plan_text
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("update_columns", [None, ["name"]])
+async def test_crud_upsert_many_keeps_existing_rows(
+    game_db_connection, update_columns
+):
+    """
+    Testing bulk upsert with ON CONFLICT DO NOTHING and DO UPDATE.
+
+    The test upserts existing and new game modes and checks that the
+    existing rows keep their IDs, new rows are created and DO NOTHING does
+    not return the conflicting rows
+
+    :param game_db_connection: Fixture that provides connection to the game
+        database, its transaction is rolled back after the test
+    :param update_columns: Columns updated on conflict, None for DO NOTHING
+    """
+    result = await game_db_connection.execute(text("SELECT name, id FROM game_modes"))
+    existing_modes = dict(result.all())
+    assert existing_modes
+    new_names = [
+        f"upsert-mode-{index}-{random.randint(0, 10**9)}" for index in range(3)
+    ]
+    names = list(existing_modes) + new_names
+
+    async with AsyncSession(
+        bind=game_db_connection, join_transaction_mode="create_savepoint"
+    ) as db:
+        objs = await CRUDBase.upsert_many(
+            db=db,
+            model=GameModeRow,
+            objs_data=[{"name": name} for name in names],
+            conflict_columns=["name"],
+            update_columns=update_columns,
+            chunk_size=2,
+        )
+    returned_names = {obj.name: obj.id for obj in objs}
+    if update_columns:
+        assert set(returned_names) == set(names)
+    else:
+        assert set(returned_names) == set(new_names)
+
+    result = await game_db_connection.execute(text("SELECT name, id FROM game_modes"))
+    modes = dict(result.all())
+    assert {name: modes[name] for name in existing_modes} == existing_modes
+    assert set(new_names) <= set(modes)
+    for name, mode_id in returned_names.items():
+        assert modes[name] == mode_id
@@ -1,10 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import Avatar from './Avatar.tsx';
 import { updateGameResults } from '../services/gameService.ts';
-import {
-  fetchUserModeStats,
-  updateUserModeStats,
-} from '../services/statsService.ts'; // updateModeUserStats
 import InteractiveBassNotesSheet from './music/InteractiveBassNotesSheet.tsx';
 import InteractiveTrebleNotesSheet from './music/InteractiveTrebleNotesSheet.tsx';
 import { evaluateTrigonometricFunction } from '../utils/commonUtils.ts';
@@ -27,7 +23,6 @@ interface GameProps {
 const Game: React.FC<GameProps> = ({
   modes,
   gameId,
-  userSubId,
   gameLatency,
   translations,
   language,
@@ -110,19 +105,8 @@ const Game: React.FC<GameProps> = ({
   const sendResults = async () => {
     const currentTime: Date = new Date(); // Current date and time
     try {
-      let modeUserStatsResponse = await fetchUserModeStats(userSubId, mode);
-      if (!modeUserStatsResponse) {
-        modeUserStatsResponse = { correct_score: 0, incorrect_score: 0 };
-      }
+      // Mode statistics are updated by the server from the completed game
       await updateGameResults(gameId, score, currentTime);
-      if (score.correct || score.incorrect) {
-        await updateUserModeStats(
-          userSubId,
-          mode,
-          Number(modeUserStatsResponse.correct_score) + score.correct,
-          Number(modeUserStatsResponse.incorrect_score) + score.incorrect,
-        );
-      }
     } catch (error) {
       console.error('Error sending results:', error);
     }
@@ -38,30 +38,8 @@ const createUserModeStats = async (
   }
 };
 
-const updateUserModeStats = async (
-  userSubId: string | null,
-  mode: string | null,
-  correctScore: number,
-  incorrectScore: number,
-) => {
-  try {
-    const response = await apiRequest.patch(
-      `/api/v1/stats/${userSubId}/${mode}`,
-      {
-        correct_score: correctScore,
-        incorrect_score: incorrectScore,
-      },
-    );
-    return response.data; // Return the response data if needed
-  } catch (error) {
-    console.error('Error updating mode user stats:', error);
-    throw error; // Rethrow the error for further handling if necessary
-  }
-};
-
 export {
   fetchUserStats,
   fetchUserModeStats,
   createUserModeStats,
-  updateUserModeStats,
 };